@@ -0,0 +1,575 @@
+/**
+ * Copyright 2026 Trent Mick
+ *
+ * A compact binary encoding of bunyan log records. This is written by 'file'
+ * and 'rotating-file' streams with `format: 'binary'` (see `BinaryStream` in
+ * "bunyan.js") and read by the `bunyan` CLI.
+ *
+ * A binary log is a sequence of frames: a varint byte length, then that many
+ * bytes. A zero length starts a *segment* and is followed by the bytes "bny"
+ * and a format version byte. The string dictionaries below are per segment.
+ * A writer starts a new segment for each file it writes to (and when its
+ * dictionaries are full), so files appended to by successive processes,
+ * rotated or gzipped can still be decoded. Any other frame is a record: its
+ * fields, up to the end of the frame, each as a key and a value.
+ *
+ * A key is a varint: 0 for a new field name (a varint byte length and the
+ * UTF-8 bytes), which gets the next key number in the segment, else 1 + the
+ * key number of an earlier field name.
+ *
+ * A value is a tag byte, then:
+ *      0, 1, 2     nothing: null, false and true
+ *      3           a zigzag varint: an integer
+ *      4           a float64 (little-endian): any other number
+ *      5           a string: a varint byte length and the UTF-8 bytes
+ *      6           a varint: the number of a string in the dictionary
+ *      7           a string, as for 5, added to the dictionary
+ *      8           JSON, as for 5: an object, array or other value
+ *      9           a zigzag varint: a time, as the milliseconds since the
+ *                  previous time in the segment (or the epoch), read as an
+ *                  ISO 8601 string
+ *
+ * So field names and short repeated strings, like `name`, `hostname` and most
+ * `msg`s, are written once per segment, and `level`, `pid` and `time` take a
+ * few bytes each. Varints are unsigned LEB128.
+ *
+ * -*- mode: js -*-
+ * vim: expandtab:ts=4:sw=4
+ */
+
+var VERSION = 1;
+var MAGIC = [0x62, 0x6e, 0x79];     // "bny"
+
+var TAG_NULL = 0;
+var TAG_FALSE = 1;
+var TAG_TRUE = 2;
+var TAG_INT = 3;
+var TAG_FLOAT = 4;
+var TAG_STR = 5;
+var TAG_STR_REF = 6;
+var TAG_STR_DEF = 7;
+var TAG_JSON = 8;
+var TAG_TIME = 9;
+
+// Strings up to this length are added to the dictionary.
+var DICT_MAX_STRING_LENGTH = 64;
+// A new segment is started when a dictionary has this many entries.
+var DICT_MAX_SIZE = 65536;
+
+var MAX_SAFE_INTEGER = 9007199254740991;
+// The ISO 8601 format of `Date#toISOString()` for the years 0-9999.
+/* JSSTYLED */
+var ISO_TIME_RE = /^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d\d\dZ$/;
+
+
+//---- Encoder
+
+/**
+ * Encodes records to binary log frames. The first record encoded (and the
+ * first after `reset()`) starts a new segment.
+ *
+ * Options:
+ * - `stringify`: Optional. A function to JSON-stringify objects and arrays
+ *   in record fields. Default is `JSON.stringify`. Bunyan passes its
+ *   stringify function that is safe for cycles and throwing getters.
+ */
+function Encoder(options) {
+    this.stringify = (options && options.stringify) || JSON.stringify;
+    this._buf = Buffer.allocUnsafe(4096);
+    this._off = 0;
+    // The start (in ms) and ISO 8601 prefix of the minute of the last time
+    // string encoded: see `_parseTime`.
+    this._minuteStart = NaN;
+    this._minutePrefix = null;
+    this.reset();
+}
+
+/**
+ * Forget the dictionaries: the next record encoded starts a new segment.
+ */
+Encoder.prototype.reset = function reset() {
+    this._keys = Object.create(null);
+    this._numKeys = 0;
+    this._strs = Object.create(null);
+    this._numStrs = 0;
+    this._lastTime = 0;
+    this._newSegment = true;
+};
+
+/**
+ * Return a Buffer with the frame for the given record (preceded by a segment
+ * header, if this starts a new segment). Fields with undefined or function
+ * values are skipped, as with `JSON.stringify`.
+ */
+Encoder.prototype.encode = function encode(rec) {
+    if (this._numKeys >= DICT_MAX_SIZE || this._numStrs >= DICT_MAX_SIZE) {
+        this.reset();
+    }
+    this._off = 0;
+    for (var k in rec) {
+        var v = rec[k];
+        var start = this._off;
+        // Room for the key number, a tag and a number.
+        this._ensure(16);
+        var key = this._keys[k];
+        if (key === undefined) {
+            this._buf[this._off++] = 0;
+            this._writeString(k);
+            this._keys[k] = ++this._numKeys;
+        } else {
+            this._off = writeVarint(this._buf, this._off, key);
+        }
+        if (!this._writeValue(k, v)) {
+            this._off = start;
+            if (key === undefined) {
+                delete this._keys[k];
+                this._numKeys--;
+            }
+        }
+    }
+
+    var len = this._off;
+    var headerLen = (this._newSegment ? 5 : 0);
+    var frame = Buffer.allocUnsafe(headerLen + varintLength(len) + len);
+    var off = 0;
+    if (this._newSegment) {
+        frame[0] = 0;
+        frame[1] = MAGIC[0];
+        frame[2] = MAGIC[1];
+        frame[3] = MAGIC[2];
+        frame[4] = VERSION;
+        off = 5;
+        this._newSegment = false;
+    }
+    off = writeVarint(frame, off, len);
+    this._buf.copy(frame, off, 0, len);
+    return frame;
+};
+
+Encoder.prototype._ensure = function _ensure(n) {
+    if (this._off + n > this._buf.length) {
+        var buf = Buffer.allocUnsafe(Math.max(this._buf.length * 2,
+            this._off + n));
+        this._buf.copy(buf, 0, 0, this._off);
+        this._buf = buf;
+    }
+};
+
+/*
+ * Write the tag and value for field `k`. Returns false if the field should
+ * be skipped.
+ */
+Encoder.prototype._writeValue = function _writeValue(k, v) {
+    // Room for a tag and a string reference, after a key that may have
+    // filled the buffer.
+    this._ensure(1 + 10);
+    switch (typeof (v)) {
+    case 'string':
+        if (k === 'time' && ISO_TIME_RE.test(v)) {
+            var t = this._parseTime(v);
+            if (!isNaN(t)) {
+                this._writeTime(t);
+                return true;
+            }
+        }
+        if (v.length > DICT_MAX_STRING_LENGTH) {
+            this._buf[this._off++] = TAG_STR;
+            this._writeString(v);
+        } else {
+            var ref = this._strs[v];
+            if (ref !== undefined) {
+                this._buf[this._off++] = TAG_STR_REF;
+                this._off = writeVarint(this._buf, this._off, ref);
+            } else {
+                this._buf[this._off++] = TAG_STR_DEF;
+                this._writeString(v);
+                this._strs[v] = this._numStrs++;
+            }
+        }
+        return true;
+    case 'number':
+        if (v % 1 === 0 && v <= MAX_SAFE_INTEGER && v >= -MAX_SAFE_INTEGER) {
+            this._ensure(9);
+            this._buf[this._off++] = TAG_INT;
+            this._off = writeVarint(this._buf, this._off,
+                v < 0 ? -v * 2 - 1 : v * 2);
+        } else if (isFinite(v)) {
+            this._ensure(9);
+            this._buf[this._off++] = TAG_FLOAT;
+            this._buf.writeDoubleLE(v, this._off);
+            this._off += 8;
+        } else {
+            // As with JSON.
+            this._buf[this._off++] = TAG_NULL;
+        }
+        return true;
+    case 'boolean':
+        this._buf[this._off++] = (v ? TAG_TRUE : TAG_FALSE);
+        return true;
+    case 'object':
+        if (v === null) {
+            this._buf[this._off++] = TAG_NULL;
+            return true;
+        } else if (k === 'time' && v instanceof Date && !isNaN(v.getTime())) {
+            this._writeTime(v.getTime());
+            return true;
+        }
+        break;
+    case 'undefined':
+    case 'function':
+    case 'symbol':
+        return false;
+    default:
+        break;
+    }
+
+    var json = this.stringify(v);
+    if (json === undefined) {
+        return false;
+    }
+    this._buf[this._off++] = TAG_JSON;
+    this._writeString(json);
+    return true;
+};
+
+/*
+ * Return the ms since the epoch for the given time string, in the format of
+ * `Date#toISOString()`, or NaN if it wouldn't be decoded as the same string.
+ * Consecutive records are typically in the same minute, for which only the
+ * seconds and milliseconds are parsed.
+ */
+Encoder.prototype._parseTime = function _parseTime(v) {
+    if (v.substr(0, 17) === this._minutePrefix) {
+        var sec = (v.charCodeAt(17) - 48) * 10 + v.charCodeAt(18) - 48;
+        if (sec < 60) {
+            return this._minuteStart + sec * 1000
+                + (v.charCodeAt(20) - 48) * 100
+                + (v.charCodeAt(21) - 48) * 10 + v.charCodeAt(22) - 48;
+        }
+    }
+    var t = Date.parse(v);
+    if (isNaN(t) || new Date(t).toISOString() !== v) {
+        return NaN;
+    }
+    if (t >= 0) {
+        this._minuteStart = t - t % 60000;
+        this._minutePrefix = v.substr(0, 17);
+    }
+    return t;
+};
+
+Encoder.prototype._writeTime = function _writeTime(t) {
+    var delta = t - this._lastTime;
+    this._lastTime = t;
+    this._ensure(9);
+    this._buf[this._off++] = TAG_TIME;
+    this._off = writeVarint(this._buf, this._off,
+        delta < 0 ? -delta * 2 - 1 : delta * 2);
+};
+
+/*
+ * Write a varint byte length and the UTF-8 bytes of the string.
+ */
+Encoder.prototype._writeString = function _writeString(s) {
+    var len = s.length;
+    if (len < 43) {
+        // At most 127 bytes: a one byte length. Copy ASCII strings without
+        // the overhead of `Buffer#write`.
+        this._ensure(1 + len * 3);
+        var buf = this._buf;
+        var off = this._off + 1;
+        for (var i = 0; i < len; i++) {
+            var c = s.charCodeAt(i);
+            if (c >= 128) {
+                break;
+            }
+            buf[off + i] = c;
+        }
+        if (i < len) {
+            i = buf.write(s, off);
+        }
+        buf[this._off] = i;
+        this._off = off + i;
+    } else {
+        var n = Buffer.byteLength(s);
+        this._ensure(5 + n);
+        this._off = writeVarint(this._buf, this._off, n);
+        this._buf.write(s, this._off);
+        this._off += n;
+    }
+};
+
+
+//---- Decoder
+
+/**
+ * Decodes binary log data to records. Call `write(chunk, onRecord)` with
+ * successive chunks of the data. A record may span chunks.
+ */
+function Decoder() {
+    this._pending = null;   // A partial frame from the previous chunk.
+    this._inSegment = false;
+    this._keys = [];
+    this._strs = [];
+    this._lastTime = 0;
+    this._varint = 0;       // The result of `readVarint()`.
+    // The start (in ms) and ISO 8601 prefix ("YYYY-MM-DDTHH:MM:") of the
+    // minute of the last time decoded: see `_timeString`.
+    this._minuteStart = NaN;
+    this._minutePrefix = '';
+}
+
+/**
+ * Decode the records in this chunk, calling `onRecord(rec)` for each. If
+ * `onRecord` returns true, decoding stops (the rest of the data is ignored)
+ * and this returns true.
+ *
+ * Throws an Error if this is not valid binary log data.
+ */
+Decoder.prototype.write = function write(chunk, onRecord) {
+    var buf = chunk;
+    if (this._pending) {
+        buf = Buffer.concat([this._pending, chunk]);
+        this._pending = null;
+    }
+    var off = 0;
+    var end = buf.length;
+    while (off < end) {
+        if (!this._inSegment && buf[off] !== 0) {
+            throw new Error('not a bunyan binary log');
+        }
+        // The frame length: `readVarint` inline, allowing for a varint split
+        // across chunks.
+        var len = 0;
+        var mul = 1;
+        var p = off;
+        var b;
+        do {
+            if (p >= end) {
+                break;
+            }
+            b = buf[p++];
+            len += (b & 0x7f) * mul;
+            mul *= 128;
+        } while (b >= 128);
+        if (b >= 128 || p + len > end) {
+            break;  // An incomplete frame.
+        }
+
+        if (len === 0) {
+            if (p + 4 > end) {
+                break;
+            }
+            if (buf[p] !== MAGIC[0] || buf[p + 1] !== MAGIC[1] ||
+                buf[p + 2] !== MAGIC[2]) {
+                throw new Error('not a bunyan binary log');
+            } else if (buf[p + 3] > VERSION) {
+                throw new Error('unsupported bunyan binary log version: '
+                    + buf[p + 3]);
+            }
+            this._inSegment = true;
+            this._keys = [];
+            this._strs = [];
+            this._lastTime = 0;
+            off = p + 4;
+            continue;
+        }
+
+        var rec = this._decodeRecord(buf, p, p + len);
+        off = p + len;
+        if (onRecord(rec)) {
+            return true;
+        }
+    }
+    if (off < end) {
+        this._pending = buf.slice(off);
+    }
+    return false;
+};
+
+/**
+ * The number of bytes of an incomplete frame at the end of the data. This
+ * is non-zero for a log truncated mid-record, e.g. by a crash.
+ */
+Decoder.prototype.pendingLength = function pendingLength() {
+    return (this._pending ? this._pending.length : 0);
+};
+
+Decoder.prototype._decodeRecord = function _decodeRecord(buf, off, end) {
+    var rec = {};
+    var keys = this._keys;
+    var strs = this._strs;
+    var n, s;
+    while (off < end) {
+        var name;
+        n = buf[off++];
+        if (n >= 128) {
+            off = readVarint(this, buf, off - 1);
+            n = this._varint;
+        }
+        if (n === 0) {
+            off = readVarint(this, buf, off);
+            n = this._varint;
+            name = buf.toString('utf8', off, off + n);
+            off += n;
+            keys.push(name);
+        } else {
+            name = keys[n - 1];
+            if (name === undefined) {
+                throw new Error('invalid bunyan binary log: bad key: ' + n);
+            }
+        }
+
+        var value;
+        switch (buf[off++]) {
+        case TAG_NULL:
+            value = null;
+            break;
+        case TAG_FALSE:
+            value = false;
+            break;
+        case TAG_TRUE:
+            value = true;
+            break;
+        case TAG_INT:
+            off = readVarint(this, buf, off);
+            n = this._varint;
+            value = (n % 2 === 1 ? -(n + 1) / 2 : n / 2);
+            break;
+        case TAG_FLOAT:
+            value = buf.readDoubleLE(off);
+            off += 8;
+            break;
+        case TAG_STR:
+            off = readVarint(this, buf, off);
+            n = this._varint;
+            value = buf.toString('utf8', off, off + n);
+            off += n;
+            break;
+        case TAG_STR_REF:
+            off = readVarint(this, buf, off);
+            value = strs[this._varint];
+            if (value === undefined) {
+                throw new Error('invalid bunyan binary log: bad string: '
+                    + this._varint);
+            }
+            break;
+        case TAG_STR_DEF:
+            off = readVarint(this, buf, off);
+            n = this._varint;
+            value = buf.toString('utf8', off, off + n);
+            off += n;
+            strs.push(value);
+            break;
+        case TAG_JSON:
+            off = readVarint(this, buf, off);
+            n = this._varint;
+            s = buf.toString('utf8', off, off + n);
+            off += n;
+            try {
+                value = JSON.parse(s);
+            } catch (e) {
+                // E.g. the message from a failed stringify.
+                value = s;
+            }
+            break;
+        case TAG_TIME:
+            off = readVarint(this, buf, off);
+            n = this._varint;
+            this._lastTime += (n % 2 === 1 ? -(n + 1) / 2 : n / 2);
+            value = this._timeString(this._lastTime);
+            break;
+        default:
+            throw new Error('invalid bunyan binary log: bad tag: '
+                + buf[off - 1]);
+        }
+        rec[name] = value;
+    }
+    if (off !== end) {
+        throw new Error('invalid bunyan binary log: bad record length');
+    }
+    return rec;
+};
+
+
+/*
+ * Return `new Date(t).toISOString()`. Consecutive records are typically in
+ * the same minute, for which only the seconds and milliseconds are formatted.
+ */
+Decoder.prototype._timeString = function _timeString(t) {
+    var ms = t - this._minuteStart;
+    if (!(ms >= 0 && ms < 60000)) {
+        var iso = new Date(t).toISOString();
+        if (t >= 0 && iso.length === 24) {
+            this._minuteStart = t - t % 60000;
+            this._minutePrefix = iso.slice(0, 17);
+        }
+        return iso;
+    }
+    var sec = Math.floor(ms / 1000);
+    ms -= sec * 1000;
+    return this._minutePrefix + (sec < 10 ? '0' : '') + sec + '.'
+        + (ms < 10 ? '00' : (ms < 100 ? '0' : '')) + ms + 'Z';
+};
+
+
+//---- Support
+
+function varintLength(n) {
+    var len = 1;
+    while (n >= 128) {
+        n = Math.floor(n / 128);
+        len++;
+    }
+    return len;
+}
+
+/*
+ * Write the varint for `n` at `off` in `buf`, and return the offset after
+ * it. This uses arithmetic rather than bitwise operators to allow for values
+ * over 2^31.
+ */
+function writeVarint(buf, off, n) {
+    while (n >= 128) {
+        buf[off++] = (n % 128) + 128;
+        n = Math.floor(n / 128);
+    }
+    buf[off++] = n;
+    return off;
+}
+
+/*
+ * Read the varint at `off` in `buf` into `decoder._varint`, and return the
+ * offset after it.
+ */
+function readVarint(decoder, buf, off) {
+    var b = buf[off++];
+    var n = b & 0x7f;
+    var mul = 128;
+    while (b >= 128) {
+        b = buf[off++];
+        if (b === undefined) {
+            throw new Error('invalid bunyan binary log: truncated varint');
+        }
+        n += (b & 0x7f) * mul;
+        mul *= 128;
+    }
+    decoder._varint = n;
+    return off;
+}
+
+/**
+ * Whether the given data (the start of a file or stream) is a binary log.
+ * A JSON log never starts with a zero byte.
+ */
+function isBinaryLog(head) {
+    return head.length > 0 && head[0] === 0;
+}
+
+
+module.exports = {
+    VERSION: VERSION,
+    Encoder: Encoder,
+    Decoder: Decoder,
+    isBinaryLog: isBinaryLog
+};
@@ -100,6 +100,22 @@ try {
     mv = null;
 }
 
+// The 'worker_threads' module (node >=10.5) is required for 'worker' stream
+// support.
+try {
+    var worker_threads = require('worker_threads' + '');
+} catch (_) {
+    worker_threads = null;
+}
+
+// The binary record format for 'file' and 'rotating-file' streams with
+// `format: 'binary'`.
+try {
+    var binaryLog = require('./binary-log' + '');
+} catch (_) {
+    binaryLog = null;
+}
+
 try {
     var sourceMapSupport = require('source-map-support' + '');
 } catch (_) {
@@ -129,6 +145,17 @@ function objCopy(obj) {
     }
 }
 
+/**
+ * Allocate a Buffer of the given size. `Buffer.alloc` and `Buffer.from` were
+ * added in node v5.10.0; fallback to the deprecated `new Buffer(...)`.
+ */
+function allocBuffer(size) {
+    return (Buffer.alloc ? Buffer.alloc(size) : new Buffer(size));
+}
+function bufferFrom(str) {
+    return (Buffer.from ? Buffer.from(str, 'utf8') : new Buffer(str, 'utf8'));
+}
+
 var format = util.format;
 if (!format) {
     // If node < 0.6, then use its `util.format`:
@@ -171,37 +198,119 @@ if (!format) {
 }
 
 
+/**
+ * A bounded least-recently-used cache of caller info, keyed on a call site's
+ * file, line and column. This means that the (possibly source-mapped) lookup
+ * of the caller info is done once per distinct log call site.
+ */
+var CALLER_CACHE_SIZE = 1000;
+var callerCache = {
+    size: 0,
+    map: Object.create(null),
+    // Doubly-linked list of cache entries, most recently used first.
+    head: null,
+    tail: null
+};
+
+function callerCacheGet(key) {
+    var entry = callerCache.map[key];
+    if (entry === undefined) {
+        return undefined;
+    }
+    if (entry !== callerCache.head) {
+        // Move to the front.
+        entry.prev.next = entry.next;
+        if (entry.next) {
+            entry.next.prev = entry.prev;
+        } else {
+            callerCache.tail = entry.prev;
+        }
+        entry.prev = null;
+        entry.next = callerCache.head;
+        callerCache.head.prev = entry;
+        callerCache.head = entry;
+    }
+    return entry.info;
+}
+
+function callerCacheSet(key, info) {
+    var entry = {key: key, info: info, prev: null, next: callerCache.head};
+    if (callerCache.head) {
+        callerCache.head.prev = entry;
+    } else {
+        callerCache.tail = entry;
+    }
+    callerCache.head = entry;
+    callerCache.map[key] = entry;
+    if (++callerCache.size > CALLER_CACHE_SIZE) {
+        var lru = callerCache.tail;
+        callerCache.tail = lru.prev;
+        callerCache.tail.next = null;
+        delete callerCache.map[lru.key];
+        callerCache.size--;
+    }
+}
+
+
+/**
+ * An `Error.prepareStackTrace` for `getCaller3Info` that returns the caller
+ * info for the third stack frame.
+ */
+function prepareCaller3Info(_, stack) {
+    var caller = stack[2];
+    if (!caller) {
+        return {};
+    }
+    // Call sites without a file name (e.g. in `eval`ed code) can't be told
+    // apart by position, so aren't cached.
+    var file = caller.getFileName();
+    var key = file && (file + ':' + caller.getLineNumber()
+        + ':' + caller.getColumnNumber());
+    var info;
+    if (key) {
+        info = callerCacheGet(key);
+        if (info !== undefined) {
+            return info;
+        }
+    }
+    if (sourceMapSupport) {
+        caller = sourceMapSupport.wrapCallSite(caller);
+    }
+    info = {
+        file: caller.getFileName(),
+        line: caller.getLineNumber()
+    };
+    var func = caller.getFunctionName();
+    if (func)
+        info.func = func;
+    if (key) {
+        callerCacheSet(key, info);
+    }
+    return info;
+}
+
+
 /**
  * Gather some caller info 3 stack levels up.
  * See <http://code.google.com/p/v8/wiki/JavaScriptStackTraceApi>.
+ *
+ * Only the call site's position is read from the captured stack. The caller
+ * info for a given call site is looked up once and then cached (see
+ * `callerCache`), so the returned object is shared and must not be modified.
  */
 function getCaller3Info() {
-    if (this === undefined) {
-        // Cannot access caller info in 'strict' mode.
-        return;
-    }
-    var obj = {};
     var saveLimit = Error.stackTraceLimit;
     var savePrepare = Error.prepareStackTrace;
     Error.stackTraceLimit = 3;
+    Error.prepareStackTrace = prepareCaller3Info;
 
-    Error.prepareStackTrace = function (_, stack) {
-        var caller = stack[2];
-        if (sourceMapSupport) {
-            caller = sourceMapSupport.wrapCallSite(caller);
-        }
-        obj.file = caller.getFileName();
-        obj.line = caller.getLineNumber();
-        var func = caller.getFunctionName();
-        if (func)
-            obj.func = func;
-    };
-    Error.captureStackTrace(this, getCaller3Info);
-    this.stack;
+    var holder = {};
+    Error.captureStackTrace(holder, getCaller3Info);
+    var info = holder.stack;
 
     Error.stackTraceLimit = saveLimit;
     Error.prepareStackTrace = savePrepare;
-    return obj;
+    return info;
 }
 
 
@@ -336,8 +445,19 @@ function isWritable(obj) {
  *        `process.stdout` (cannot be used with `streams`)
  *      - `serializers`: object mapping log record field names to
  *        serializing functions. See README.md for details.
+ *      - `memoizeSerializers`: Boolean or array of field names (default
+ *        false). Cache the result of serializing an object value for the
+ *        given fields (or all, if true), so that logging the same object
+ *        again reuses it. Only use this for objects that don't change after
+ *        they are first logged.
  *      - `src`: Boolean (default false). Set true to enable 'src' automatic
  *        field with log call source info.
+ *      - `metrics`: Boolean or object (default false). Count records, bytes
+ *        and errors, shared with child loggers, see `metrics()` and
+ *        `LoggerMetrics`.
+ *      - `limits`: Object (default none). Sample records by level, and rate
+ *        limit them by call site or message, shared with child loggers,
+ *        see `LoggerLimits`.
  *    All other keys are log record fields.
  *
  * An alternative *internal* call signature is used for creating a child:
@@ -387,6 +507,34 @@ function Logger(options, _childOptions, _childSimple) {
             Array.isArray(options.serializers))) {
         throw new TypeError('invalid options.serializers: must be an object')
     }
+    if (options.memoizeSerializers !== undefined &&
+        typeof (options.memoizeSerializers) !== 'boolean' &&
+        !Array.isArray(options.memoizeSerializers))
+    {
+        throw new TypeError('invalid options.memoizeSerializers: must be a '
+            + 'boolean or an array of field names');
+    }
+    if (options.metrics !== undefined) {
+        if (parent) {
+            throw new TypeError(
+                'invalid options.metrics: child cannot set metrics');
+        } else if (typeof (options.metrics) !== 'boolean' &&
+            (typeof (options.metrics) !== 'object' || options.metrics === null))
+        {
+            throw new TypeError('invalid options.metrics: must be a boolean '
+                + 'or an object');
+        }
+    }
+    if (options.limits !== undefined) {
+        if (parent) {
+            throw new TypeError(
+                'invalid options.limits: child cannot set limits');
+        } else if (typeof (options.limits) !== 'object' ||
+            options.limits === null)
+        {
+            throw new TypeError('invalid options.limits: must be an object');
+        }
+    }
 
     EventEmitter.call(this);
 
@@ -396,46 +544,76 @@ function Logger(options, _childOptions, _childSimple) {
         // owns none of its streams.
         this._isSimpleChild = true;
 
+        // A simple child uses its parent's current streams and level (see
+        // `_syncStreams`), but copies them before making its own changes.
         this._level = parent._level;
         this.streams = parent.streams;
+        this._streamsShared = this._inheritsStreams = true;
+        this._dispatchParent = parent;
+        // Likewise for its parent's serializers (see `_syncSerializers`).
+        this._serializersParent = parent;
         this.serializers = parent.serializers;
+        this._serializersShared = true;
+        this._serializerPlan = parent._serializerPlan;
+        this._memoizeSerializers = parent._memoizeSerializers;
         this.src = parent.src;
-        var fields = this.fields = {};
-        var parentFieldNames = Object.keys(parent.fields);
-        for (var i = 0; i < parentFieldNames.length; i++) {
-            var name = parentFieldNames[i];
-            fields[name] = parent.fields[name];
-        }
-        var names = Object.keys(options);
-        for (var i = 0; i < names.length; i++) {
-            var name = names[i];
-            fields[name] = options[name];
-        }
+        this._metrics = parent._metrics;
+        this._limits = parent._limits;
+        this._fieldsParent = parent;
+        this._fieldsDelta = objCopy(options);
         return;
     }
 
     // Start values.
+    //
+    // A child shares its parent's streams and serializers (copy-on-write,
+    // see `_ownStreams` and `addSerializers`) and only stores the fields it
+    // adds (see the `fields` getter), so that creating a child is cheap.
     var self = this;
     if (parent) {
-        this._level = parent._level;
-        this.streams = [];
-        for (var i = 0; i < parent.streams.length; i++) {
-            var s = objCopy(parent.streams[i]);
-            s.closeOnExit = false; // Don't own parent stream.
-            this.streams.push(s);
+        // If the parent is a simple child, share the streams of the logger
+        // that owns them. That logger copies its streams before changing
+        // them, so its dispatch table remains valid for the shared streams.
+        var owner = parent;
+        while (owner._dispatchParent !== null) {
+            owner = owner._dispatchParent;
         }
-        this.serializers = objCopy(parent.serializers);
+        this._level = owner._level;
+        this.streams = owner.streams;
+        this._streamsShared = owner._streamsShared = true;
+        parent._streamsShared = true;
+        this._inheritsStreams = true;
+        this._dispatch = owner._dispatchTable();
+        this._dispatchParent = null;
+        parent._syncSerializers();
+        this._serializersParent = null;
+        this.serializers = parent.serializers;
+        this._serializersShared = parent._serializersShared = true;
+        this._serializerPlan = parent._serializerPlan;
+        this._memoizeSerializers = parent._memoizeSerializers;
         this.src = parent.src;
-        this.fields = objCopy(parent.fields);
+        this._metrics = parent._metrics;
+        this._limits = parent._limits;
+        this._fieldsParent = parent;
         if (options.level) {
             this.level(options.level);
         }
     } else {
         this._level = Number.POSITIVE_INFINITY;
         this.streams = [];
+        this._dispatch = null;
+        this._dispatchParent = null;
+        this._serializersParent = null;
         this.serializers = null;
+        this._serializerPlan = null;
+        this._memoizeSerializers = false;
         this.src = false;
-        this.fields = {};
+        this._metrics = (options.metrics ?
+            new LoggerMetrics(options.metrics === true ? {} : options.metrics)
+            : null);
+        this._limits = (options.limits ? new LoggerLimits(options.limits)
+            : null);
+        this._fieldsParent = null;
     }
 
     if (!dtp && dtrace) {
@@ -493,6 +671,13 @@ function Logger(options, _childOptions, _childSimple) {
             });
         }
     }
+    if (options.memoizeSerializers !== undefined) {
+        this._memoizeSerializers = options.memoizeSerializers;
+        if (this.serializers && !options.serializers) {
+            this._serializerPlan = compileSerializers(this.serializers,
+                this._memoizeSerializers);
+        }
+    }
     if (options.serializers) {
         self.addSerializers(options.serializers);
     }
@@ -506,28 +691,195 @@ function Logger(options, _childOptions, _childSimple) {
     // removed in this constructor). To allow storing raw log records
     // (unrendered), `this.fields` must never be mutated. Create a copy for
     // any changes.
-    var fields = objCopy(options);
-    delete fields.stream;
-    delete fields.level;
-    delete fields.streams;
-    delete fields.serializers;
-    delete fields.src;
+    var fields = {};
+    var names = Object.keys(options);
+    for (var i = 0; i < names.length; i++) {
+        if (!CONFIG_OPTIONS[names[i]]) {
+            fields[names[i]] = options[names[i]];
+        }
+    }
     if (this.serializers) {
         this._applySerializers(fields);
     }
-    if (!fields.hostname && !self.fields.hostname) {
+    if (!fields.hostname && !(parent && parent._lookupField('hostname'))) {
         fields.hostname = os.hostname();
     }
-    if (!fields.pid) {
+    // Don't repeat the pid if it is inherited, unless this child sets it
+    // (even to undefined).
+    if (!fields.pid &&
+        !(parent && parent._lookupField('pid') === process.pid &&
+        !Object.prototype.hasOwnProperty.call(fields, 'pid')))
+    {
         fields.pid = process.pid;
     }
-    Object.keys(fields).forEach(function (k) {
-        self.fields[k] = fields[k];
-    });
+    this._fieldsDelta = fields;
 }
 
 util.inherits(Logger, EventEmitter);
 
+// Logger options that are config, rather than log record fields.
+var CONFIG_OPTIONS = {
+    stream: true,
+    level: true,
+    streams: true,
+    serializers: true,
+    memoizeSerializers: true,
+    src: true,
+    metrics: true,
+    limits: true
+};
+
+
+/**
+ * The log record fields bound to this logger: those given to the
+ * constructor, plus those of its parent, if this is a child.
+ *
+ * A child only stores the fields it adds (`_fieldsDelta`). The full set is
+ * built on first access. To allow storing raw log records (unrendered),
+ * `this.fields` must never be mutated. Create a copy for any changes.
+ */
+Object.defineProperty(Logger.prototype, 'fields', {
+    get: function () {
+        if (this._fields === undefined) {
+            var parent = this._fieldsParent;
+            var fields = (parent ? objCopy(parent.fields) : {});
+            var delta = this._fieldsDelta;
+            for (var k in delta) {
+                fields[k] = delta[k];
+            }
+            this._fields = fields;
+        }
+        return this._fields;
+    },
+    set: function (fields) {
+        this._fields = this._fieldsDelta = fields;
+        this._fieldsParent = null;
+        delete this._fieldsJson;
+    }
+});
+
+/**
+ * Return the value of the given bound field (see `fields`), without
+ * building the full set of fields for a child.
+ */
+Logger.prototype._lookupField = function _lookupField(name) {
+    var log = this;
+    while (log) {
+        if (log._fields !== undefined) {
+            return log._fields[name];
+        } else if (Object.prototype.hasOwnProperty.call(log._fieldsDelta,
+                name)) {
+            return log._fieldsDelta[name];
+        }
+        log = log._fieldsParent;
+    }
+    return undefined;
+};
+
+/**
+ * Return true if the given field is bound to this logger (see `fields`),
+ * without building the full set of fields for a child.
+ */
+Logger.prototype._hasField = function _hasField(name) {
+    var log = this;
+    while (log) {
+        if (log._fields !== undefined) {
+            return Object.prototype.hasOwnProperty.call(log._fields, name);
+        } else if (Object.prototype.hasOwnProperty.call(log._fieldsDelta,
+                name)) {
+            return true;
+        }
+        log = log._fieldsParent;
+    }
+    return false;
+};
+
+/**
+ * Make this logger's `streams` its own (i.e. not shared with a parent or
+ * child logger) before changing them.
+ */
+Logger.prototype._ownStreams = function _ownStreams() {
+    if (!this._streamsShared) {
+        return;
+    }
+    this._syncStreams();
+    var streams = [];
+    for (var i = 0; i < this.streams.length; i++) {
+        var s = objCopy(this.streams[i]);
+        if (this._inheritsStreams) {
+            // A child's first copy: all the streams are from its parent.
+            s.closeOnExit = false; // Don't own parent stream.
+        }
+        streams.push(s);
+    }
+    this.streams = streams;
+    this._streamsShared = this._inheritsStreams = false;
+    this._dispatchParent = null;
+};
+
+
+/**
+ * Update a simple child's `streams` and level to those of its parent. A
+ * simple child uses its parent's current streams (and sees changes to them,
+ * including the parent's copy in `_ownStreams`) until it changes them itself.
+ */
+Logger.prototype._syncStreams = function _syncStreams() {
+    var parent = this._dispatchParent;
+    if (parent === null) {
+        return;
+    }
+    parent._syncStreams();
+    this.streams = parent.streams;
+    this._level = parent._level;
+};
+
+
+/**
+ * Get this logger's table of the streams to write to for each level (see
+ * `_dispatchFor`), creating it if necessary. The table is reset whenever
+ * this logger's streams or their levels are changed.
+ */
+Logger.prototype._dispatchTable = function _dispatchTable() {
+    if (!this._dispatch) {
+        this._dispatch = {};
+    }
+    return this._dispatch;
+};
+
+
+/**
+ * Get the streams to which a log record at the given level is written.
+ *
+ * @returns {Object} with `streams` (the stream entries whose level is at or
+ *      below `level`), `str` (true if any of them need the JSON-stringified
+ *      record) and `raw` (true if any of them need the record object).
+ */
+Logger.prototype._dispatchFor = function _dispatchFor(level) {
+    // A simple child uses the table of the logger that owns its streams,
+    // filled from that logger's current streams.
+    var owner = this;
+    while (owner._dispatchParent !== null) {
+        owner = owner._dispatchParent;
+    }
+    var table = owner._dispatchTable();
+    var dispatch = table[level];
+    if (dispatch === undefined) {
+        dispatch = table[level] = {streams: [], str: false, raw: false};
+        for (var i = 0; i < owner.streams.length; i++) {
+            var s = owner.streams[i];
+            if (s.level <= level) {
+                dispatch.streams.push(s);
+                if (s.raw) {
+                    dispatch.raw = true;
+                } else {
+                    dispatch.str = true;
+                }
+            }
+        }
+    }
+    return dispatch;
+};
+
 
 /**
  * Add a stream
@@ -542,6 +894,8 @@ util.inherits(Logger, EventEmitter);
  *    - `level`: Optional. Falls back to `defaultLevel`.
  *    - `closeOnExit` (boolean): Optional. Default is true for a
  *      'file' stream when `path` is given, false otherwise.
+ *    - `format`: Optional. 'json' (the default) or, for 'file' and
+ *      'rotating-file' streams, 'binary'.
  *    See README.md for full details.
  * @param defaultLevel {Number|String} Optional. A level to use if
  *      `stream.level` is not set. If neither is given, this defaults to INFO.
@@ -551,6 +905,7 @@ Logger.prototype.addStream = function addStream(s, defaultLevel) {
     if (defaultLevel === null || defaultLevel === undefined) {
         defaultLevel = INFO;
     }
+    self._ownStreams();
 
     s = objCopy(s);
 
@@ -573,6 +928,16 @@ Logger.prototype.addStream = function addStream(s, defaultLevel) {
         self._level = s.level;
     }
 
+    if (s.format === 'binary') {
+        assert.ok(s.type === 'file' || s.type === 'rotating-file',
+            'the "binary" format is only supported for "file" and '
+            + '"rotating-file" streams');
+        assert.ok(binaryLog, 'the "binary" format is not supported');
+    } else {
+        assert.ok(s.format === undefined || s.format === 'json',
+            format('invalid stream "format": %j', s.format));
+    }
+
     switch (s.type) {
     case 'stream':
         assert.ok(isWritable(s.stream),
@@ -581,6 +946,13 @@ Logger.prototype.addStream = function addStream(s, defaultLevel) {
         if (!s.closeOnExit) {
             s.closeOnExit = false;
         }
+        if (s.buffered) {
+            s.stream = new BufferedStream({
+                stream: s.stream,
+                bufferSize: s.bufferSize,
+                flushInterval: s.flushInterval
+            });
+        }
         break;
     case 'file':
         if (s.reemitErrorEvents === undefined) {
@@ -609,6 +981,45 @@ Logger.prototype.addStream = function addStream(s, defaultLevel) {
             s.closeOnExit = true;
         }
         break;
+    case 'buffered-file':
+        assert.ok(!s.stream,
+                  '"buffered-file" stream should not give a "stream"');
+        assert.ok(s.path);
+        if (s.reemitErrorEvents === undefined) {
+            s.reemitErrorEvents = true;
+        }
+        s.stream = new BufferedStream({
+            path: s.path,
+            bufferSize: s.bufferSize,
+            flushInterval: s.flushInterval
+        });
+        if (!s.closeOnExit) {
+            s.closeOnExit = true;
+        }
+        break;
+    case 'worker':
+        assert.ok(!s.stream, '"worker" stream should not give a "stream"');
+        assert.ok(s.path);
+        assert.ok(worker_threads, '"worker" stream type is not supported: '
+                  + 'missing "worker_threads" module');
+        if (s.reemitErrorEvents === undefined) {
+            s.reemitErrorEvents = true;
+        }
+        s.stream = new WorkerStream(s);
+        if (!s.closeOnExit) {
+            s.closeOnExit = true;
+        }
+        break;
+    case 'tcp':
+    case 'udp':
+    case 'unix':
+        assert.ok(!s.stream,
+                  '"' + s.type + '" stream should not give a "stream"');
+        s.stream = new NetworkStream(s);
+        if (!s.closeOnExit) {
+            s.closeOnExit = true;
+        }
+        break;
     case 'raw':
         if (!s.closeOnExit) {
             s.closeOnExit = false;
@@ -618,6 +1029,39 @@ Logger.prototype.addStream = function addStream(s, defaultLevel) {
         throw new TypeError('unknown stream type "' + s.type + '"');
     }
 
+    if (s.format === 'binary') {
+        s.stream = new BinaryStream(s.stream);
+        s.raw = true;
+    }
+
+    // Records at or above `flushLevel` (default 'error') force a flush of a
+    // BufferedStream. See `_emit`.
+    if (s.stream instanceof BufferedStream) {
+        s.flushLevel = resolveLevel(s.flushLevel || ERROR);
+    } else {
+        delete s.flushLevel;
+    }
+
+    // Bound the records held for a stream that isn't keeping up. See
+    // `StreamQueue`.
+    if (s.highWaterMark !== undefined || s.overflow !== undefined) {
+        assert.ok(!(s.raw && s.overflow === 'spill'),
+            'the "spill" overflow policy is not supported for "raw" streams');
+        s.queue = new StreamQueue(s.stream, {
+            highWaterMark: s.highWaterMark,
+            overflow: s.overflow,
+            spillPath: s.spillPath,
+            spillMaxBytes: s.spillMaxBytes,
+            onDropped: function (count, levelCounts) {
+                var rec = mkRecord(self, WARN, [
+                    {droppedRecords: count, droppedLevels: levelCounts},
+                    'dropped %d log records: stream was not keeping up',
+                    count]);
+                return (s.raw ? rec : fastAndSafeJsonStringify(rec) + os.EOL);
+            }
+        });
+    }
+
     if (s.reemitErrorEvents && typeof (s.stream.on) === 'function') {
         // TODO: When we have `<logger>.close()`, it should remove event
         //      listeners to not leak Logger instances.
@@ -627,7 +1071,7 @@ Logger.prototype.addStream = function addStream(s, defaultLevel) {
     }
 
     self.streams.push(s);
-    delete self.haveNonRawStreams;  // reset
+    self._dispatch = null;  // reset
 }
 
 
@@ -640,9 +1084,14 @@ Logger.prototype.addStream = function addStream(s, defaultLevel) {
 Logger.prototype.addSerializers = function addSerializers(serializers) {
     var self = this;
 
+    self._syncSerializers();
+    self._serializersParent = null;
     if (!self.serializers) {
         self.serializers = {};
+    } else if (self._serializersShared) {
+        self.serializers = objCopy(self.serializers);
     }
+    self._serializersShared = false;
     Object.keys(serializers).forEach(function (field) {
         var serializer = serializers[field];
         if (typeof (serializer) !== 'function') {
@@ -653,9 +1102,27 @@ Logger.prototype.addSerializers = function addSerializers(serializers) {
             self.serializers[field] = serializer;
         }
     });
+    self._serializerPlan = compileSerializers(self.serializers,
+        self._memoizeSerializers);
 }
 
 
+/**
+ * Update a simple child's `serializers` to those of its parent. As with
+ * streams (see `_syncStreams`), a simple child uses its parent's current
+ * serializers until it adds its own.
+ */
+Logger.prototype._syncSerializers = function _syncSerializers() {
+    var parent = this._serializersParent;
+    if (parent === null) {
+        return;
+    }
+    parent._syncSerializers();
+    this.serializers = parent.serializers;
+    this._serializerPlan = parent._serializerPlan;
+};
+
+
 
 /**
  * Create a child logger, typically to add a few log record fields.
@@ -681,7 +1148,7 @@ Logger.prototype.addSerializers = function addSerializers(serializers) {
  * @param simple {Boolean} Optional. Set to true to assert that `options`
  *    (a) only add fields (no config) and (b) no serialization handling is
  *    required for them. IOW, this is a fast path for frequent child
- *    creation. See 'tools/timechild.js' for numbers.
+ *    creation. See `node tools/bench.js child` for numbers.
  */
 Logger.prototype.child = function (options, simple) {
     return new (this.constructor)(this, options || {}, simple);
@@ -707,8 +1174,11 @@ Logger.prototype.child = function (options, simple) {
  */
 Logger.prototype.reopenFileStreams = function () {
     var self = this;
+    self._syncStreams();
     self.streams.forEach(function (s) {
-        if (s.type === 'file') {
+        if (s.type === 'buffered-file') {
+            s.stream.reopen();
+        } else if (s.type === 'file') {
             if (s.stream) {
                 // Not sure if typically would want this, or more immediate
                 // `s.stream.destroy()`.
@@ -718,11 +1188,86 @@ Logger.prototype.reopenFileStreams = function () {
             }
             s.stream = fs.createWriteStream(s.path,
                 {flags: 'a', encoding: 'utf8'});
+            if (s.format === 'binary') {
+                s.stream = new BinaryStream(s.stream);
+            }
             s.stream.on('error', function (err) {
                 self.emit('error', err, s);
             });
+            if (s.queue) {
+                s.queue.setStream(s.stream);
+            }
+        }
+    });
+};
+
+
+/**
+ * Wait for all log records written so far to be written out by this
+ * logger's streams: records queued because a stream isn't keeping up (see
+ * the `highWaterMark` stream option), buffered by a 'buffered-file',
+ * 'worker', 'tcp', 'udp' or 'unix' stream, or buffered by a node.js writable
+ * stream. Summaries of records suppressed by the `limits` option are logged
+ * first.
+ *
+ * @param cb {Function} Optional. `function ()` called when all streams have
+ *    been flushed. If not given, a Promise is returned.
+ */
+Logger.prototype.flush = function flush(cb) {
+    var self = this;
+    if (!cb && typeof (Promise) === 'function') {
+        return new Promise(function (resolve) {
+            self.flush(resolve);
+        });
+    }
+    if (self._limits !== null) {
+        self._limits.flushSummaries();
+    }
+    self._syncStreams();
+
+    var streams = [];
+    var entries = [];
+    self.streams.forEach(function (s) {
+        if (streams.indexOf(s.stream) === -1) {
+            streams.push(s.stream);
+            entries.push(s);
+        }
+    });
+
+    var remaining = entries.length + 1;
+    function done() {
+        remaining--;
+        if (remaining === 0 && cb) {
+            cb();
+        }
+    }
+    entries.forEach(function (s) {
+        if (s.queue) {
+            s.queue.flush(function () {
+                flushStream(s, done);
+            });
+        } else {
+            flushStream(s, done);
         }
     });
+    setImmediate(done);
+};
+
+
+/**
+ * Return this logger's metrics (shared with its parent and child loggers),
+ * or null if the `metrics` option wasn't used. See `LoggerMetrics`.
+ *
+ * @returns {Object} with `records` (by level name), `bytes`,
+ *    `stringifyFallbacks` (`safeCycles` and `safeJsonStringify`),
+ *    `serializerErrors`, `writesReturnedFalse`, `streams` (an array of the
+ *    `name`, `records`, `bytes`, `writesReturnedFalse` and, for a
+ *    'rotating-file' stream, `rotations` of each stream written to), and
+ *    `timings` (`count`, `totalNs` and `maxNs` of the sampled `mkRecord`
+ *    and `emit` times).
+ */
+Logger.prototype.metrics = function metrics() {
+    return (this._metrics !== null ? this._metrics.snapshot() : null);
 };
 
 
@@ -763,15 +1308,18 @@ Logger.prototype.close = function () {
  *    log.level('info')     // can use 'info' et al aliases
  */
 Logger.prototype.level = function level(value) {
+    this._syncStreams();
     if (value === undefined) {
         return this._level;
     }
     var newLevel = resolveLevel(value);
+    this._ownStreams();
     var len = this.streams.length;
     for (var i = 0; i < len; i++) {
         this.streams[i].level = newLevel;
     }
     this._level = newLevel;
+    this._dispatch = null;
 }
 
 
@@ -808,38 +1356,40 @@ Logger.prototype.level = function level(value) {
  * @throws {Error} If there is no stream with the given name.
  */
 Logger.prototype.levels = function levels(name, value) {
+    this._syncStreams();
     if (name === undefined) {
         assert.equal(value, undefined);
         return this.streams.map(
             function (s) { return s.level });
     }
-    var stream;
+    var idx;
     if (typeof (name) === 'number') {
-        stream = this.streams[name];
-        if (stream === undefined) {
+        if (this.streams[name] === undefined) {
             throw new Error('invalid stream index: ' + name);
         }
+        idx = name;
     } else {
         var len = this.streams.length;
         for (var i = 0; i < len; i++) {
-            var s = this.streams[i];
-            if (s.name === name) {
-                stream = s;
+            if (this.streams[i].name === name) {
+                idx = i;
                 break;
             }
         }
-        if (!stream) {
+        if (idx === undefined) {
             throw new Error(format('no stream with name "%s"', name));
         }
     }
     if (value === undefined) {
-        return stream.level;
+        return this.streams[idx].level;
     } else {
         var newLevel = resolveLevel(value);
-        stream.level = newLevel;
+        this._ownStreams();
+        this.streams[idx].level = newLevel;
         if (newLevel < this._level) {
             this._level = newLevel;
         }
+        this._dispatch = null;
     }
 }
 
@@ -854,30 +1404,18 @@ Logger.prototype.levels = function levels(name, value) {
  *    keys to NOT apply a serializer.
  */
 Logger.prototype._applySerializers = function (fields, excludeFields) {
-    var self = this;
-
-    xxx('_applySerializers: excludeFields', excludeFields);
-
-    // Check each serializer against these (presuming number of serializers
-    // is typically less than number of fields).
-    Object.keys(this.serializers).forEach(function (name) {
-        if (fields[name] === undefined ||
-            (excludeFields && excludeFields[name]))
+    var plan = this._serializerPlan;
+    var names = Object.keys(fields);
+    for (var i = 0; i < names.length; i++) {
+        var name = names[i];
+        if (plan.fns[name] !== undefined && fields[name] !== undefined &&
+            !(excludeFields && excludeFields[name]))
         {
-            return;
-        }
-        xxx('_applySerializers; apply to "%s" key', name)
-        try {
-            fields[name] = self.serializers[name](fields[name]);
-        } catch (err) {
-            _warn(format('bunyan: ERROR: Exception thrown from the "%s" '
-                + 'Bunyan serializer. This should never happen. This is a bug '
-                + 'in that serializer function.\n%s',
-                name, err.stack || err));
-            fields[name] = format('(Error in Bunyan log "%s" serializer '
-                + 'broke field. See stderr for details.)', name);
+            xxx('_applySerializers; apply to "%s" key', name)
+            fields[name] = applySerializer(plan, name, fields[name],
+                this._metrics);
         }
-    });
+    }
 }
 
 
@@ -889,109 +1427,438 @@ Logger.prototype._applySerializers = function (fields, excludeFields) {
  *      and just return the JSON string.
  */
 Logger.prototype._emit = function (rec, noemit) {
-    var i;
-
-    // Lazily determine if this Logger has non-'raw' streams. If there are
-    // any, then we need to stringify the log record.
-    if (this.haveNonRawStreams === undefined) {
-        this.haveNonRawStreams = false;
-        for (i = 0; i < this.streams.length; i++) {
-            if (!this.streams[i].raw) {
-                this.haveNonRawStreams = true;
-                break;
-            }
-        }
-    }
-
     // Stringify the object (creates a warning str on error).
     var str;
-    if (noemit || this.haveNonRawStreams) {
-        str = fastAndSafeJsonStringify(rec) + os.EOL;
+    if (noemit || this._dispatchFor(rec.level).str) {
+        str = fastAndSafeJsonStringify(rec, this._metrics) + os.EOL;
     }
 
     if (noemit)
         return str;
 
-    var level = rec.level;
-    for (i = 0; i < this.streams.length; i++) {
-        var s = this.streams[i];
-        if (s.level <= level) {
-            xxx('writing log rec "%s" to "%s" stream (%d <= %d): %j',
-                rec.msg, s.type, s.level, level, rec);
-            s.stream.write(s.raw ? rec : str);
-        }
-    };
-
+    this._write(rec.level, str, rec, null);
     return str;
 }
 
 
 /**
- * Build a record object suitable for emitting from the arguments
- * provided to the a log emitter.
+ * Write a log record to the streams enabled for its level: the JSON string
+ * `str` to non-raw streams, and the record object to raw streams.
+ *
+ * @param level {Number} The log record level.
+ * @param str {String} The JSON-stringified log record.
+ * @param rec {log record} The log record object, or null to lazily build it
+ *      from `parts` (see `mkRecordParts`) only if a raw stream needs it.
+ * @param parts {Object} The record parts, if `rec` is null.
  */
-function mkRecord(log, minLevel, args) {
-    var excludeFields, fields, msgArgs;
-    if (args[0] instanceof Error) {
-        // `log.<level>(err, ...)`
-        fields = {
-            // Use this Logger's err serializer, if defined.
-            err: (log.serializers && log.serializers.err
-                ? log.serializers.err(args[0])
-                : Logger.stdSerializers.err(args[0]))
-        };
-        excludeFields = {err: true};
-        if (args.length === 1) {
-            msgArgs = [fields.err.message];
-        } else {
-            msgArgs = args.slice(1);
+Logger.prototype._write = function (level, str, rec, parts) {
+    var streams = this._dispatchFor(level).streams;
+    var metrics = this._metrics;
+    if (metrics !== null) {
+        metrics.records[level] = (metrics.records[level] || 0) + 1;
+    }
+    for (var i = 0; i < streams.length; i++) {
+        var s = streams[i];
+        if (s.raw && rec === null) {
+            rec = recordFromParts(this, parts);
         }
-    } else if (typeof (args[0]) !== 'object' || Array.isArray(args[0])) {
-        // `log.<level>(msg, ...)`
-        fields = null;
-        msgArgs = args.slice();
-    } else if (Buffer.isBuffer(args[0])) {  // `log.<level>(buf, ...)`
-        // Almost certainly an error, show `inspect(buf)`. See bunyan
-        // issue #35.
-        fields = null;
-        msgArgs = args.slice();
-        msgArgs[0] = util.inspect(msgArgs[0]);
-    } else {  // `log.<level>(fields, msg, ...)`
-        fields = args[0];
-        if (fields && args.length === 1 && fields.err &&
-            fields.err instanceof Error)
-        {
-            msgArgs = [fields.err.message];
+        xxx('writing log rec "%s" to "%s" stream (%d <= %d): %j',
+            rec ? rec.msg : parts.msg, s.type, s.level, level, str);
+        var written;
+        if (s.queue !== undefined) {
+            written = s.queue.write(s.raw ? rec : str, level);
         } else {
-            msgArgs = args.slice(1);
+            written = s.stream.write(s.raw ? rec : str);
+        }
+        if (metrics !== null) {
+            metrics._countWrite(s, str, written);
+        }
+        // `flushLevel` is only set for BufferedStreams (else this
+        // comparison is with `undefined`, which is false).
+        if (level >= s.flushLevel) {
+            // A 'fatal' record is likely among the last before the
+            // process dies, so don't wait for an async write.
+            if (level >= FATAL) {
+                s.stream.flushSync();
+            } else {
+                s.stream.flush();
+            }
         }
     }
+}
 
-    // Build up the record object.
-    var rec = objCopy(log.fields);
-    var level = rec.level = minLevel;
-    var recFields = (fields ? objCopy(fields) : null);
-    if (recFields) {
-        if (log.serializers) {
-            log._applySerializers(recFields, excludeFields);
+
+/**
+ * Compile a logger's serializers into a plan for applying them to log record
+ * fields. A plan is built when serializers are added and is shared by child
+ * loggers that share their parent's serializers.
+ *
+ * @param serializers (Object) Mapping of field name to serializer function.
+ * @param memoize (Boolean|Array) Whether to cache serialized object values
+ *    for all fields (true) or just the named fields (Array).
+ * @returns {Object} with `fns` (a prototype-less mapping of field name to
+ *    serializer) and `memos` (a mapping of field name to a WeakMap of
+ *    serialized values, for memoized fields, or null).
+ */
+function compileSerializers(serializers, memoize) {
+    var fns = Object.create(null);
+    var memos = null;
+    var names = Object.keys(serializers);
+    for (var i = 0; i < names.length; i++) {
+        var name = names[i];
+        fns[name] = serializers[name];
+        if (memoize && typeof (WeakMap) === 'function' &&
+            (memoize === true || memoize.indexOf(name) !== -1))
+        {
+            if (!memos) {
+                memos = Object.create(null);
+            }
+            memos[name] = new WeakMap();
+        }
+    }
+    return {fns: fns, memos: memos};
+}
+
+
+/**
+ * Apply the `name` serializer from the given plan to `value`.
+ *
+ * An exception from the serializer is caught and replaced with a warning
+ * string: log calls should never throw.
+ */
+function applySerializer(plan, name, value, metrics) {
+    var memo = plan.memos && plan.memos[name];
+    var memoizable = (memo && value !== null &&
+        (typeof (value) === 'object' || typeof (value) === 'function'));
+    if (memoizable) {
+        var cached = memo.get(value);
+        if (cached !== undefined) {
+            return cached;
+        }
+    }
+
+    var serialized;
+    try {
+        serialized = plan.fns[name](value);
+    } catch (err) {
+        if (metrics) {
+            metrics.serializerErrors++;
+        }
+        _warn(format('bunyan: ERROR: Exception thrown from the "%s" '
+            + 'Bunyan serializer. This should never happen. This is a bug '
+            + 'in that serializer function.\n%s',
+            name, err.stack || err));
+        return format('(Error in Bunyan log "%s" serializer '
+            + 'broke field. See stderr for details.)', name);
+    }
+    if (memoizable && serialized !== undefined) {
+        memo.set(value, serialized);
+    }
+    return serialized;
+}
+
+
+/**
+ * A function to be called to get the first argument to a log emitter, only
+ * if the record is logged. See `bunyan.lazy()`.
+ */
+function Lazy(fn) {
+    this.fn = fn;
+}
+
+
+/**
+ * Parse the arguments to a log emitter into the per-call parts of a log
+ * record.
+ *
+ * @returns {Object} with `fields` (a copy of the given fields, with
+ *      serializers applied, or null) and `msg` (the formatted message).
+ *      The caller adds `level`, `time` and `src` (optional) as needed by
+ *      `recordFromParts` and `encodeRecord`.
+ */
+function mkRecordParts(log, args) {
+    var excludeFields, fields, msgArgs;
+    if (log._serializersParent !== null) {
+        log._syncSerializers();
+    }
+    if (args[0] instanceof Lazy) {
+        // `log.<level>(bunyan.lazy(function () { ... }), ...)`: only call
+        // the function if the record is logged. The result replaces it in
+        // `args`, so the function is called at most once.
+        args[0] = args[0].fn();
+    }
+    if (args[0] instanceof Error) {
+        // `log.<level>(err, ...)`
+        fields = {
+            // Use this Logger's err serializer, if defined.
+            err: (log.serializers && log.serializers.err
+                ? log.serializers.err(args[0])
+                : Logger.stdSerializers.err(args[0]))
+        };
+        excludeFields = {err: true};
+        if (args.length === 1) {
+            msgArgs = [fields.err.message];
+        } else {
+            msgArgs = args.slice(1);
+        }
+    } else if (typeof (args[0]) !== 'object' || Array.isArray(args[0])) {
+        // `log.<level>(msg, ...)`
+        fields = null;
+        msgArgs = args.slice();
+    } else if (Buffer.isBuffer(args[0])) {  // `log.<level>(buf, ...)`
+        // Almost certainly an error, show `inspect(buf)`. See bunyan
+        // issue #35.
+        fields = null;
+        msgArgs = args.slice();
+        msgArgs[0] = util.inspect(msgArgs[0]);
+    } else {  // `log.<level>(fields, msg, ...)`
+        fields = args[0];
+        if (fields && args.length === 1 && fields.err &&
+            fields.err instanceof Error)
+        {
+            msgArgs = [fields.err.message];
+        } else {
+            msgArgs = args.slice(1);
+        }
+    }
+
+    // Copy the fields, applying serializers as we go. Only the fields
+    // present are visited.
+    var recFields = null;
+    if (fields) {
+        recFields = {};
+        var plan = log._serializerPlan;
+        var fns = plan && plan.fns;
+        var names = Object.keys(fields);
+        for (var i = 0; i < names.length; i++) {
+            var name = names[i];
+            var value = fields[name];
+            if (fns && fns[name] !== undefined && value !== undefined &&
+                !(excludeFields && excludeFields[name]))
+            {
+                value = applySerializer(plan, name, value, log._metrics);
+            }
+            recFields[name] = value;
         }
-        Object.keys(recFields).forEach(function (k) {
+    }
+    return {
+        level: null,
+        fields: recFields,
+        msg: format.apply(log, msgArgs),
+        time: null,
+        src: null
+    };
+}
+
+
+/**
+ * Build a record object from the given record parts.
+ */
+function recordFromParts(log, parts) {
+    var rec = objCopy(log.fields);
+    rec.level = parts.level;
+    var recFields = parts.fields;
+    if (recFields) {
+        for (var k in recFields) {
             rec[k] = recFields[k];
-        });
+        }
     }
-    rec.msg = format.apply(log, msgArgs);
+    rec.msg = parts.msg;
     if (!rec.time) {
-        rec.time = (new Date());
+        rec.time = parts.time || (new Date());
     }
     // Get call source info
     if (log.src && !rec.src) {
-        rec.src = getCaller3Info()
+        // Copy the cached caller info, so the record can be modified.
+        rec.src = objCopy(parts.src || getCaller3Info());
     }
     rec.v = LOG_VERSION;
 
     return rec;
+}
+
+
+/**
+ * Build a record object suitable for emitting from the arguments
+ * provided to the a log emitter.
+ */
+function mkRecord(log, minLevel, args) {
+    var parts = mkRecordParts(log, args);
+    parts.level = minLevel;
+    return recordFromParts(log, parts);
+};
+
+
+// Record fields set by Bunyan on every record (see `recordFromParts`).
+var CORE_FIELDS = {level: true, msg: true, time: true, src: true, v: true};
+
+/**
+ * Return the JSON for the given bound fields (`log.fields`) with the closing
+ * brace and a trailing comma, suitable for appending more fields. Returns
+ * null if these fields cannot be pre-serialized (they include a core field
+ * or a "toJSON" field, or cannot be stringified).
+ */
+function fieldsJsonPrefix(fields) {
+    for (var k in CORE_FIELDS) {
+        if (Object.prototype.hasOwnProperty.call(fields, k)) {
+            return null;
+        }
+    }
+    // `JSON.stringify` would call (or drop) it rather than output the field.
+    if (Object.prototype.hasOwnProperty.call(fields, 'toJSON')) {
+        return null;
+    }
+    var json;
+    try {
+        json = JSON.stringify(fields);
+    } catch (e) {
+        return null;
+    }
+    return (json.length > 2 ? json.slice(0, -1) + ',' : '{');
+}
+
+/**
+ * Return (and cache) the JSON prefix for this logger's bound fields. See
+ * `fieldsJsonPrefix`. A child appends the JSON for the fields it adds to its
+ * parent's prefix, unless they override a parent field.
+ */
+Logger.prototype._fieldsJsonPrefix = function _fieldsJsonPrefix() {
+    if (this._fieldsJson !== undefined) {
+        return this._fieldsJson;
+    }
+    var prefix;
+    var parent = this._fieldsParent;
+    if (!parent) {
+        prefix = fieldsJsonPrefix(this.fields);
+    } else {
+        prefix = parent._fieldsJsonPrefix();
+        var delta = this._fieldsDelta;
+        for (var k in delta) {
+            if (CORE_FIELDS[k] === true || k === 'toJSON' ||
+                parent._hasField(k))
+            {
+                prefix = undefined;
+                break;
+            }
+        }
+        if (prefix === undefined) {
+            prefix = fieldsJsonPrefix(this.fields);
+        } else if (prefix !== null) {
+            try {
+                var json = JSON.stringify(delta);
+                if (json.length > 2) {
+                    prefix += json.slice(1, -1) + ',';
+                }
+            } catch (e) {
+                prefix = null;
+            }
+        }
+    }
+    this._fieldsJson = prefix;
+    return prefix;
 };
 
+/**
+ * Stringify a log record from its parts, using the cached JSON for the
+ * logger's bound fields (`log._fieldsJsonPrefix()`). This avoids copying and
+ * re-stringifying the bound fields for every record.
+ *
+ * The result is the same string as `fastAndSafeJsonStringify` of the
+ * record built by `recordFromParts`. Returns null for the (unusual) cases
+ * that need that slower path: per-call fields that override a bound or core
+ * field, a "toJSON" field, or fields that cannot be stringified with plain
+ * `JSON.stringify`.
+ */
+function encodeRecord(log, parts) {
+    var prefix = log._fieldsJsonPrefix();
+    if (prefix === null) {
+        return null;
+    }
+
+    var str = prefix + '"level":' + parts.level;
+    var recFields = parts.fields;
+    if (recFields) {
+        for (var k in recFields) {
+            if (CORE_FIELDS[k] === true || k === 'toJSON' ||
+                log._hasField(k))
+            {
+                return null;
+            }
+        }
+        var fieldsJson;
+        try {
+            fieldsJson = JSON.stringify(recFields);
+        } catch (e) {
+            return null;
+        }
+        if (fieldsJson.length > 2) {
+            str += ',' + fieldsJson.slice(1, -1);
+        }
+    }
+    str += ',"msg":' + JSON.stringify(parts.msg)
+        + ',"time":"' + parts.time.toISOString() + '"';
+    if (parts.src) {
+        str += ',"src":' + JSON.stringify(parts.src);
+    }
+    return str + ',"v":' + LOG_VERSION + '}' + os.EOL;
+}
+
+
+/**
+ * Build and emit a log record from the arguments provided to a log emitter.
+ *
+ * @returns {String} The JSON-stringified record, if it was stringified.
+ */
+function emitArgs(log, minLevel, args) {
+    // Note: `getCaller3Info` must be called from here, the log emitter.
+    var caller = null;
+    var limits = log._limits;
+    if (limits !== null) {
+        if (limits.rate !== 0 && limits.key === 'site') {
+            caller = getCaller3Info();
+        }
+        if (!limits._allow(log, minLevel, args, caller)) {
+            return undefined;
+        }
+    }
+
+    var metrics = log._metrics;
+    var start = (metrics !== null ? metrics._timingStart() : null);
+    var parts = mkRecordParts(log, args);
+    parts.level = minLevel;
+    parts.time = new Date();
+    if (log.src) {
+        parts.src = (caller !== null ? caller : getCaller3Info());
+    }
+
+    if (start === null) {
+        return emitParts(log, minLevel, parts);
+    }
+    start = metrics._timed('mkRecord', start);
+    var str = emitParts(log, minLevel, parts);
+    metrics._timed('emit', start);
+    return str;
+}
+
+
+/**
+ * Emit a log record from its parts (see `mkRecordParts`).
+ *
+ * @returns {String} The JSON-stringified record, if it was stringified.
+ */
+function emitParts(log, minLevel, parts) {
+    if (!log._dispatchFor(minLevel).str) {
+        log._write(minLevel, undefined, recordFromParts(log, parts), null);
+        return undefined;
+    }
+    var str = encodeRecord(log, parts);
+    if (str === null) {
+        return log._emit(recordFromParts(log, parts));
+    }
+    log._write(minLevel, str, null, parts);
+    return str;
+}
+
 
 /**
  * Build an array that dtrace-provider can use to fire a USDT probe. If we've
@@ -1011,7 +1878,6 @@ function mkLogEmitter(minLevel) {
     return function () {
         var log = this;
         var str = null;
-        var rec = null;
 
         if (!this._emit) {
             /*
@@ -1029,8 +1895,18 @@ function mkLogEmitter(minLevel) {
                     dedupKey);
             }
             return;
-        } else if (arguments.length === 0) {   // `log.<level>()`
+        }
+
+        if (this._dispatchParent !== null) {
+            // A simple child: check its parent's current level, and use
+            // its current dispatch table.
+            this._syncStreams();
+        }
+        if (arguments.length === 0) {   // `log.<level>()`
             return (this._level <= minLevel);
+        } else if (this._level > minLevel && !probes) {
+            // Disabled level: return before doing any work.
+            return;
         }
 
         var msgArgs = new Array(arguments.length);
@@ -1039,8 +1915,7 @@ function mkLogEmitter(minLevel) {
         }
 
         if (this._level <= minLevel) {
-            rec = mkRecord(log, minLevel, msgArgs);
-            str = this._emit(rec);
+            str = emitArgs(log, minLevel, msgArgs);
         }
 
         if (probes) {
@@ -1058,12 +1933,17 @@ function mkLogEmitter(minLevel) {
  *    log.<level>(<Error> err, [<string> msg, ...])
  *    log.<level>(<string> msg, ...)
  *    log.<level>(<object> fields, <string> msg, ...)
+ *    log.<level>(<Lazy> bunyan.lazy(getFields), <string> msg, ...)
  *
  * where <level> is the lowercase version of the log level. E.g.:
  *
  *    log.info()
  *
  * @params fields {Object} Optional set of additional fields to log.
+ * @params getFields {Function} Alternatively, a function returning the
+ *    fields (or an Error, or the message), wrapped with `bunyan.lazy()`.
+ *    It is only called if the level is enabled, so expensive fields cost
+ *    nothing when it isn't.
  * @params msg {String} Log message. This can be followed by additional
  *    arguments that are handled like
  *    [util.format](http://nodejs.org/docs/latest/api/all.html#util.format).
@@ -1207,13 +2087,19 @@ var safeCycles = typeof (Set) !== 'undefined' ? safeCyclesSet : safeCyclesArray;
  * error (e.g. JSON cycle detection exception) it falls back to safe stringify
  * handlers that can deal with cycles and/or getter exceptions.
  */
-function fastAndSafeJsonStringify(rec) {
+function fastAndSafeJsonStringify(rec, metrics) {
     try {
         return JSON.stringify(rec);
     } catch (ex) {
+        if (metrics) {
+            metrics.stringifyFallbacks.safeCycles++;
+        }
         try {
             return JSON.stringify(rec, safeCycles());
         } catch (e) {
+            if (metrics) {
+                metrics.stringifyFallbacks.safeJsonStringify++;
+            }
             if (safeJsonStringify) {
                 return safeJsonStringify(rec);
             } else {
@@ -1269,26 +2155,54 @@ RotatingFileStream = function RotatingFileStream(options) {
         }
         this.periodNum = Number(m[1]);
         this.periodScope = m[2];
-    } else {
+    } else if (options.size == null) {
         this.periodNum = 1;
         this.periodScope = 'd';
+    } else {
+        // Only size-based rotation.
+        this.periodNum = null;
+        this.periodScope = null;
+    }
+
+    // Parse `options.size`: a number of bytes, or <number><unit> where unit
+    // is one of 'k', 'm' or 'g' (optionally followed by 'b').
+    this.size = null;
+    if (options.size != null) {
+        var sm = /^([1-9][0-9]*)([kmg]?)b?$/i.exec(String(options.size));
+        if (!sm) {
+            throw new Error(format('invalid size: "%s"', options.size));
+        }
+        this.size = Number(sm[1]) * {
+            '': 1,
+            'k': 1024,
+            'm': 1024 * 1024,
+            'g': 1024 * 1024 * 1024
+        }[sm[2].toLowerCase()];
     }
 
+    // Whether to gzip rotated files (to "<path>.<n>.gz").
+    this.gzip = Boolean(options.gzip);
+
     var lastModified = null;
+    this.bytes = 0;     // Bytes written to the current file.
     try {
         var fileInfo = fs.statSync(this.path);
         lastModified = fileInfo.mtime.getTime();
+        this.bytes = fileInfo.size;
     }
     catch (err) {
         // file doesn't exist
     }
     var rotateAfterOpen = false;
-    if (lastModified) {
+    if (lastModified && this.periodScope) {
         var lastRotTime = this._calcRotTime(0);
         if (lastModified < lastRotTime) {
             rotateAfterOpen = true;
         }
     }
+    if (this.size && this.bytes >= this.size) {
+        rotateAfterOpen = true;
+    }
 
     // TODO: template support for backup files
     // template: <path to which to rotate>
@@ -1306,16 +2220,27 @@ RotatingFileStream = function RotatingFileStream(options) {
     //                          prior art? Want to avoid ':' in
     //                          filenames (illegal on Windows for one).
 
-    this.stream = fs.createWriteStream(this.path,
-        {flags: 'a', encoding: 'utf8'});
-
-    this.rotQueue = [];
+    EventEmitter.call(this);
+    this._needDrain = false;
+    this._openStream();
+
+    // Rotated files waiting to be moved into place as "<path>.0" (see
+    // `_moveBackups`).
+    this._toMove = [];
+    this._moving = false;
+    // Number of rotations started but not yet moved into place.
+    this._pending = 0;
+    // Rotations done, and the time (ms) from starting each to its rotated
+    // file being in place.
+    this.rotations = {count: 0, totalMs: 0, maxMs: 0};
+    this._rotId = 0;
     this.rotating = false;
+    if (this.periodScope) {
+        this._setupNextRot();
+    }
     if (rotateAfterOpen) {
         this._debug('rotateAfterOpen -> call rotate()');
         this.rotate();
-    } else {
-        this._setupNextRot();
     }
 }
 
@@ -1336,6 +2261,22 @@ RotatingFileStream.prototype._debug = function () {
     }
 };
 
+RotatingFileStream.prototype._openStream = function _openStream() {
+    var self = this;
+    var stream = fs.createWriteStream(this.path,
+        {flags: 'a', encoding: 'utf8'});
+    stream.on('drain', function () {
+        if (stream === self.stream && self._needDrain) {
+            self._needDrain = false;
+            self.emit('drain');
+        }
+    });
+    stream.on('error', function (err) {
+        self.emit('error', err);
+    });
+    this.stream = stream;
+};
+
 RotatingFileStream.prototype._setupNextRot = function () {
     this.rotAt = this._calcRotTime(1);
     this._setRotationTimer();
@@ -1352,8 +2293,16 @@ RotatingFileStream.prototype._setRotationTimer = function () {
     }
     this.timeout = setTimeout(
         function () {
+            // If rotation period is > ~25 days, we have to break into
+            // multiple setTimeout's. See
+            // <https://github.com/joyent/node/issues/8656>.
+            if (self.rotAt > Date.now()) {
+                self._setRotationTimer();
+                return;
+            }
             self._debug('_setRotationTimer timeout -> call rotate()');
             self.rotate();
+            self._setupNextRot();
         },
         delay);
     if (typeof (this.timeout.unref) === 'function') {
@@ -1451,93 +2400,211 @@ function _calcRotTime(periodOffset) {
     return rotAt;
 };
 
+/**
+ * Rotate the log file: "<path>" is moved to "<path>.0" ("<path>.0.gz", if
+ * gzipping), the existing "<path>.<n>" to "<path>.<n+1>", and the oldest
+ * beyond `count` are deleted.
+ *
+ * To not hold up writes, the current file is first renamed (to a temporary
+ * name) and a new file opened at "<path>". Writes go to the renamed file
+ * until the new one is open. Then the backups are moved (and the rotated file
+ * compressed) in the background.
+ */
 RotatingFileStream.prototype.rotate = function rotate() {
-    // XXX What about shutdown?
     var self = this;
 
-    // If rotation period is > ~25 days, we have to break into multiple
-    // setTimeout's. See <https://github.com/joyent/node/issues/8656>.
-    if (self.rotAt && self.rotAt > Date.now()) {
-        return self._setRotationTimer();
-    }
-
     this._debug('rotate');
     if (self.rotating) {
-        throw new TypeError('cannot start a rotation when already rotating');
+        // A size-triggered rotation can race a timed one: the file was just
+        // rotated, so skip this one.
+        return;
     }
     self.rotating = true;
+    self._pending++;
+    var start = Date.now();
+
+    var tmpPath = format('%s.%d.%d.rotating', self.path, process.pid,
+        ++self._rotId);
+    if (typeof (self.stream.fd) !== 'number') {
+        // The file isn't open (or created) yet: rename once it is.
+        self.stream.once('open', rename);
+    } else {
+        rename();
+    }
 
-    self.stream.end();  // XXX can do moves sync after this? test at high rate
+    function rename() {
+        fs.rename(self.path, tmpPath, onRenamed);
+    }
 
-    function del() {
-        var toDel = self.path + '.' + String(n - 1);
-        if (n === 0) {
-            toDel = self.path;
+    function onRenamed(renameErr) {
+        var oldStream = self.stream;
+        self._openStream();
+        self.bytes = 0;
+        self.rotating = false;
+        if (self._needDrain) {
+            // The new stream isn't backed up.
+            self._needDrain = false;
+            self.emit('drain');
         }
-        n -= 1;
-        self._debug('  rm %s', toDel);
-        fs.unlink(toDel, function (delErr) {
-            //XXX handle err other than not exists
-            moves();
+        if (renameErr) {
+            if (renameErr.code !== 'ENOENT') {
+                self.emit('error', renameErr);
+            }
+            oldStream.end();
+            self._settle();
+            return;
+        }
+        oldStream.end(function () {
+            self._toMove.push({path: tmpPath, start: start});
+            self._moveBackups();
         });
     }
+};
 
-    function moves() {
-        if (self.count === 0 || n < 0) {
-            return finish();
+/**
+ * Move each rotated file in `_toMove` into place, one at a time.
+ */
+RotatingFileStream.prototype._moveBackups = function _moveBackups() {
+    var self = this;
+    if (self._moving || self._toMove.length === 0) {
+        return;
+    }
+    self._moving = true;
+    var toMove = self._toMove.shift();
+    var tmpPath = toMove.path;
+    var ext = (self.gzip ? '.gz' : '');
+
+    function backup(i) {
+        return self.path + '.' + String(i) + ext;
+    }
+
+    function done(err) {
+        if (err) {
+            self.emit('error', err);
         }
-        var before = self.path;
-        var after = self.path + '.' + String(n);
-        if (n > 0) {
-            before += '.' + String(n - 1);
+        self._moving = false;
+        var ms = Date.now() - toMove.start;
+        self.rotations.count++;
+        self.rotations.totalMs += ms;
+        if (ms > self.rotations.maxMs) {
+            self.rotations.maxMs = ms;
         }
+        self.emit('rotated');
+        self._settle();
+        self._moveBackups();
+    }
+
+    if (self.count === 0) {
+        fs.unlink(tmpPath, function () {
+            done();
+        });
+        return;
+    }
+
+    // Delete the oldest, then move the others up one, from the end.
+    var n = self.count - 1;
+    self._debug('  rm %s', backup(n));
+    fs.unlink(backup(n), function () {
+        moves();
+    });
+
+    function moves() {
         n -= 1;
-        fs.exists(before, function (exists) {
-            if (!exists) {
-                moves();
+        if (n < 0) {
+            finish();
+            return;
+        }
+        self._debug('  mv %s %s', backup(n), backup(n + 1));
+        mv(backup(n), backup(n + 1), function (mvErr) {
+            if (mvErr && mvErr.code !== 'ENOENT') {
+                done(mvErr);
             } else {
-                self._debug('  mv %s %s', before, after);
-                mv(before, after, function (mvErr) {
-                    if (mvErr) {
-                        self.emit('error', mvErr);
-                        finish(); // XXX finish here?
-                    } else {
-                        moves();
-                    }
-                });
+                moves();
             }
-        })
+        });
     }
 
     function finish() {
-        self._debug('  open %s', self.path);
-        self.stream = fs.createWriteStream(self.path,
-            {flags: 'a', encoding: 'utf8'});
-        var q = self.rotQueue, len = q.length;
-        for (var i = 0; i < len; i++) {
-            self.stream.write(q[i]);
+        if (!self.gzip) {
+            self._debug('  mv %s %s', tmpPath, backup(0));
+            mv(tmpPath, backup(0), done);
+            return;
         }
-        self.rotQueue = [];
-        self.rotating = false;
-        self.emit('drain');
-        self._setupNextRot();
+        // Compression is done by zlib on the libuv threadpool, not on the
+        // main thread.
+        self._debug('  gzip %s %s', tmpPath, backup(0));
+        var called = false;
+        function gzipDone(err) {
+            if (called) {
+                return;
+            }
+            called = true;
+            if (err) {
+                done(err);
+            } else {
+                fs.unlink(tmpPath, function () {
+                    done();
+                });
+            }
+        }
+        var input = fs.createReadStream(tmpPath);
+        var output = fs.createWriteStream(backup(0));
+        input.on('error', gzipDone);
+        output.on('error', gzipDone);
+        output.on('close', function () {
+            gzipDone();
+        });
+        input.pipe(require('zlib').createGzip()).pipe(output);
     }
+};
 
-    var n = this.count;
-    del();
+RotatingFileStream.prototype._settle = function _settle() {
+    this._pending--;
+    if (this._pending === 0) {
+        this.emit('idle');
+    }
 };
 
-RotatingFileStream.prototype.write = function write(s) {
-    if (this.rotating) {
-        this.rotQueue.push(s);
-        return false;
-    } else {
-        return this.stream.write(s);
+RotatingFileStream.prototype.write = function write(s, cb) {
+    if (this.size) {
+        this.bytes += (typeof (s) === 'string'
+            ? Buffer.byteLength(s, 'utf8') : s.length);
+    }
+    var ok = this.stream.write(s, cb);
+    if (!ok) {
+        this._needDrain = true;
     }
+    if (this.size && this.bytes >= this.size) {
+        this.rotate();
+    }
+    return ok;
 };
 
-RotatingFileStream.prototype.end = function end(s) {
-    this.stream.end();
+RotatingFileStream.prototype.end = function end(s, cb) {
+    if (typeof (s) === 'function') {
+        cb = s;
+        s = null;
+    }
+    if (this.timeout) {
+        clearTimeout(this.timeout);
+    }
+    if (s) {
+        this.write(s);
+    }
+    // Don't call back until in-flight rotations have been moved into place.
+    var self = this;
+    this.stream.end(function () {
+        if (self._pending === 0) {
+            if (cb) {
+                cb();
+            }
+            return;
+        }
+        self.once('idle', function () {
+            // A rotation in flight opened a new stream: close it too.
+            self.stream.end(cb);
+        });
+    });
 };
 
 RotatingFileStream.prototype.destroy = function destroy(s) {
@@ -1553,34 +2620,1689 @@ RotatingFileStream.prototype.destroySoon = function destroySoon(s) {
 
 
 /**
- * RingBuffer is a Writable Stream that just stores the last N records in
- * memory.
- *
- * @param options {Object}, with the following fields:
- *
- *    - limit: number of records to keep in memory
+ * Call `cb` when the given stream entry's stream has written out what has
+ * been written to it so far, as best as can be determined.
+ */
+function flushStream(s, cb) {
+    var stream = s.stream;
+    if (stream instanceof BufferedStream || stream instanceof WorkerStream ||
+        stream instanceof NetworkStream)
+    {
+        stream.flush(cb);
+    } else if (RotatingFileStream && stream instanceof RotatingFileStream ||
+        stream instanceof BinaryStream)
+    {
+        flushStream({stream: stream.stream}, cb);
+    } else if (stream.writableLength > 0 && !s.raw) {
+        // An empty write's callback is called after earlier writes are done.
+        stream.write('', cb);
+    } else {
+        setImmediate(cb);
+    }
+}
+
+
+/**
+ * StreamQueue handles backpressure for writing log records to a stream
+ * (see the `highWaterMark` and `overflow` options to `Logger.addStream`).
+ *
+ * Records are written straight through to the stream until its `write()`
+ * returns false. Then, until the stream emits 'drain', records are queued,
+ * up to `highWaterMark` records. When the queue is full the `overflow` policy
+ * decides what to do with a new record:
+ *
+ * - 'drop-oldest': drop the oldest queued record
+ * - 'drop-newest': drop the new record
+ * - 'drop-by-level': drop the oldest record of the lowest level queued (or
+ *   the new record, if its level is lower), so that e.g. TRACE and DEBUG
+ *   records are shed before WARN and above
+ * - 'spill': append records to the file at `spillPath` (up to
+ *   `spillMaxBytes`), and write them to the stream once it drains
+ *
+ * When the backlog has been written, a count of dropped records is reported
+ * with `onDropped(count, levelCounts)`, which returns a record to write to
+ * the stream.
+ *
+ * @param stream {Writable} The stream to write to. Backpressure can only be
+ *    handled for streams that emit 'drain' events.
+ * @param options {Object}, with the following fields:
+ *    - highWaterMark: max number of records to queue (default 1000)
+ *    - overflow: one of the policies above (default 'drop-oldest')
+ *    - spillPath: file path for the 'spill' policy
+ *    - spillMaxBytes: max size of the spill file (default 64MiB)
+ *    - onDropped: `function (count, levelCounts)` returning a record to
+ *      write to the stream, or null
+ */
+function StreamQueue(stream, options) {
+    this.stream = stream;
+    this.highWaterMark = (options.highWaterMark == null
+        ? 1000 : options.highWaterMark);
+    assert.ok(typeof (this.highWaterMark) === 'number' &&
+        this.highWaterMark >= 0,
+        format('invalid stream "highWaterMark": %j', this.highWaterMark));
+    this.overflow = options.overflow || 'drop-oldest';
+    assert.ok(OVERFLOW_POLICIES[this.overflow],
+        format('invalid stream "overflow": %j', this.overflow));
+    if (this.overflow === 'spill') {
+        assert.ok(options.spillPath,
+            'the "spill" overflow policy requires a "spillPath"');
+    }
+    this.spillPath = options.spillPath;
+    this.spillMaxBytes = (options.spillMaxBytes == null
+        ? 64 * 1024 * 1024 : options.spillMaxBytes);
+    this.onDropped = options.onDropped;
+
+    this.canWait = (typeof (stream.once) === 'function');
+    this.blocked = false;   // Waiting for 'drain' from the stream.
+    this.records = [];      // Queued records ...
+    this.levels = [];       // ... and their levels.
+    this.dropped = 0;       // Total dropped records.
+    this._dropped = 0;      // Dropped records not yet reported.
+    this._droppedLevels = {};
+    this._spill = null;     // The spill file write stream, while spilling.
+    this._spillBytes = 0;
+    this._replaying = false;
+    this._flushCbs = [];
+
+    var self = this;
+    this._onDrain = function () {
+        self._drain();
+    };
+}
+
+var OVERFLOW_POLICIES = {
+    'drop-oldest': true,
+    'drop-newest': true,
+    'drop-by-level': true,
+    'spill': true
+};
+
+/**
+ * The number of records queued (in memory) for the stream.
+ */
+Object.defineProperty(StreamQueue.prototype, 'queued', {
+    get: function () {
+        return this.records.length;
+    }
+});
+
+/**
+ * Write a record to the stream, or queue (or spill, or drop) it if the stream
+ * is backed up.
+ *
+ * @returns {Boolean} false if the record was queued, spilled or dropped, or
+ *    if the stream's write returned false, as for a node.js stream.
+ */
+StreamQueue.prototype.write = function write(rec, level) {
+    if (!this.blocked) {
+        if (this.stream.write(rec) === false) {
+            if (this.canWait) {
+                this.blocked = true;
+                this.stream.once('drain', this._onDrain);
+            }
+            return false;
+        }
+        return true;
+    }
+
+    if (this._spill) {
+        this._spillWrite(rec, level);
+    } else if (this.records.length < this.highWaterMark) {
+        this.records.push(rec);
+        this.levels.push(level);
+    } else {
+        switch (this.overflow) {
+        case 'spill':
+            if (!this._replaying) {
+                this._spill = fs.createWriteStream(this.spillPath,
+                    {flags: 'w', encoding: 'utf8'});
+                this._spill.on('error', function () {
+                    // Ignore: there is nowhere to report this. The spilled
+                    // records are lost.
+                });
+                this._spillBytes = 0;
+                this._spillWrite(rec, level);
+                break;
+            }
+            // While replaying spilled records, new ones cannot be spilled
+            // (they must come after). Fall back to dropping the oldest.
+            this._drop(this.levels[0]);
+            this.records.shift();
+            this.levels.shift();
+            this.records.push(rec);
+            this.levels.push(level);
+            break;
+        case 'drop-oldest':
+            this._drop(this.levels[0]);
+            this.records.shift();
+            this.levels.shift();
+            this.records.push(rec);
+            this.levels.push(level);
+            break;
+        case 'drop-newest':
+            this._drop(level);
+            break;
+        case 'drop-by-level':
+            var lowest = level;
+            var i;
+            for (i = 0; i < this.levels.length; i++) {
+                if (this.levels[i] < lowest) {
+                    lowest = this.levels[i];
+                }
+            }
+            this._drop(lowest);
+            if (lowest === level) {
+                break;
+            }
+            i = this.levels.indexOf(lowest);
+            this.records.splice(i, 1);
+            this.levels.splice(i, 1);
+            this.records.push(rec);
+            this.levels.push(level);
+            break;
+        default:
+            throw new TypeError('unknown overflow policy: ' + this.overflow);
+        }
+    }
+    return false;
+};
+
+StreamQueue.prototype._drop = function _drop(level) {
+    this.dropped++;
+    this._dropped++;
+    var name = nameFromLevel[level] || String(level);
+    this._droppedLevels[name] = (this._droppedLevels[name] || 0) + 1;
+};
+
+StreamQueue.prototype._spillWrite = function _spillWrite(rec, level) {
+    var size = Buffer.byteLength(rec, 'utf8');
+    if (this._spillBytes + size > this.spillMaxBytes) {
+        this._drop(level);
+        return;
+    }
+    this._spillBytes += size;
+    this._spill.write(rec);
+};
+
+/**
+ * Write queued records until the stream wants us to wait again or there are
+ * no more. Spilled records are written after those queued in memory (which
+ * came first).
+ */
+StreamQueue.prototype._drain = function _drain() {
+    var records = this.records;
+    var levels = this.levels;
+    var i = 0;
+    var ok = true;
+    while (i < records.length && ok) {
+        ok = (this.stream.write(records[i]) !== false);
+        i++;
+    }
+    records.splice(0, i);
+    levels.splice(0, i);
+    if (!ok) {
+        this.stream.once('drain', this._onDrain);
+        return;
+    }
+    if (this._spill) {
+        this._replay();
+        return;
+    }
+    if (this._replaying) {
+        return;
+    }
+
+    this.blocked = false;
+    if (this._dropped > 0) {
+        var dropRec = this.onDropped && this.onDropped(this._dropped,
+            this._droppedLevels);
+        this._dropped = 0;
+        this._droppedLevels = {};
+        if (dropRec != null && this.stream.write(dropRec) === false) {
+            this.blocked = true;
+            this.stream.once('drain', this._onDrain);
+            return;
+        }
+    }
+    var cbs = this._flushCbs;
+    this._flushCbs = [];
+    for (i = 0; i < cbs.length; i++) {
+        cbs[i]();
+    }
+};
+
+/**
+ * Write the spilled records to the stream. New records are queued in
+ * memory meanwhile.
+ */
+StreamQueue.prototype._replay = function _replay() {
+    var self = this;
+    var spill = this._spill;
+    this._spill = null;
+    this._replaying = true;
+
+    spill.end(function () {
+        var rs = fs.createReadStream(self.spillPath, {encoding: 'utf8'});
+        rs.on('data', function (chunk) {
+            if (self.stream.write(chunk) === false) {
+                rs.pause();
+                self.stream.once('drain', function () {
+                    rs.resume();
+                });
+            }
+        });
+        var done = false;
+        function finish() {
+            if (done) {
+                return;
+            }
+            done = true;
+            fs.unlink(self.spillPath, function () {
+                self._replaying = false;
+                self._drain();
+            });
+        }
+        rs.on('error', finish);
+        rs.on('end', finish);
+    });
+};
+
+
+/**
+ * Switch to writing to the given stream, e.g. after a file is reopened.
+ */
+StreamQueue.prototype.setStream = function setStream(stream) {
+    if (this.canWait) {
+        this.stream.removeListener('drain', this._onDrain);
+    }
+    this.stream = stream;
+    this.canWait = (typeof (stream.once) === 'function');
+    if (this.blocked && !this._replaying) {
+        this._drain();
+    }
+};
+
+/**
+ * Call `cb` once all queued records have been written to the stream.
+ */
+StreamQueue.prototype.flush = function flush(cb) {
+    if (this.blocked) {
+        this._flushCbs.push(cb);
+    } else {
+        setImmediate(cb);
+    }
+};
+
+
+
+/**
+ * BufferedStream is a Writable Stream that coalesces many small writes (one
+ * per log record) into few large ones. Written strings are accumulated and
+ * flushed when (a) the buffered data reaches `bufferSize` bytes, (b) every
+ * `flushInterval` ms, (c) a log record at or above the stream's `flushLevel`
+ * is written (handled by `Logger.prototype._emit`) or (d) synchronously on
+ * process exit.
+ *
+ * There are two modes:
+ * - With `path`, BufferedStream owns a file opened for appending. Records are
+ *   serialized into a reusable Buffer, which is written to the fd with a
+ *   synchronous write when flushed, so there is about one `write(2)` per
+ *   `bufferSize` bytes of log output. Being synchronous, a flush on a
+ *   'fatal' record or on process exit is never racing an earlier write.
+ * - With `stream`, BufferedStream wraps any writable stream and calls its
+ *   `write()` once per batch of records.
+ *
+ * @param options {Object}, with the following fields:
+ *
+ *    - path: file path to which to append, or
+ *    - stream: a writable stream to wrap
+ *    - bufferSize: number of bytes to buffer before flushing (default 64k)
+ *    - flushInterval: max ms to hold buffered data, 0 to disable (default
+ *      1000)
+ */
+function BufferedStream(options) {
+    assert.ok(options && (options.path || options.stream),
+        'BufferedStream requires a "path" or "stream" option');
+    assert.ok(!(options.path && options.stream),
+        'BufferedStream cannot have both "path" and "stream" options');
+
+    this.path = options.path;
+    this.stream = options.stream;
+    this.bufferSize = (options.bufferSize == null
+        ? 64 * 1024 : options.bufferSize);
+    assert.ok(typeof (this.bufferSize) === 'number' && this.bufferSize > 0,
+        format('invalid BufferedStream "bufferSize": %j', this.bufferSize));
+    this.flushInterval = (options.flushInterval == null
+        ? 1000 : options.flushInterval);
+    assert.ok(typeof (this.flushInterval) === 'number' &&
+        this.flushInterval >= 0,
+        format('invalid BufferedStream "flushInterval": %j',
+            this.flushInterval));
+
+    this.writable = true;
+    this.len = 0;           // Number of bytes (or chars) currently buffered.
+    if (this.path) {
+        this.fd = fs.openSync(this.path, 'a');
+        this.buf = allocBuffer(this.bufferSize);
+    } else {
+        assert.ok(isWritable(this.stream),
+            '"stream" stream is not writable: ' + util.inspect(this.stream));
+        this._chunks = [];
+        this._needDrain = false;
+    }
+
+    EventEmitter.call(this);
+
+    if (this.flushInterval) {
+        var self = this;
+        this.timer = setInterval(function () {
+            self.flush();
+        }, this.flushInterval);
+        if (typeof (this.timer.unref) === 'function') {
+            this.timer.unref();
+        }
+    }
+    _flushOnExitStreams.push(this);
+}
+
+util.inherits(BufferedStream, EventEmitter);
+
+BufferedStream.prototype.write = function write(s) {
+    if (!this.writable) {
+        throw (new Error('BufferedStream has been ended already'));
+    }
+    if (typeof (s) !== 'string') {
+        s = String(s);
+    }
+
+    if (!this.buf) {
+        this._chunks.push(s);
+        this.len += s.length;
+        if (this.len >= this.bufferSize) {
+            this.flush();
+        }
+        return !this._needDrain;
+    }
+
+    var size = Buffer.byteLength(s, 'utf8');
+    if (this.len + size > this.buf.length) {
+        this.flush();
+        if (size > this.buf.length) {
+            // Larger than the whole buffer: write it out on its own.
+            this._writeFd(bufferFrom(s), size);
+            return true;
+        }
+    }
+    this.len += this.buf.write(s, this.len, 'utf8');
+    if (this.len >= this.buf.length) {
+        this.flush();
+    }
+    return true;
+};
+
+/**
+ * Write out all buffered data. With `stream`, this returns without waiting
+ * for the wrapped stream's write to complete.
+ *
+ * @param cb {Function} Optional. `function ()` called when the data has been
+ *    written.
+ */
+BufferedStream.prototype.flush = function flush(cb) {
+    if (this.len > 0) {
+        if (!this.buf) {
+            var data = this._chunks.join('');
+            this._chunks = [];
+            this.len = 0;
+            if (this.stream.write(data) === false &&
+                typeof (this.stream.once) === 'function' && !this._needDrain)
+            {
+                var self = this;
+                this._needDrain = true;
+                this.stream.once('drain', function () {
+                    self._needDrain = false;
+                    self.emit('drain');
+                });
+            }
+        } else {
+            var len = this.len;
+            this.len = 0;
+            this._writeFd(this.buf, len);
+        }
+    }
+
+    if (cb) {
+        if (!this.buf) {
+            flushStream({stream: this.stream}, cb);
+        } else {
+            setImmediate(cb);
+        }
+    }
+};
+
+BufferedStream.prototype._writeFd = function _writeFd(buf, len) {
+    if (this.fd == null) {
+        return;
+    }
+    var off = 0;
+    while (off < len) {
+        try {
+            off += fs.writeSync(this.fd, buf, off, len - off);
+        } catch (err) {
+            if (err.code === 'EAGAIN') {
+                continue;
+            }
+            this.emit('error', err);
+            break;
+        }
+    }
+};
+
+/**
+ * Synchronously write out all buffered data. This is used on process exit
+ * and for 'fatal' records, when the process may not get another turn of the
+ * event loop. (With `path` every flush is synchronous.)
+ */
+BufferedStream.prototype.flushSync = function flushSync() {
+    this.flush();
+};
+
+/**
+ * Close and reopen the file (in `path` mode). See
+ * `Logger.prototype.reopenFileStreams`.
+ */
+BufferedStream.prototype.reopen = function reopen() {
+    if (!this.path || !this.writable) {
+        return;
+    }
+    this.flush();
+    var oldFd = this.fd;
+    this.fd = fs.openSync(this.path, 'a');
+    fs.close(oldFd, function () {});
+};
+
+BufferedStream.prototype.end = function end() {
+    if (arguments.length > 0 && arguments[0] != null &&
+        typeof (arguments[0]) !== 'function') {
+        this.write(arguments[0]);
+    }
+    if (!this.writable) {
+        return;
+    }
+    this.flush();
+    this.writable = false;
+    if (this.timer) {
+        clearInterval(this.timer);
+        this.timer = null;
+    }
+    var idx = _flushOnExitStreams.indexOf(this);
+    if (idx !== -1) {
+        _flushOnExitStreams.splice(idx, 1);
+    }
+    this._close();
+};
+
+BufferedStream.prototype._close = function _close() {
+    if (this.buf) {
+        if (this.fd != null) {
+            var self = this;
+            fs.close(this.fd, function () {
+                self.emit('close');
+            });
+            this.fd = null;
+        }
+    } else {
+        this.emit('close');
+    }
+};
+
+BufferedStream.prototype.destroy = function destroy() {
+    this.end();
+};
+
+BufferedStream.prototype.destroySoon = function destroySoon() {
+    this.end();
+};
+
+/**
+ * WorkerStream is a Writable Stream that hands serialized log records to a
+ * dedicated worker thread (see "worker-stream.js"), which owns the file (or
+ * rotating file) I/O. This keeps disk stalls and file rotation off of the
+ * main event loop.
+ *
+ * Records are batched for each turn of the event loop and each batch is
+ * transferred (not copied) to the worker. The number of records handed to
+ * the worker but not yet written is bounded by `queueSize`. When the queue
+ * is full the `overflow` policy applies:
+ *
+ *    - 'drop-newest' (the default): drop the record being written.
+ *    - 'drop-oldest': drop the oldest record not yet handed to the worker.
+ *    - 'block': synchronously wait (up to `blockTimeout` ms) for the worker to
+ *      catch up, then drop the record if it still hasn't.
+ *
+ * The `dropped` and `queued` properties count dropped and currently queued
+ * records.
+ *
+ * @param options {Object}, with the following fields:
+ *
+ *    - path: file path to which to log
+ *    - period, count, size: Optional. If any of these is given, the worker
+ *      writes to a RotatingFileStream with these options.
+ *    - gzip: Optional. Passed to the RotatingFileStream, i.e. only used with
+ *      `period`, `count` or `size`.
+ *    - queueSize: max number of queued records (default 10000)
+ *    - overflow: one of the policies above (default 'drop-newest')
+ *    - blockTimeout: max ms to synchronously wait for the worker, for the
+ *      'block' policy and on process exit (default 1000)
+ *    - batchSize: number of chars at which to send a batch to the worker
+ *      without waiting for the end of the event loop turn (default 64k)
+ */
+function WorkerStream(options) {
+    assert.ok(worker_threads,
+        'WorkerStream is not supported: missing "worker_threads" module');
+    assert.ok(options && options.path, 'WorkerStream requires a "path"');
+
+    this.path = options.path;
+    this.queueSize = (options.queueSize == null ? 10000 : options.queueSize);
+    assert.ok(typeof (this.queueSize) === 'number' && this.queueSize > 0,
+        format('invalid WorkerStream "queueSize": %j', this.queueSize));
+    this.overflow = options.overflow || 'drop-newest';
+    assert.ok(WORKER_OVERFLOW_POLICIES[this.overflow],
+        format('invalid WorkerStream "overflow": %j', this.overflow));
+    this.blockTimeout = (options.blockTimeout == null
+        ? 1000 : options.blockTimeout);
+    this.batchSize = (options.batchSize == null
+        ? 64 * 1024 : options.batchSize);
+
+    this.writable = true;
+    this.dropped = 0;
+    this._batch = [];
+    this._batchLen = 0;
+    this._sendScheduled = false;
+    this._flushId = 0;
+    this._flushCbs = {};
+    this._numFlushCbs = 0;
+    // Slot 0 is the number of records handed to the worker, but not yet
+    // written. It is decremented by the worker.
+    this._queued = new Int32Array(new SharedArrayBuffer(4));
+
+    EventEmitter.call(this);
+
+    var rotating = (options.period != null || options.count != null ||
+        options.size != null);
+    assert.ok(!rotating || mv, 'rotating WorkerStream is not supported: '
+        + 'missing "mv" module');
+
+    var self = this;
+    this.worker = new worker_threads.Worker(__dirname + '/worker-stream.js', {
+        workerData: {
+            path: options.path,
+            rotating: rotating,
+            period: options.period,
+            count: options.count,
+            size: options.size,
+            gzip: options.gzip,
+            queued: this._queued.buffer
+        }
+    });
+    this.worker.on('message', function onWorkerMessage(msg) {
+        self._onMessage(msg);
+    });
+    this.worker.on('error', function onWorkerError(err) {
+        self.emit('error', err);
+    });
+    this.worker.on('exit', function onWorkerExit() {
+        self.writable = false;
+        self._unregister();
+        self.emit('close');
+    });
+    // Don't keep the process alive just for logging. (This must be after
+    // adding the 'message' listener, which refs the worker.)
+    this.worker.unref();
+    _flushOnExitStreams.push(this);
+}
+
+util.inherits(WorkerStream, EventEmitter);
+
+var WORKER_OVERFLOW_POLICIES = {
+    'drop-newest': true,
+    'drop-oldest': true,
+    'block': true
+};
+
+Object.defineProperty(WorkerStream.prototype, 'queued', {
+    get: function () {
+        return Atomics.load(this._queued, 0) + this._batch.length;
+    }
+});
+
+WorkerStream.prototype.write = function write(s) {
+    if (!this.writable) {
+        throw (new Error('WorkerStream has been ended already'));
+    }
+    if (Atomics.load(this._queued, 0) + this._batch.length >= this.queueSize &&
+        !this._makeRoom())
+    {
+        this.dropped++;
+        return false;
+    }
+
+    this._batch.push(s);
+    this._batchLen += s.length;
+    if (this._batchLen >= this.batchSize) {
+        this._send();
+    } else if (!this._sendScheduled) {
+        var self = this;
+        this._sendScheduled = true;
+        setImmediate(function sendBatch() {
+            self._sendScheduled = false;
+            self._send();
+        });
+    }
+    return true;
+};
+
+/**
+ * Apply the overflow policy for a full queue. Returns true if there is now
+ * room for another record.
+ */
+WorkerStream.prototype._makeRoom = function _makeRoom() {
+    switch (this.overflow) {
+    case 'drop-oldest':
+        if (this._batch.length === 0) {
+            // Everything queued is already with the worker.
+            return false;
+        }
+        this._batchLen -= this._batch.shift().length;
+        this.dropped++;
+        return true;
+    case 'block':
+        this._send();
+        this._waitForWorker(this.queueSize - 1, this.blockTimeout);
+        return (Atomics.load(this._queued, 0) < this.queueSize);
+    default:
+        return false;
+    }
+};
+
+/**
+ * Synchronously wait for the worker to get the number of queued records down
+ * to `target`, or for `timeout` ms.
+ */
+WorkerStream.prototype._waitForWorker = function _waitForWorker(target,
+                                                                timeout) {
+    var deadline = Date.now() + timeout;
+    var n;
+    while ((n = Atomics.load(this._queued, 0)) > target) {
+        var remaining = deadline - Date.now();
+        if (remaining <= 0) {
+            break;
+        }
+        Atomics.wait(this._queued, 0, n, remaining);
+    }
+};
+
+WorkerStream.prototype._send = function _send() {
+    var n = this._batch.length;
+    if (n === 0) {
+        return;
+    }
+    var str = (n === 1 ? this._batch[0] : this._batch.join(''));
+    this._batch = [];
+    this._batchLen = 0;
+
+    var data = new ArrayBuffer(Buffer.byteLength(str, 'utf8'));
+    Buffer.from(data).write(str, 0, 'utf8');
+    Atomics.add(this._queued, 0, n);
+    this.worker.postMessage({type: 'write', data: data, count: n}, [data]);
+};
+
+WorkerStream.prototype._onMessage = function _onMessage(msg) {
+    switch (msg.type) {
+    case 'flushed':
+        var cb = this._flushCbs[msg.id];
+        delete this._flushCbs[msg.id];
+        this._numFlushCbs--;
+        if (this._numFlushCbs === 0) {
+            this.worker.unref();
+        }
+        cb();
+        break;
+    case 'error':
+        var err = new Error(msg.message);
+        err.code = msg.code;
+        err.stack = msg.stack;
+        this.emit('error', err);
+        break;
+    default:
+        break;
+    }
+};
+
+/**
+ * Wait for all records written so far to be written out by the worker.
+ *
+ * @param cb {Function} Optional. `function ()` called when done. If not
+ *    given, a Promise is returned.
+ */
+WorkerStream.prototype.flush = function flush(cb) {
+    var self = this;
+    if (!cb && typeof (Promise) === 'function') {
+        return new Promise(function (resolve) {
+            self.flush(resolve);
+        });
+    }
+    if (!this.writable) {
+        if (cb) {
+            setImmediate(cb);
+        }
+        return;
+    }
+    this._send();
+    var id = ++this._flushId;
+    this._flushCbs[id] = cb || function () {};
+    if (this._numFlushCbs === 0) {
+        this.worker.ref();  // Keep the process alive until flushed.
+    }
+    this._numFlushCbs++;
+    this.worker.postMessage({type: 'flush', id: id});
+};
+
+/**
+ * Synchronously wait (up to `blockTimeout` ms) for all records written so
+ * far to be written out by the worker. This is used on process exit.
+ */
+WorkerStream.prototype.flushSync = function flushSync() {
+    if (!this.writable) {
+        return;
+    }
+    this._send();
+    this._waitForWorker(0, this.blockTimeout);
+};
+
+/**
+ * Flush all records, close the file and stop the worker.
+ *
+ * @param cb {Function} Optional. `function ()` called when closed. If not
+ *    given, a Promise is returned.
+ */
+WorkerStream.prototype.close = function close(cb) {
+    var self = this;
+    if (!cb && typeof (Promise) === 'function') {
+        return new Promise(function (resolve) {
+            self.close(resolve);
+        });
+    }
+    if (!this.writable) {
+        if (cb) {
+            setImmediate(cb);
+        }
+        return;
+    }
+    this._send();
+    this.writable = false;
+    this._unregister();
+    this.worker.ref();
+    this.worker.once('exit', function () {
+        if (cb) {
+            cb();
+        }
+    });
+    this.worker.postMessage({type: 'close'});
+};
+
+WorkerStream.prototype._unregister = function _unregister() {
+    var idx = _flushOnExitStreams.indexOf(this);
+    if (idx !== -1) {
+        _flushOnExitStreams.splice(idx, 1);
+    }
+};
+
+WorkerStream.prototype.end = function end() {
+    if (arguments.length > 0 && arguments[0] != null &&
+        typeof (arguments[0]) !== 'function') {
+        this.write(arguments[0]);
+    }
+    this.close(function () {});
+};
+
+WorkerStream.prototype.destroy = function destroy() {
+    this.writable = false;
+    this._unregister();
+    this.worker.terminate();
+};
+
+WorkerStream.prototype.destroySoon = function destroySoon() {
+    this.end();
+};
+
+
+/**
+ * NetworkStream is a Writable Stream that sends serialized log records to a
+ * collector over TCP, UDP or a Unix domain socket, e.g. to `bunyan --listen`.
+ *
+ * Records written in the same turn of the event loop (or `flushInterval`)
+ * are sent as one batch: one socket write for 'tcp' and 'unix', one datagram
+ * (of at most `batchSize` bytes) for 'udp'. Records are newline-delimited
+ * JSON, so a batch is just a run of log lines.
+ *
+ * A 'tcp' or 'unix' stream keeps one connection open. When it is lost (or
+ * can't be made) it is retried with exponential backoff, from
+ * `reconnectMinDelay` up to `reconnectMaxDelay` ms. Meanwhile records are
+ * queued in memory, up to `queueSize` records. When the queue is full:
+ *
+ *    - with a `spoolPath`, the queued records, and those written after them,
+ *      are appended to that file (up to `spoolMaxBytes`) and sent from there
+ *      in order once reconnected. Records spooled but not sent when the
+ *      process exits are sent by the next process to use the same
+ *      `spoolPath`.
+ *    - otherwise new records are dropped.
+ *
+ * The `queued`, `spooled`, `sent` and `dropped` properties count records
+ * currently queued in memory, currently spooled to disk, handed to the OS to
+ * send, and dropped (including those a 'udp' send failed for, and, without a
+ * `spoolPath`, those still queued when the process exits). Records
+ * handed to the OS just before a connection is lost may also be lost.
+ * `connected` is whether the stream is connected, and `reconnects` counts
+ * reconnections. 'connect' and 'disconnect' (with the error, if any) events
+ * are emitted: failing to reach the collector is not an 'error'.
+ *
+ * @param options {Object}, with the following fields:
+ *
+ *    - type: 'tcp', 'udp' or 'unix'
+ *    - host: host name or IP (default '127.0.0.1'), for 'tcp' and 'udp'
+ *    - port: port number, for 'tcp' and 'udp'
+ *    - path: socket path, for 'unix'
+ *    - batchSize: max bytes of records per socket write (default 64k) or
+ *      datagram (default 1400)
+ *    - flushInterval: ms to wait to batch records, 0 to send at the end of
+ *      the current event loop turn (default 0)
+ *    - queueSize: max number of records queued in memory (default 10000)
+ *    - spoolPath: Optional. File in which to spool records that don't fit
+ *      in the queue. Not supported for 'udp'.
+ *    - spoolMaxBytes: max size of the spool file (default 64MiB)
+ *    - reconnectMinDelay, reconnectMaxDelay: ms to wait before the first
+ *      reconnection attempt, and at most between attempts (default 100 and
+ *      30000)
+ */
+function NetworkStream(options) {
+    assert.ok(options && NETWORK_STREAM_TYPES[options.type],
+        format('invalid NetworkStream "type": %j', options && options.type));
+    this.type = options.type;
+    if (this.type === 'unix') {
+        assert.ok(options.path, 'a "unix" NetworkStream requires a "path"');
+        this.path = options.path;
+    } else {
+        assert.ok(typeof (options.port) === 'number',
+            format('invalid NetworkStream "port": %j', options.port));
+        this.host = options.host || '127.0.0.1';
+        this.port = options.port;
+    }
+    this.batchSize = (options.batchSize == null
+        ? (this.type === 'udp' ? 1400 : 64 * 1024) : options.batchSize);
+    assert.ok(typeof (this.batchSize) === 'number' && this.batchSize > 0,
+        format('invalid NetworkStream "batchSize": %j', this.batchSize));
+    this.flushInterval = options.flushInterval || 0;
+    this.queueSize = (options.queueSize == null ? 10000 : options.queueSize);
+    assert.ok(typeof (this.queueSize) === 'number' && this.queueSize > 0,
+        format('invalid NetworkStream "queueSize": %j', this.queueSize));
+    assert.ok(!(options.spoolPath && this.type === 'udp'),
+        'a "udp" NetworkStream does not support "spoolPath"');
+    this.spoolPath = options.spoolPath || null;
+    this.spoolMaxBytes = (options.spoolMaxBytes == null
+        ? 64 * 1024 * 1024 : options.spoolMaxBytes);
+    this.reconnectMinDelay = (options.reconnectMinDelay == null
+        ? 100 : options.reconnectMinDelay);
+    this.reconnectMaxDelay = (options.reconnectMaxDelay == null
+        ? 30000 : options.reconnectMaxDelay);
+
+    this.writable = true;
+    this.connected = false;
+    this.reconnects = 0;
+    this.sent = 0;
+    this.dropped = 0;
+    this.spooled = 0;
+    this._records = [];     // Records queued in memory.
+    this._sendScheduled = false;
+    this._blocked = false;  // Waiting for 'drain' from the socket.
+    this._socket = null;
+    this._everConnected = false;
+    this._attempts = 0;     // Connection attempts since last connected.
+    this._reconnectTimer = null;
+    this._flushCbs = [];
+    this._closeCb = null;
+
+    // The spool file is appended to at `_spoolEnd`, and sent from
+    // `_spoolPos`. Records to append are collected in `_spoolBuf`.
+    this._spoolFd = null;
+    this._spoolPos = 0;
+    this._spoolEnd = 0;
+    this._spoolBuf = [];
+    this._spoolReading = false;
+    if (this.spoolPath) {
+        this._spoolFd = fs.openSync(this.spoolPath, 'a+');
+        this._spoolEnd = fs.fstatSync(this._spoolFd).size;
+        if (this._spoolEnd > 0) {
+            // Left by an earlier process. Count its records.
+            this.spooled = countNewlines(
+                fs.readFileSync(this.spoolPath, 'utf8'));
+        }
+    }
+
+    EventEmitter.call(this);
+
+    if (this.type === 'udp') {
+        var dgram = require('dgram' + '');
+        this._socket = dgram.createSocket(
+            require('net' + '').isIPv6(this.host) ? 'udp6' : 'udp4');
+        this._socket.on('error', function () {
+            // Ignore: errors are counted in `dropped` by `_sendDatagram`.
+        });
+        this._socket.unref();
+        this.connected = true;
+    } else {
+        this._connect();
+    }
+    _flushOnExitStreams.push(this);
+}
+
+util.inherits(NetworkStream, EventEmitter);
+
+var NETWORK_STREAM_TYPES = {tcp: true, udp: true, unix: true};
+
+function countNewlines(s) {
+    var n = 0;
+    var i = -1;
+    while ((i = s.indexOf('\n', i + 1)) !== -1) {
+        n++;
+    }
+    return n;
+}
+
+Object.defineProperty(NetworkStream.prototype, 'queued', {
+    get: function () {
+        return this._records.length;
+    }
+});
+
+NetworkStream.prototype.write = function write(s) {
+    if (!this.writable) {
+        throw (new Error('NetworkStream has been ended already'));
+    }
+    if (typeof (s) !== 'string') {
+        s = String(s);
+    }
+
+    if (this._spoolBuf.length > 0 || this._spoolPos < this._spoolEnd) {
+        // Spooling: keep records in order behind those already spooled.
+        this._spoolBuf.push(s);
+    } else if (this._records.length < this.queueSize) {
+        this._records.push(s);
+    } else if (this._spoolFd !== null) {
+        // Start spooling, with the queued records first.
+        this._spoolBuf = this._records;
+        this._spoolBuf.push(s);
+        this._records = [];
+    } else {
+        this.dropped++;
+        return false;
+    }
+    this._scheduleSend();
+    return true;
+};
+
+NetworkStream.prototype._scheduleSend = function _scheduleSend() {
+    if (this._sendScheduled) {
+        return;
+    }
+    this._sendScheduled = true;
+    var self = this;
+    function send() {
+        self._sendScheduled = false;
+        self._send();
+    }
+    if (this.flushInterval > 0) {
+        var timer = setTimeout(send, this.flushInterval);
+        if (typeof (timer.unref) === 'function') {
+            timer.unref();
+        }
+    } else {
+        setImmediate(send);
+    }
+};
+
+NetworkStream.prototype._connect = function _connect() {
+    var self = this;
+    var net = require('net' + '');
+    var socket = (this.type === 'unix'
+        ? net.createConnection({path: this.path})
+        : net.createConnection({host: this.host, port: this.port}));
+    var lastErr = null;
+    this._socket = socket;
+    socket.setKeepAlive(true);
+    // Don't keep the process alive just for logging. Pending writes (and
+    // the connection attempt) still do.
+    socket.unref();
+    socket.on('connect', function onConnect() {
+        if (!self.writable) {
+            return;
+        }
+        self.connected = true;
+        self._attempts = 0;
+        if (self._everConnected) {
+            self.reconnects++;
+        }
+        self._everConnected = true;
+        self.emit('connect');
+        self._send();
+    });
+    socket.on('drain', function onDrain() {
+        self._blocked = false;
+        self._send();
+    });
+    socket.on('error', function onError(err) {
+        lastErr = err;
+    });
+    socket.on('close', function onClose() {
+        var wasConnected = self.connected;
+        self.connected = false;
+        self._blocked = false;
+        self._socket = null;
+        if (wasConnected) {
+            self.emit('disconnect', lastErr);
+        }
+        if (self.writable) {
+            self._reconnect();
+        }
+        // Nothing more can be sent until reconnected.
+        self._callFlushCbs();
+    });
+};
+
+NetworkStream.prototype._reconnect = function _reconnect() {
+    var self = this;
+    var delay = Math.min(this.reconnectMaxDelay,
+        this.reconnectMinDelay * Math.pow(2, this._attempts));
+    this._attempts++;
+    // Add jitter, so many processes don't all reconnect at once.
+    delay = delay / 2 + Math.random() * delay / 2;
+    this._reconnectTimer = setTimeout(function () {
+        self._reconnectTimer = null;
+        self._connect();
+    }, delay);
+    if (typeof (this._reconnectTimer.unref) === 'function') {
+        this._reconnectTimer.unref();
+    }
+};
+
+/**
+ * Append records collected for the spool file to it, dropping those that
+ * don't fit in `spoolMaxBytes`.
+ */
+NetworkStream.prototype._writeSpool = function _writeSpool() {
+    var recs = this._spoolBuf;
+    this._spoolBuf = [];
+    var size = this._spoolEnd;
+    var n = 0;
+    for (; n < recs.length; n++) {
+        var len = Buffer.byteLength(recs[n], 'utf8');
+        if (size + len > this.spoolMaxBytes) {
+            break;
+        }
+        size += len;
+    }
+    this.dropped += recs.length - n;
+    if (n === 0) {
+        return;
+    }
+    var buf = bufferFrom(n < recs.length ? recs.slice(0, n).join('')
+        : recs.join(''));
+    try {
+        fs.writeSync(this._spoolFd, buf, 0, buf.length, this._spoolEnd);
+    } catch (err) {
+        this.dropped += n;
+        return;
+    }
+    this._spoolEnd += buf.length;
+    this.spooled += n;
+};
+
+/**
+ * Send what can be sent: records queued in memory first, then the spool
+ * file.
+ */
+NetworkStream.prototype._send = function _send() {
+    if (this._spoolBuf.length > 0) {
+        this._writeSpool();
+    }
+    if (!this.connected || this._blocked) {
+        return;
+    }
+    var records = this._records;
+    while (records.length > 0 && !this._blocked) {
+        var n = 0;
+        var size = 0;
+        while (n < records.length) {
+            var len = Buffer.byteLength(records[n], 'utf8');
+            if (n > 0 && size + len > this.batchSize) {
+                break;
+            }
+            size += len;
+            n++;
+        }
+        var batch = records.splice(0, n);
+        if (this.type === 'udp') {
+            this._sendDatagram(batch);
+        } else {
+            this.sent += n;
+            if (this._socket.write(batch.join('')) === false) {
+                this._blocked = true;
+            }
+        }
+    }
+    if (!this._blocked && records.length === 0) {
+        if (this._spoolPos < this._spoolEnd) {
+            this._sendSpool();
+        } else {
+            this._callFlushCbs();
+        }
+    }
+};
+
+NetworkStream.prototype._sendDatagram = function _sendDatagram(batch) {
+    var self = this;
+    var buf = bufferFrom(batch.join(''));
+    this.sent += batch.length;
+    this._socket.send(buf, 0, buf.length, this.port, this.host,
+        function onSent(err) {
+            if (err) {
+                self.sent -= batch.length;
+                self.dropped += batch.length;
+            }
+        });
+};
+
+/**
+ * Send the next chunk of the spool file: the whole records in the next
+ * `batchSize` bytes (or more, if a single record is bigger). When all of it
+ * has been sent, the file is emptied.
+ */
+NetworkStream.prototype._sendSpool = function _sendSpool(size) {
+    var self = this;
+    if (this._spoolReading) {
+        return;
+    }
+    this._spoolReading = true;
+    size = size || this.batchSize;
+    var buf = allocBuffer(Math.min(size, this._spoolEnd - this._spoolPos));
+    fs.read(this._spoolFd, buf, 0, buf.length, this._spoolPos,
+        function onRead(err, bytesRead) {
+            self._spoolReading = false;
+            if (err || bytesRead === 0 || self._spoolFd === null) {
+                return;
+            }
+            if (!self.connected) {
+                return;  // Resumed from `_spoolPos` on reconnect.
+            }
+            // Only send whole records, so that a reconnection resumes at
+            // the start of one.
+            var end = bytesRead;
+            while (end > 0 && buf[end - 1] !== 0x0a) {
+                end--;
+            }
+            if (end === 0) {
+                if (self._spoolPos + bytesRead < self._spoolEnd) {
+                    self._sendSpool(size * 2);
+                    return;
+                }
+                end = bytesRead;
+            }
+            var chunk = buf.slice(0, end);
+            var n = countNewlines(chunk.toString('utf8'));
+            self._spoolPos += end;
+            self.spooled -= n;
+            self.sent += n;
+            if (self._socket.write(chunk) === false) {
+                self._blocked = true;
+            }
+            if (self._spoolPos >= self._spoolEnd) {
+                self._spoolPos = self._spoolEnd = 0;
+                self.spooled = 0;
+                fs.ftruncateSync(self._spoolFd, 0);
+            }
+            self._send();
+        });
+};
+
+NetworkStream.prototype._callFlushCbs = function _callFlushCbs() {
+    if (this._flushCbs.length === 0) {
+        return;
+    }
+    var cbs = this._flushCbs;
+    this._flushCbs = [];
+    function done() {
+        for (var i = 0; i < cbs.length; i++) {
+            cbs[i]();
+        }
+    }
+    if (this._socket !== null && this.type !== 'udp' &&
+        this._socket.writableLength > 0)
+    {
+        // An empty write's callback is called after earlier writes are done.
+        this._socket.write('', done);
+    } else {
+        setImmediate(done);
+    }
+};
+
+/**
+ * Send all records written so far. If the stream is not connected, records
+ * stay queued (or spooled) until it is.
+ *
+ * @param cb {Function} Optional. `function ()` called when all records have
+ *    been handed to the OS to send, or the stream is not connected. If not
+ *    given, a Promise is returned.
+ */
+NetworkStream.prototype.flush = function flush(cb) {
+    var self = this;
+    if (!cb && typeof (Promise) === 'function') {
+        return new Promise(function (resolve) {
+            self.flush(resolve);
+        });
+    }
+    this._flushCbs.push(cb || function () {});
+    this._send();
+    if (!this.connected) {
+        this._callFlushCbs();
+    }
+};
+
+/**
+ * Spool records not yet sent, if there is a spool file, else count them as
+ * dropped. This is used on process exit, when the process won't get another
+ * chance to send them.
+ */
+NetworkStream.prototype.flushSync = function flushSync() {
+    if (this._spoolFd === null) {
+        // Records still queued won't be sent.
+        this.dropped += this._records.length;
+        this._records = [];
+        return;
+    }
+    // Queued records are older than any collected for the spool file.
+    this._spoolBuf = this._records.concat(this._spoolBuf);
+    this._records = [];
+    if (this._spoolBuf.length > 0) {
+        this._writeSpool();
+    }
+};
+
+/**
+ * Send all records, then close the connection (and spool file).
+ *
+ * @param cb {Function} Optional. `function ()` called when closed. If not
+ *    given, a Promise is returned.
+ */
+NetworkStream.prototype.close = function close(cb) {
+    var self = this;
+    if (!cb && typeof (Promise) === 'function') {
+        return new Promise(function (resolve) {
+            self.close(resolve);
+        });
+    }
+    if (!this.writable) {
+        if (cb) {
+            setImmediate(cb);
+        }
+        return;
+    }
+    this.flush(function () {
+        self.flushSync();
+        self.destroy();
+        if (cb) {
+            cb();
+        }
+    });
+};
+
+NetworkStream.prototype.end = function end() {
+    if (arguments.length > 0 && arguments[0] != null &&
+        typeof (arguments[0]) !== 'function') {
+        this.write(arguments[0]);
+    }
+    this.close(function () {});
+};
+
+NetworkStream.prototype.destroy = function destroy() {
+    this.writable = false;
+    var idx = _flushOnExitStreams.indexOf(this);
+    if (idx !== -1) {
+        _flushOnExitStreams.splice(idx, 1);
+    }
+    if (this._reconnectTimer !== null) {
+        clearTimeout(this._reconnectTimer);
+        this._reconnectTimer = null;
+    }
+    if (this._socket !== null) {
+        if (this.type === 'udp') {
+            this._socket.close();
+        } else if (this.connected) {
+            this._socket.end();
+        } else {
+            this._socket.destroy();
+        }
+        this._socket = null;
+    }
+    if (this._spoolFd !== null) {
+        fs.closeSync(this._spoolFd);
+        this._spoolFd = null;
+    }
+    this.emit('close');
+};
+
+NetworkStream.prototype.destroySoon = function destroySoon() {
+    this.end();
+};
+
+
+/**
+ * BinaryStream is a raw stream that writes log records, in the binary format
+ * of "binary-log.js", to a file stream: an fs.WriteStream or a
+ * RotatingFileStream. It is used for 'file' and 'rotating-file' streams with
+ * `format: 'binary'`. Each file written to (e.g. after a rotation) starts a
+ * new segment, so that it can be decoded on its own.
+ */
+function BinaryStream(stream) {
+    EventEmitter.call(this);
+    var self = this;
+    this.stream = stream;
+    this.encoder = new binaryLog.Encoder({
+        stringify: fastAndSafeJsonStringify
+    });
+    this._file = undefined;
+    stream.on('drain', function () {
+        self.emit('drain');
+    });
+    stream.on('error', function (err) {
+        self.emit('error', err);
+    });
+}
+util.inherits(BinaryStream, EventEmitter);
+
+BinaryStream.prototype.write = function write(rec) {
+    // The current file of a RotatingFileStream.
+    var file = this.stream.stream;
+    if (file !== this._file) {
+        this._file = file;
+        this.encoder.reset();
+    }
+    return this.stream.write(this.encoder.encode(rec));
+};
+
+BinaryStream.prototype.end = function end() {
+    this.stream.end.apply(this.stream, arguments);
+};
+
+BinaryStream.prototype.destroy = function destroy() {
+    this.stream.destroy();
+};
+
+BinaryStream.prototype.destroySoon = function destroySoon() {
+    if (this.stream.destroySoon) {
+        this.stream.destroySoon();
+    } else {
+        this.stream.end();
+    }
+};
+
+
+// All live BufferedStreams, WorkerStreams and NetworkStreams, to be flushed
+// on process exit.
+var _flushOnExitStreams = [];
+if (runtimeEnv === 'node') {
+    process.on('exit', function flushStreamsOnExit() {
+        for (var i = 0; i < _flushOnExitStreams.length; i++) {
+            _flushOnExitStreams[i].flushSync();
+        }
+    });
+}
+
+
+/**
+ * RingBuffer is a Writable Stream that just stores the last N records in
+ * memory.
+ *
+ * Records are stored in a fixed-size circular buffer, so writing is O(1).
+ * Optionally the total size of stored records can be bounded as well
+ * (`maxBytes`), and the stored records can be written out to another stream
+ * when a record at or above `dumpLevel` is written (`dumpTo`). The latter
+ * allows keeping, say, "trace" records in memory and only writing them out
+ * as context for an error.
+ *
+ * @param options {Object}, with the following fields:
+ *
+ *    - limit: number of records to keep in memory (default 100)
+ *    - maxBytes: Optional. Max total size of the records kept in memory, as
+ *      measured by `sizeOf`.
+ *    - sizeOf: Optional. `function (record)` returning the size of a record
+ *      for `maxBytes`. The default is the length of a string record, or of
+ *      the JSON of a record object.
+ *    - dumpTo: Optional. A writable stream to which to write the stored
+ *      records (as JSON lines) when a record at or above `dumpLevel` is
+ *      written. The stored records are then cleared.
+ *    - dumpLevel: Optional. Level at which to dump records (default
+ *      "error").
  */
 function RingBuffer(options) {
-    this.limit = options && options.limit ? options.limit : 100;
+    options = options || {};
+    this.limit = options.limit ? options.limit : 100;
+    this.maxBytes = options.maxBytes || 0;
+    this.sizeOf = options.sizeOf || ringBufferSizeOf;
+    this.dumpTo = options.dumpTo || null;
+    this.dumpLevel = resolveLevel(options.dumpLevel || ERROR);
     this.writable = true;
-    this.records = [];
+
+    this._buf = new Array(this.limit);
+    this._sizes = (this.maxBytes ? new Array(this.limit) : null);
+    this._head = 0;     // Index of the oldest record.
+    this._length = 0;   // Number of records stored.
+    this._records = null;   // The `records` array, while it is live.
+    this.bytes = 0;     // Total size of records stored (if `maxBytes`).
     EventEmitter.call(this);
 }
 
 util.inherits(RingBuffer, EventEmitter);
 
+function ringBufferSizeOf(record) {
+    if (typeof (record) === 'string') {
+        return record.length;
+    }
+    return fastAndSafeJsonStringify(record).length;
+}
+
+/**
+ * The stored records, oldest first, as an array. The array is built on
+ * first access and then returned as is until the RingBuffer next changes,
+ * so reading it in a loop is cheap. Changes made to it in the meantime
+ * (e.g. `records.length = 0`) are taken into the RingBuffer before its next
+ * operation.
+ */
+Object.defineProperty(RingBuffer.prototype, 'records', {
+    get: function () {
+        if (this._records === null) {
+            this._records = this._snapshot();
+        }
+        return this._records;
+    },
+    set: function (records) {
+        this.clear();
+        for (var i = 0; i < records.length; i++) {
+            this._push(records[i]);
+        }
+    }
+});
+
+/**
+ * The number of records stored.
+ */
+Object.defineProperty(RingBuffer.prototype, 'length', {
+    get: function () {
+        this._syncRecords();
+        return this._length;
+    }
+});
+
+/**
+ * Take the contents of the `records` array, which may have been changed,
+ * back into the circular buffer.
+ */
+RingBuffer.prototype._syncRecords = function () {
+    var records = this._records;
+    if (records === null) {
+        return;
+    }
+    this._records = null;
+    this._reset();
+    for (var i = 0; i < records.length; i++) {
+        this._push(records[i]);
+    }
+};
+
 RingBuffer.prototype.write = function (record) {
     if (!this.writable)
         throw (new Error('RingBuffer has been ended already'));
 
-    this.records.push(record);
-
-    if (this.records.length > this.limit)
-        this.records.shift();
+    if (this.dumpTo && recordLevel(record) >= this.dumpLevel) {
+        this.dump();
+    }
+    this._syncRecords();
+    this._push(record);
 
     return (true);
 };
 
+RingBuffer.prototype._push = function (record) {
+    var limit = this.limit;
+    if (this._length === limit) {
+        this._shift();
+    }
+    var idx = (this._head + this._length) % limit;
+    this._buf[idx] = record;
+    this._length++;
+
+    if (this._sizes) {
+        var size = this.sizeOf(record);
+        this._sizes[idx] = size;
+        this.bytes += size;
+        // Always keep the latest record, even if alone it is over budget.
+        while (this.bytes > this.maxBytes && this._length > 1) {
+            this._shift();
+        }
+    }
+};
+
+RingBuffer.prototype._shift = function () {
+    var head = this._head;
+    this._buf[head] = undefined;
+    if (this._sizes) {
+        this.bytes -= this._sizes[head];
+    }
+    this._head = (head + 1) % this.limit;
+    this._length--;
+};
+
+/**
+ * Call `fn(record, i)` for each stored record, oldest first.
+ */
+RingBuffer.prototype.forEach = function (fn) {
+    this._syncRecords();
+    var buf = this._buf;
+    var limit = this.limit;
+    var head = this._head;
+    var len = this._length;
+    for (var i = 0; i < len; i++) {
+        fn(buf[(head + i) % limit], i);
+    }
+};
+
+/**
+ * Return an array of the stored records, oldest first.
+ */
+RingBuffer.prototype.snapshot = function () {
+    this._syncRecords();
+    return this._snapshot();
+};
+
+RingBuffer.prototype._snapshot = function () {
+    var records = new Array(this._length);
+    this.forEach(function (record, i) {
+        records[i] = record;
+    });
+    return records;
+};
+
+if (typeof (Symbol) === 'function' && Symbol.iterator) {
+    RingBuffer.prototype[Symbol.iterator] = function () {
+        return this.snapshot()[Symbol.iterator]();
+    };
+}
+
+RingBuffer.prototype.clear = function () {
+    this._records = null;
+    this._reset();
+};
+
+RingBuffer.prototype._reset = function () {
+    this._buf = new Array(this.limit);
+    this._head = 0;
+    this._length = 0;
+    this.bytes = 0;
+};
+
+/**
+ * Write the stored records to `dumpTo` as JSON lines, oldest first, then
+ * clear them.
+ */
+RingBuffer.prototype.dump = function () {
+    var dumpTo = this.dumpTo;
+    this._syncRecords();
+    if (!dumpTo || this._length === 0) {
+        return;
+    }
+    var lines = [];
+    this.forEach(function (record) {
+        lines.push(typeof (record) === 'string'
+            ? record : fastAndSafeJsonStringify(record) + os.EOL);
+    });
+    this.clear();
+    dumpTo.write(lines.join(''));
+    this.emit('dump', lines.length);
+};
+
+/**
+ * Get the level of a record object, or of a JSON-stringified record.
+ */
+function recordLevel(record) {
+    if (typeof (record) !== 'string') {
+        return record.level;
+    }
+    // Bound fields come before the core "level" field, and could have a
+    // nested "level" of their own: only scan for it if it is unambiguous.
+    var key = '"level":';
+    var idx = record.indexOf(key);
+    if (idx === -1) {
+        return 0;
+    }
+    var start = idx + key.length;
+    if (record.indexOf(key, start) !== -1) {
+        try {
+            return JSON.parse(record).level || 0;
+        } catch (e) {
+            return 0;
+        }
+    }
+    return parseInt(record.slice(start, start + 16), 10) || 0;
+}
+
 RingBuffer.prototype.end = function () {
     if (arguments.length > 0)
         this.write.apply(this, Array.prototype.slice.call(arguments));
@@ -1597,6 +4319,534 @@ RingBuffer.prototype.destroySoon = function () {
 };
 
 
+//---- Metrics
+
+/**
+ * Counters and timings of a logger's work, enabled with the `metrics`
+ * Logger option and shared by its child loggers. See `Logger.metrics()`.
+ *
+ * @param options {Object}, with the following optional fields:
+ *
+ *    - timingSample: Time (with `process.hrtime()`) the building of one in
+ *      every `timingSample` records (`mkRecord`), and its stringifying and
+ *      writing (`emit`). Default 0, i.e. no timings.
+ *    - statsd: An object with `host` (default "127.0.0.1"), `port`
+ *      (default 8125), `prefix` (default "bunyan") and `interval` (ms,
+ *      default 10000) to send the metrics to statsd (over UDP) every
+ *      `interval` ms: counters as the increase since the last send, and
+ *      timings as their mean over that time.
+ */
+function LoggerMetrics(options) {
+    if (options.timingSample !== undefined) {
+        assert.ok(typeof (options.timingSample) === 'number' &&
+            options.timingSample >= 0,
+            'invalid metrics "timingSample": must be a number >= 0');
+    }
+
+    // Records, by level.
+    this.records = {};
+    // Bytes of records written to non-raw streams.
+    this.bytes = 0;
+    // Records that couldn't be stringified with plain `JSON.stringify`.
+    this.stringifyFallbacks = {safeCycles: 0, safeJsonStringify: 0};
+    this.serializerErrors = 0;
+    // Stream writes that returned false, i.e. that the stream is backed up.
+    this.writesReturnedFalse = 0;
+    // Counts for each stream (see `_countWrite`).
+    this._streams = [];
+
+    this.timingSample = options.timingSample || 0;
+    this._untilTiming = this.timingSample;
+    this.timings = {
+        mkRecord: {count: 0, totalNs: 0, maxNs: 0},
+        emit: {count: 0, totalNs: 0, maxNs: 0}
+    };
+
+    this._statsd = null;
+    if (options.statsd) {
+        this._startStatsd(options.statsd);
+    }
+}
+
+LoggerMetrics.prototype._countWrite = function _countWrite(s, str, written) {
+    var counts = null;
+    for (var i = 0; i < this._streams.length; i++) {
+        if (this._streams[i].stream === s.stream) {
+            counts = this._streams[i];
+            break;
+        }
+    }
+    if (counts === null) {
+        var name = s.name || s.path || s.type;
+        for (i = 0; i < this._streams.length; i++) {
+            if (this._streams[i].name === name) {
+                name += String(this._streams.length);
+                break;
+            }
+        }
+        counts = {
+            stream: s.stream,
+            name: name,
+            records: 0,
+            bytes: 0,
+            writesReturnedFalse: 0
+        };
+        this._streams.push(counts);
+    }
+
+    counts.records++;
+    if (!s.raw && str) {
+        var bytes = Buffer.byteLength(str, 'utf8');
+        counts.bytes += bytes;
+        this.bytes += bytes;
+    }
+    if (written === false) {
+        counts.writesReturnedFalse++;
+        this.writesReturnedFalse++;
+    }
+};
+
+/*
+ * Return the start time (`process.hrtime()`) if this record is to be timed,
+ * else null.
+ */
+LoggerMetrics.prototype._timingStart = function _timingStart() {
+    if (this.timingSample === 0 || --this._untilTiming > 0) {
+        return null;
+    }
+    this._untilTiming = this.timingSample;
+    return process.hrtime();
+};
+
+/*
+ * Add the time since `start` to the given timing, and return the time now.
+ */
+LoggerMetrics.prototype._timed = function _timed(name, start) {
+    var elapsed = process.hrtime(start);
+    var ns = elapsed[0] * 1e9 + elapsed[1];
+    var timing = this.timings[name];
+    timing.count++;
+    timing.totalNs += ns;
+    if (ns > timing.maxNs) {
+        timing.maxNs = ns;
+    }
+    return process.hrtime();
+};
+
+/**
+ * Return a copy of the metrics, as a plain object.
+ */
+LoggerMetrics.prototype.snapshot = function snapshot() {
+    var self = this;
+    var records = {};
+    Object.keys(this.records).forEach(function (level) {
+        records[nameFromLevel[level] || level] = self.records[level];
+    });
+    return {
+        records: records,
+        bytes: this.bytes,
+        stringifyFallbacks: objCopy(this.stringifyFallbacks),
+        serializerErrors: this.serializerErrors,
+        writesReturnedFalse: this.writesReturnedFalse,
+        streams: this._streams.map(function (counts) {
+            var stream = {
+                name: counts.name,
+                records: counts.records,
+                bytes: counts.bytes,
+                writesReturnedFalse: counts.writesReturnedFalse
+            };
+            if (counts.stream.rotations) {
+                stream.rotations = objCopy(counts.stream.rotations);
+            }
+            return stream;
+        }),
+        timings: {
+            mkRecord: objCopy(this.timings.mkRecord),
+            emit: objCopy(this.timings.emit)
+        }
+    };
+};
+
+LoggerMetrics.prototype._startStatsd = function _startStatsd(options) {
+    var self = this;
+    var socket = require('dgram' + '').createSocket('udp4');
+    socket.on('error', function () {
+        // Ignore: metrics are best effort.
+    });
+    socket.unref();
+    this._statsd = {
+        socket: socket,
+        host: options.host || '127.0.0.1',
+        port: options.port || 8125,
+        prefix: (options.prefix === undefined ? 'bunyan' : options.prefix),
+        // The counters and timings as of the last send.
+        last: {},
+        timer: setInterval(function () {
+            self.sendStatsd();
+        }, options.interval || 10000)
+    };
+    if (this._statsd.timer.unref) {
+        this._statsd.timer.unref();
+    }
+};
+
+/**
+ * Send the metrics to statsd now (see the `statsd` option).
+ */
+LoggerMetrics.prototype.sendStatsd = function sendStatsd() {
+    var statsd = this._statsd;
+    if (statsd === null) {
+        return;
+    }
+    var snapshot = this.snapshot();
+    var prefix = (statsd.prefix ? statsd.prefix + '.' : '');
+    var lines = [];
+
+    function counter(name, value) {
+        var delta = value - (statsd.last[name] || 0);
+        statsd.last[name] = value;
+        if (delta > 0) {
+            lines.push(prefix + name + ':' + delta + '|c');
+        }
+    }
+    function timing(name, count, total, unitsPerMs) {
+        var numNew = count - (statsd.last[name + '.count'] || 0);
+        var totalNew = total - (statsd.last[name + '.total'] || 0);
+        statsd.last[name + '.count'] = count;
+        statsd.last[name + '.total'] = total;
+        if (numNew > 0) {
+            lines.push(prefix + name + ':' +
+                (totalNew / numNew / unitsPerMs).toFixed(6) + '|ms');
+        }
+    }
+
+    Object.keys(snapshot.records).forEach(function (level) {
+        counter('records.' + level, snapshot.records[level]);
+    });
+    counter('bytes', snapshot.bytes);
+    counter('stringifyFallbacks.safeCycles',
+        snapshot.stringifyFallbacks.safeCycles);
+    counter('stringifyFallbacks.safeJsonStringify',
+        snapshot.stringifyFallbacks.safeJsonStringify);
+    counter('serializerErrors', snapshot.serializerErrors);
+    counter('writesReturnedFalse', snapshot.writesReturnedFalse);
+    snapshot.streams.forEach(function (stream) {
+        var name = 'streams.' + stream.name.replace(/[^\w-]+/g, '_');
+        counter(name + '.records', stream.records);
+        counter(name + '.bytes', stream.bytes);
+        counter(name + '.writesReturnedFalse', stream.writesReturnedFalse);
+        if (stream.rotations) {
+            counter(name + '.rotations', stream.rotations.count);
+            timing(name + '.rotationTime', stream.rotations.count,
+                stream.rotations.totalMs, 1);
+        }
+    });
+    Object.keys(snapshot.timings).forEach(function (name) {
+        var t = snapshot.timings[name];
+        timing('timings.' + name, t.count, t.totalNs, 1e6);
+    });
+
+    // Send as few packets as possible, each small enough not to be
+    // fragmented.
+    var packet = '';
+    for (var i = 0; i <= lines.length; i++) {
+        if (packet && (i === lines.length ||
+            packet.length + lines[i].length + 1 > 1400))
+        {
+            var buf = bufferFrom(packet);
+            statsd.socket.send(buf, 0, buf.length, statsd.port, statsd.host);
+            packet = '';
+        }
+        if (i < lines.length) {
+            packet += (packet ? '\n' : '') + lines[i];
+        }
+    }
+};
+
+/**
+ * Stop sending metrics to statsd.
+ */
+LoggerMetrics.prototype.stopStatsd = function stopStatsd() {
+    if (this._statsd !== null) {
+        clearInterval(this._statsd.timer);
+        this._statsd.socket.close();
+        this._statsd = null;
+    }
+};
+
+
+
+//---- Sampling and rate limits
+
+/**
+ * Sampling and rate limiting of a logger's records, enabled with the
+ * `limits` Logger option and shared by its child loggers. Records are
+ * dropped before anything is built for them.
+ *
+ * @param options {Object}, with the following optional fields:
+ *
+ *    - sample: An object mapping level names (or numbers) to the fraction
+ *      (0 to 1) of records at that level to keep, chosen at random. E.g.
+ *      `{trace: 0, debug: 0.01}`. Levels not given are not sampled.
+ *    - rate: The number of records per second to allow for each key (see
+ *      `key`), as a token bucket refilled at this rate. Records beyond that
+ *      are suppressed, and counted in a "N similar records suppressed"
+ *      summary record. Default: no rate limit.
+ *    - burst: The size of the token bucket, i.e. the number of records for
+ *      a key that are allowed in a burst. Default `rate` (and at least 1).
+ *    - key: What records are rate limited by: "site" (the default), the
+ *      file and line of the log call, or "msg", the level and message
+ *      template (i.e. the format string, before formatting).
+ *    - maxKeys: The number of keys to keep the rate limit state of. The
+ *      least recently used key is dropped (with a summary of its suppressed
+ *      records, if any) beyond that. Default 1000.
+ *    - summaryInterval: How often (ms) to log the summaries of suppressed
+ *      records. Default 10000.
+ */
+function LoggerLimits(options) {
+    var self = this;
+    this.sample = null;
+    if (options.sample !== undefined) {
+        assert.ok(typeof (options.sample) === 'object' &&
+            options.sample !== null,
+            'invalid limits "sample": must be an object');
+        this.sample = {};
+        Object.keys(options.sample).forEach(function (name) {
+            var fraction = options.sample[name];
+            assert.ok(typeof (fraction) === 'number' && fraction >= 0 &&
+                fraction <= 1,
+                format('invalid limits "sample" for %j: must be a number '
+                    + 'from 0 to 1', name));
+            // Object keys are strings, e.g. "50" for `{50: 0.1}`.
+            self.sample[resolveLevel(/^\d+$/.test(name) ? Number(name)
+                : name)] = fraction;
+        });
+    }
+
+    this.rate = 0;
+    if (options.rate !== undefined) {
+        assert.ok(typeof (options.rate) === 'number' && options.rate > 0,
+            'invalid limits "rate": must be a number > 0');
+        this.rate = options.rate;
+    }
+    this.burst = Math.max(this.rate, 1);
+    if (options.burst !== undefined) {
+        assert.ok(typeof (options.burst) === 'number' && options.burst >= 1,
+            'invalid limits "burst": must be a number >= 1');
+        this.burst = options.burst;
+    }
+    this.key = options.key || 'site';
+    assert.ok(this.key === 'site' || this.key === 'msg',
+        format('invalid limits "key": %j', this.key));
+    this.maxKeys = 1000;
+    if (options.maxKeys !== undefined) {
+        assert.ok(typeof (options.maxKeys) === 'number' &&
+            options.maxKeys >= 1,
+            'invalid limits "maxKeys": must be a number >= 1');
+        this.maxKeys = options.maxKeys;
+    }
+    this.summaryInterval = 10000;
+    if (options.summaryInterval !== undefined) {
+        assert.ok(typeof (options.summaryInterval) === 'number' &&
+            options.summaryInterval > 0,
+            'invalid limits "summaryInterval": must be a number > 0');
+        this.summaryInterval = options.summaryInterval;
+    }
+
+    // Records dropped by sampling, and suppressed by the rate limit.
+    this.sampledOut = 0;
+    this.suppressed = 0;
+
+    // The rate limit state for each key: an LRU, as for `callerCache`.
+    this._keys = {map: {}, head: null, tail: null, size: 0};
+    this._summaryTimer = null;
+}
+
+/*
+ * Return true if a record at `level`, from log emitter arguments `args`,
+ * should be logged. `caller` is the log call's `getCaller3Info()`, if
+ * rate limiting by "site".
+ */
+LoggerLimits.prototype._allow = function _allow(log, level, args, caller) {
+    if (this.sample !== null) {
+        var fraction = this.sample[level];
+        if (fraction !== undefined && Math.random() >= fraction) {
+            this.sampledOut++;
+            return false;
+        }
+    }
+    if (this.rate === 0) {
+        return true;
+    }
+
+    var key;
+    if (caller !== null) {
+        key = caller.file + ':' + caller.line;
+    } else {
+        key = level + ':' + msgTemplate(args);
+    }
+    var now = Date.now();
+    var entry = this._get(key);
+    if (entry === undefined) {
+        entry = this._add(key, now);
+    } else {
+        entry.tokens = Math.min(this.burst,
+            entry.tokens + (now - entry.refilled) * this.rate / 1000);
+        entry.refilled = now;
+    }
+    if (entry.tokens >= 1) {
+        entry.tokens--;
+        return true;
+    }
+
+    this.suppressed++;
+    if (entry.count === 0) {
+        entry.first = now;
+        entry.level = level;
+    } else if (level > entry.level) {
+        entry.level = level;
+    }
+    entry.count++;
+    entry.last = now;
+    entry.log = log;
+    entry.caller = caller;
+    if (entry.msg === null) {
+        entry.msg = msgTemplate(args);
+    }
+    if (this._summaryTimer === null) {
+        this._summaryTimer = setTimeout(this.flushSummaries.bind(this),
+            this.summaryInterval);
+        if (this._summaryTimer.unref) {
+            this._summaryTimer.unref();
+        }
+    }
+    return false;
+};
+
+LoggerLimits.prototype._get = function _get(key) {
+    var keys = this._keys;
+    var entry = keys.map[key];
+    if (entry !== undefined && entry !== keys.head) {
+        // Move to the front.
+        entry.prev.next = entry.next;
+        if (entry.next) {
+            entry.next.prev = entry.prev;
+        } else {
+            keys.tail = entry.prev;
+        }
+        entry.prev = null;
+        entry.next = keys.head;
+        keys.head.prev = entry;
+        keys.head = entry;
+    }
+    return entry;
+};
+
+LoggerLimits.prototype._add = function _add(key, now) {
+    var keys = this._keys;
+    var entry = {
+        key: key,
+        tokens: this.burst,
+        refilled: now,
+        // Suppressed records since the last summary.
+        count: 0,
+        first: 0,
+        last: 0,
+        level: 0,
+        log: null,
+        caller: null,
+        msg: null,
+        prev: null,
+        next: keys.head
+    };
+    if (keys.head) {
+        keys.head.prev = entry;
+    } else {
+        keys.tail = entry;
+    }
+    keys.head = entry;
+    keys.map[key] = entry;
+    if (++keys.size > this.maxKeys) {
+        var lru = keys.tail;
+        keys.tail = lru.prev;
+        keys.tail.next = null;
+        delete keys.map[lru.key];
+        keys.size--;
+        if (lru.count > 0) {
+            this._summarize(lru);
+        }
+    }
+    return entry;
+};
+
+/*
+ * Log the summary of the records suppressed for this key, with the logger
+ * that last suppressed one.
+ */
+LoggerLimits.prototype._summarize = function _summarize(entry) {
+    var log = entry.log;
+    var fields = {
+        suppressedRecords: entry.count,
+        suppressedFirst: new Date(entry.first).toISOString(),
+        suppressedLast: new Date(entry.last).toISOString()
+    };
+    if (entry.caller !== null) {
+        fields.suppressedSite = entry.caller.file + ':' + entry.caller.line;
+    }
+    fields.suppressedMsg = entry.msg;
+    var count = entry.count;
+    var level = entry.level;
+    var caller = entry.caller;
+    entry.count = 0;
+    entry.log = entry.caller = entry.msg = null;
+
+    log._syncStreams();
+    if (log._level <= level) {
+        var parts = mkRecordParts(log,
+            [fields, '%d similar records suppressed', count]);
+        parts.level = level;
+        parts.time = new Date();
+        if (log.src && caller !== null) {
+            parts.src = caller;
+        }
+        emitParts(log, level, parts);
+    }
+};
+
+/**
+ * Log the summaries of all records suppressed so far. This is done every
+ * `summaryInterval` ms while records are being suppressed, and by
+ * `Logger.flush()`.
+ */
+LoggerLimits.prototype.flushSummaries = function flushSummaries() {
+    if (this._summaryTimer !== null) {
+        clearTimeout(this._summaryTimer);
+        this._summaryTimer = null;
+    }
+    for (var entry = this._keys.tail; entry !== null; entry = entry.prev) {
+        if (entry.count > 0) {
+            this._summarize(entry);
+        }
+    }
+};
+
+
+/*
+ * The message template of log emitter arguments `args`: the format string
+ * of `log.<level>([fields|err,] msg, ...)`, before formatting.
+ */
+function msgTemplate(args) {
+    if (typeof (args[0]) === 'string') {
+        return args[0];
+    } else if (typeof (args[1]) === 'string') {
+        return args[1];
+    } else if (args[0] instanceof Error && args.length === 1) {
+        return args[0].message;
+    }
+    return '';
+}
+
+
 //---- Exports
 
 module.exports = Logger;
@@ -1618,7 +4868,18 @@ module.exports.createLogger = function createLogger(options) {
     return new Logger(options);
 };
 
+module.exports.lazy = function lazy(fn) {
+    if (typeof (fn) !== 'function') {
+        throw new TypeError('fn (function) is required');
+    }
+    return new Lazy(fn);
+};
+
 module.exports.RingBuffer = RingBuffer;
+module.exports.BufferedStream = BufferedStream;
+module.exports.WorkerStream = WorkerStream;
+module.exports.NetworkStream = NetworkStream;
+module.exports.BinaryStream = BinaryStream;
 module.exports.RotatingFileStream = RotatingFileStream;
 
 // Useful for custom `type == 'raw'` streams that may do JSON stringification
@@ -0,0 +1,115 @@
+/**
+ * Copyright 2026 Trent Mick
+ *
+ * The worker thread side of a bunyan 'worker' stream (see `WorkerStream` in
+ * "bunyan.js"). This thread owns the file I/O: it receives batches of
+ * serialized log records from the main thread, writes them to a file or
+ * RotatingFileStream, and decrements the shared "queued" counter as each
+ * batch is written.
+ *
+ * Messages from the main thread:
+ *    {type: 'write', data: <ArrayBuffer>, count: <num records>}
+ *    {type: 'flush', id: <id>}     -> replies {type: 'flushed', id: <id>}
+ *    {type: 'close'}               -> closes the file and exits
+ *
+ * -*- mode: js -*-
+ * vim: expandtab:ts=4:sw=4
+ */
+
+var fs = require('fs');
+var worker_threads = require('worker_threads');
+
+var bunyan = require('./bunyan');
+
+
+var parentPort = worker_threads.parentPort;
+var opts = worker_threads.workerData;
+var queued = new Int32Array(opts.queued);
+
+var out;
+var queue = [];     // Messages waiting for the current write to complete.
+var busy = false;
+
+
+function reportError(err) {
+    parentPort.postMessage({
+        type: 'error',
+        message: err.message,
+        code: err.code,
+        stack: err.stack
+    });
+}
+
+/**
+ * Write the buffer to `out` and call `cb` when it has been written.
+ */
+function writeOut(buf, cb) {
+    out.write(buf, function () {
+        cb();
+    });
+}
+
+function processQueue() {
+    while (!busy && queue.length > 0) {
+        var msg = queue.shift();
+        switch (msg.type) {
+        case 'write':
+            // Coalesce any other queued batches into a single write.
+            var bufs = [Buffer.from(msg.data)];
+            var count = msg.count;
+            while (queue.length > 0 && queue[0].type === 'write') {
+                msg = queue.shift();
+                bufs.push(Buffer.from(msg.data));
+                count += msg.count;
+            }
+            busy = true;
+            writeBatch(bufs.length === 1 ? bufs[0] : Buffer.concat(bufs),
+                count);
+            break;
+        case 'flush':
+            // All earlier writes have completed.
+            parentPort.postMessage({type: 'flushed', id: msg.id});
+            break;
+        case 'close':
+            busy = true;
+            closeOut();
+            break;
+        default:
+            break;
+        }
+    }
+}
+
+function writeBatch(buf, count) {
+    writeOut(buf, function () {
+        Atomics.sub(queued, 0, count);
+        Atomics.notify(queued, 0);
+        busy = false;
+        processQueue();
+    });
+}
+
+function closeOut() {
+    out.end(function () {
+        parentPort.close();
+    });
+}
+
+
+if (opts.rotating) {
+    out = new bunyan.RotatingFileStream({
+        path: opts.path,
+        period: opts.period,
+        count: opts.count,
+        size: opts.size,
+        gzip: opts.gzip
+    });
+} else {
+    out = fs.createWriteStream(opts.path, {flags: 'a'});
+}
+out.on('error', reportError);
+
+parentPort.on('message', function (msg) {
+    queue.push(msg);
+    processQueue();
+});
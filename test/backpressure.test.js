@@ -0,0 +1,257 @@
+/*
+ * Copyright 2020 Trent Mick
+ *
+ * Test stream backpressure handling: the `highWaterMark` and `overflow`
+ * stream options, and `log.flush()`.
+ */
+
+var EventEmitter = require('events').EventEmitter;
+var fs = require('fs');
+var os = require('os');
+var path = require('path');
+var util = require('util');
+var test = require('tap').test;
+
+var bunyan = require('../lib/bunyan');
+
+
+/*
+ * A stream that accepts `capacity` writes, then returns false until
+ * `drain()` is called.
+ */
+function SlowStream(capacity) {
+    EventEmitter.call(this);
+    this.capacity = capacity;
+    this.pending = 0;
+    this.writes = [];
+}
+util.inherits(SlowStream, EventEmitter);
+
+SlowStream.prototype.write = function (s) {
+    this.writes.push(s);
+    this.pending++;
+    return (this.pending < this.capacity);
+};
+
+SlowStream.prototype.drain = function () {
+    this.pending = 0;
+    this.emit('drain');
+};
+
+// Stop applying backpressure.
+SlowStream.prototype.release = function () {
+    this.capacity = Infinity;
+    this.drain();
+};
+
+SlowStream.prototype.msgs = function () {
+    return this.writes.map(function (s) {
+        return (typeof (s) === 'string' ? JSON.parse(s) : s).msg;
+    });
+};
+
+function createLogger(stream, options) {
+    var s = {stream: stream, level: 'trace'};
+    Object.keys(options).forEach(function (k) {
+        s[k] = options[k];
+    });
+    return bunyan.createLogger({name: 'backpressure', streams: [s]});
+}
+
+
+test('no backpressure handling by default', function (t) {
+    var stream = new SlowStream(1);
+    var log = createLogger(stream, {});
+    for (var i = 0; i < 10; i++) {
+        log.info('%d', i);
+    }
+    t.equal(stream.writes.length, 10);
+    t.equal(log.streams[0].queue, undefined);
+    t.end();
+});
+
+
+test('overflow: drop-oldest', function (t) {
+    var stream = new SlowStream(2);
+    var log = createLogger(stream, {highWaterMark: 3});
+    var queue = log.streams[0].queue;
+    for (var i = 0; i < 10; i++) {
+        log.info('%d', i);
+    }
+    t.deepEqual(stream.msgs(), ['0', '1']);
+    t.equal(queue.queued, 3);
+    t.equal(queue.dropped, 5);
+
+    stream.release();
+    var msgs = stream.msgs();
+    t.deepEqual(msgs.slice(0, 5), ['0', '1', '7', '8', '9']);
+    t.equal(msgs.length, 6);
+    var dropRec = JSON.parse(stream.writes[5]);
+    t.equal(dropRec.level, bunyan.WARN);
+    t.equal(dropRec.droppedRecords, 5);
+    t.deepEqual(dropRec.droppedLevels, {info: 5});
+    t.equal(queue.queued, 0);
+    t.equal(queue.blocked, false);
+
+    // Unblocked: writes go straight through.
+    log.info('after');
+    t.equal(stream.msgs()[6], 'after');
+    t.end();
+});
+
+
+test('overflow: drop-newest', function (t) {
+    var stream = new SlowStream(1);
+    var log = createLogger(stream, {highWaterMark: 2, overflow: 'drop-newest'});
+    for (var i = 0; i < 5; i++) {
+        log.info('%d', i);
+    }
+    stream.release();
+    t.deepEqual(stream.msgs().slice(0, 3), ['0', '1', '2']);
+    t.equal(JSON.parse(stream.writes[3]).droppedRecords, 2);
+    t.end();
+});
+
+
+test('overflow: drop-by-level', function (t) {
+    var stream = new SlowStream(1);
+    var log = createLogger(stream, {
+        highWaterMark: 3,
+        overflow: 'drop-by-level',
+        type: 'raw'
+    });
+    log.info('first');
+    log.debug('d1');
+    log.warn('w1');
+    log.trace('t1');
+    log.error('e1');    // drops t1
+    log.info('i1');     // drops d1
+    log.trace('t2');    // dropped itself
+    log.fatal('f1');    // drops i1
+    t.deepEqual(stream.msgs(), ['first']);
+
+    stream.release();
+    var msgs = stream.msgs();
+    t.deepEqual(msgs.slice(0, 4), ['first', 'w1', 'e1', 'f1']);
+    var dropRec = stream.writes[4];
+    t.equal(dropRec.droppedRecords, 4);
+    t.deepEqual(dropRec.droppedLevels, {trace: 2, debug: 1, info: 1});
+    t.end();
+});
+
+
+test('overflow: spill', function (t) {
+    var spillPath = path.join(os.tmpdir(),
+        'bunyan-backpressure-spill-' + process.pid + '.log');
+    var stream = new SlowStream(1);
+    var log = createLogger(stream, {
+        highWaterMark: 2,
+        overflow: 'spill',
+        spillPath: spillPath
+    });
+    for (var i = 0; i < 10; i++) {
+        log.info('%d', i);
+    }
+    t.deepEqual(stream.msgs(), ['0']);
+    t.equal(log.streams[0].queue.queued, 2);
+
+    log.flush(function () {
+        var msgs = stream.writes.join('').trim().split('\n').map(
+            function (line) { return JSON.parse(line).msg; });
+        t.deepEqual(msgs,
+            ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', 'late']);
+        t.equal(log.streams[0].queue.dropped, 0);
+        t.notOk(fs.existsSync(spillPath), 'spill file removed');
+        t.end();
+    });
+    stream.drain();
+    log.info('late');
+    setTimeout(function () {
+        stream.release();
+    }, 100);
+});
+
+
+test('queued writes return false', function (t) {
+    var stream = new SlowStream(2);
+    var log = bunyan.createLogger({
+        name: 'backpressure',
+        metrics: true,
+        streams: [ {stream: stream, level: 'trace', highWaterMark: 2} ]
+    });
+    var queue = log.streams[0].queue;
+    t.equal(queue.write('{"msg":"0"}\n', bunyan.INFO), true);
+    t.equal(queue.write('{"msg":"1"}\n', bunyan.INFO), false, 'backed up');
+    t.equal(queue.write('{"msg":"2"}\n', bunyan.INFO), false, 'queued');
+    stream.release();
+
+    // Records queued (or dropped) are counted as backed up writes.
+    stream.capacity = 1;
+    for (var i = 0; i < 5; i++) {
+        log.info('%d', i);
+    }
+    t.equal(log.metrics().writesReturnedFalse, 5);
+    t.end();
+});
+
+
+test('invalid backpressure options', function (t) {
+    var stream = new SlowStream(1);
+    t.throws(function () {
+        createLogger(stream, {overflow: 'bogus'});
+    }, new RegExp('invalid stream "overflow"'));
+    t.throws(function () {
+        createLogger(stream, {highWaterMark: -1});
+    }, new RegExp('invalid stream "highWaterMark"'));
+    t.throws(function () {
+        createLogger(stream, {overflow: 'spill'});
+    }, new RegExp('requires a "spillPath"'));
+    t.end();
+});
+
+
+test('log.flush() waits for queued records', function (t) {
+    var stream = new SlowStream(1);
+    var log = createLogger(stream, {highWaterMark: 10});
+    log.info('one');
+    log.info('two');
+    var flushed = false;
+    log.flush(function () {
+        flushed = true;
+        t.deepEqual(stream.msgs(), ['one', 'two']);
+    });
+    setTimeout(function () {
+        t.equal(flushed, false);
+        stream.release();
+        setImmediate(function () {
+            t.equal(flushed, true);
+            t.end();
+        });
+    }, 50);
+});
+
+
+test('log.flush() returns a promise', function (t) {
+    if (typeof (Promise) !== 'function') {
+        t.end();
+        return;
+    }
+    var logPath = path.join(os.tmpdir(),
+        'bunyan-backpressure-flush-' + process.pid + '.log');
+    var log = bunyan.createLogger({
+        name: 'backpressure',
+        streams: [
+            {type: 'buffered-file', path: logPath, flushInterval: 0},
+            {type: 'file', path: logPath + '.2'}
+        ]
+    });
+    log.info('hi');
+    log.flush().then(function () {
+        t.equal(JSON.parse(fs.readFileSync(logPath, 'utf8')).msg, 'hi');
+        t.equal(JSON.parse(fs.readFileSync(logPath + '.2', 'utf8')).msg, 'hi');
+        log.streams.forEach(function (s) { s.stream.end(); });
+        fs.unlinkSync(logPath);
+        fs.unlinkSync(logPath + '.2');
+        t.end();
+    });
+});
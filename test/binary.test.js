@@ -0,0 +1,259 @@
+/*
+ * Copyright 2020 Trent Mick
+ *
+ * Test the binary record format ("lib/binary-log.js") and streams with
+ * `format: 'binary'`.
+ */
+
+var fs = require('fs');
+var os = require('os');
+var path = require('path');
+var zlib = require('zlib');
+var test = require('tap').test;
+
+var binaryLog = require('../lib/binary-log');
+var bunyan = require('../lib/bunyan');
+
+
+var tmpDir = path.join(os.tmpdir(), 'bunyan-binary-' + process.pid);
+
+function setup() {
+    if (!fs.existsSync(tmpDir)) {
+        fs.mkdirSync(tmpDir);
+    }
+}
+
+function teardown() {
+    fs.readdirSync(tmpDir).forEach(function (name) {
+        fs.unlinkSync(path.join(tmpDir, name));
+    });
+    fs.rmdirSync(tmpDir);
+}
+
+function decode(data) {
+    var recs = [];
+    var decoder = new binaryLog.Decoder();
+    decoder.write(data, function (rec) {
+        recs.push(rec);
+    });
+    return recs;
+}
+
+function readRecords(file) {
+    var data = fs.readFileSync(file);
+    if (/\.gz$/.test(file)) {
+        data = zlib.gunzipSync(data);
+    }
+    return decode(data);
+}
+
+
+test('encode and decode values', function (t) {
+    var encoder = new binaryLog.Encoder();
+    var rec = {
+        str: 'hi',
+        long: new Array(100).join('long'),
+        utf8: 'café ☃',
+        longUtf8: new Array(50).join('☃'),
+        empty: '',
+        zero: 0,
+        int: 42,
+        neg: -42,
+        big: Math.pow(2, 53) - 1,
+        bigNeg: -Math.pow(2, 40),
+        float: 3.14,
+        huge: 1e300,
+        nan: NaN,
+        inf: -Infinity,
+        t: true,
+        f: false,
+        n: null,
+        obj: {a: [1, {b: 'c'}]},
+        arr: [1, 'two'],
+        date: new Date(0),
+        undef: undefined,
+        fn: function () {},
+        time: '2020-06-01T12:34:56.789Z'
+    };
+    var data = Buffer.concat([encoder.encode(rec), encoder.encode(rec)]);
+    var recs = decode(data);
+    var expected = JSON.parse(JSON.stringify(rec));
+    t.deepEqual(recs, [expected, expected]);
+
+    // Times that aren't `Date#toISOString()` strings are kept as is.
+    ['2020-06-01T12:34:56Z', '2020-02-30T00:00:00.000Z', 'soon'].forEach(
+        function (time) {
+            var data = new binaryLog.Encoder().encode({time: time});
+            t.deepEqual(decode(data), [ {time: time} ]);
+        });
+    t.end();
+});
+
+
+test('encode values after filling the initial buffer', function (t) {
+    var encoder = new binaryLog.Encoder();
+    var rec = {a: new Array(4059).join('x')};
+    // A multibyte key that ends exactly at the end of the buffer.
+    rec[new Array(11).join('\u4e2d')] = true;
+    rec.b = null;
+    rec.c = false;
+    rec.d = 'x';
+    rec.e = 'x';
+    var data = Buffer.concat([encoder.encode(rec), encoder.encode(rec)]);
+    t.deepEqual(decode(data), [rec, rec]);
+    t.end();
+});
+
+
+test('decode across chunk boundaries', function (t) {
+    var encoder = new binaryLog.Encoder();
+    var bufs = [];
+    for (var i = 0; i < 50; i++) {
+        bufs.push(encoder.encode({i: i, msg: (i % 2 ? 'odd' : 'even'),
+            time: new Date(1590969600000 + i * 1500)}));
+        if (i === 25) {
+            // As for a second process appending to the file.
+            encoder.reset();
+        }
+    }
+    var data = Buffer.concat(bufs);
+
+    var recs = [];
+    var decoder = new binaryLog.Decoder();
+    for (i = 0; i < data.length; i++) {
+        decoder.write(data.slice(i, i + 1), function (rec) {
+            recs.push(rec);
+        });
+    }
+    t.equal(recs.length, 50);
+    t.equal(decoder.pendingLength(), 0);
+    t.deepEqual(recs[49], {i: 49, msg: 'odd',
+        time: new Date(1590969600000 + 49 * 1500).toISOString()});
+
+    // A truncated log.
+    decoder = new binaryLog.Decoder();
+    decoder.write(data.slice(0, data.length - 2), function () {});
+    t.ok(decoder.pendingLength() > 0);
+
+    // Stopping early.
+    var n = 0;
+    t.equal(new binaryLog.Decoder().write(data, function (rec) {
+        return (++n === 10);
+    }), true);
+    t.equal(n, 10);
+
+    t.throws(function () {
+        new binaryLog.Decoder().write(Buffer.from('{"hi": 1}\n'),
+            function () {});
+    }, /not a bunyan binary log/);
+    t.ok(binaryLog.isBinaryLog(data));
+    t.notOk(binaryLog.isBinaryLog(Buffer.from('{"hi": 1}\n')));
+    t.end();
+});
+
+
+test('file stream: format binary', function (t) {
+    setup();
+    var jsonPath = path.join(tmpDir, 'file.log');
+    var binPath = path.join(tmpDir, 'file.bin');
+    var log = bunyan.createLogger({
+        name: 'binary',
+        serializers: bunyan.stdSerializers,
+        streams: [
+            {path: jsonPath},
+            {path: binPath, format: 'binary'}
+        ]
+    });
+    t.ok(log.streams[1].stream instanceof bunyan.BinaryStream);
+    t.ok(log.streams[1].raw);
+
+    for (var i = 0; i < 100; i++) {
+        log.info({i: i, req_id: 'r' + (i % 10)}, 'hi %d', i);
+    }
+    log.error({err: new Error('boom'), obj: {a: 1}}, 'oops');
+    log.flush(function () {
+        var jsonRecs = fs.readFileSync(jsonPath, 'utf8').trim().split('\n')
+            .map(function (line) { return JSON.parse(line); });
+        t.deepEqual(readRecords(binPath), jsonRecs);
+        t.ok(fs.statSync(binPath).size < fs.statSync(jsonPath).size / 2,
+            'binary log is smaller');
+
+        // A reopened file, as after a rotation by logrotate, starts a new
+        // segment.
+        fs.renameSync(binPath, binPath + '.0');
+        log.reopenFileStreams();
+        log.info('after reopen');
+        log.flush(function () {
+            var recs = readRecords(binPath);
+            t.equal(recs.length, 1);
+            t.equal(recs[0].msg, 'after reopen');
+            teardown();
+            t.end();
+        });
+    });
+});
+
+
+test('rotating-file stream: format binary', {skip: !bunyan.RotatingFileStream},
+        function (t) {
+    setup();
+    var logPath = path.join(tmpDir, 'rotating.bin');
+    var log = bunyan.createLogger({
+        name: 'binary',
+        streams: [ {
+            type: 'rotating-file',
+            path: logPath,
+            format: 'binary',
+            size: 200,
+            count: 3,
+            gzip: true
+        } ]
+    });
+    var rfs = log.streams[0].stream.stream;
+    t.ok(rfs instanceof bunyan.RotatingFileStream);
+
+    var i = 0;
+    function next() {
+        if (rfs.rotating || rfs._moving || rfs._toMove.length > 0) {
+            setTimeout(next, 5);
+        } else if (i < 60) {
+            log.info({i: i++}, 'hi');
+            next();
+        } else {
+            rfs.end(check);
+        }
+    }
+    function check() {
+        // Each file can be decoded on its own.
+        var files = fs.readdirSync(tmpDir).sort();
+        t.deepEqual(files, ['rotating.bin', 'rotating.bin.0.gz',
+            'rotating.bin.1.gz', 'rotating.bin.2.gz']);
+        var recs = readRecords(logPath + '.2.gz')
+            .concat(readRecords(logPath + '.1.gz'))
+            .concat(readRecords(logPath + '.0.gz'))
+            .concat(readRecords(logPath));
+        var is = recs.map(function (rec) { return rec.i; });
+        t.equal(is[is.length - 1], 59);
+        for (var j = 1; j < is.length; j++) {
+            t.equal(is[j], is[j - 1] + 1);
+        }
+        teardown();
+        t.end();
+    }
+    next();
+});
+
+
+test('format: invalid', function (t) {
+    t.throws(function () {
+        bunyan.createLogger({name: 'binary', streams: [
+            {stream: process.stdout, format: 'binary'}
+        ]});
+    }, new RegExp('only supported for "file" and "rotating-file" streams'));
+    t.throws(function () {
+        bunyan.createLogger({name: 'binary', streams: [
+            {path: path.join(os.tmpdir(), 'nope.log'), format: 'xml'}
+        ]});
+    }, new RegExp('invalid stream "format": "xml"'));
+    t.end();
+});
@@ -0,0 +1,147 @@
+/*
+ * Copyright 2020 Trent Mick
+ *
+ * Test that log records stringified using the pre-serialized bound fields
+ * of a Logger are the same as stringifying the full record object.
+ */
+
+var os = require('os');
+var test = require('tap').test;
+
+var bunyan = require('../lib/bunyan');
+
+
+function CapturingStream(recs) {
+    this.recs = recs || [];
+}
+CapturingStream.prototype.write = function (rec) {
+    this.recs.push(rec);
+}
+
+function createLogger(fields) {
+    var strs = new CapturingStream();
+    var raws = new CapturingStream();
+    fields = fields || {};
+    fields.name = 'bound';
+    fields.streams = [
+        {type: 'stream', stream: strs},
+        {type: 'raw', stream: raws}
+    ];
+    var log = bunyan.createLogger(fields);
+    log.strs = strs.recs;
+    log.raws = raws.recs;
+    return log;
+}
+
+function checkSame(t, log, desc) {
+    var strs = log.streams[0].stream.recs;
+    var raws = log.streams[1].stream.recs;
+    var str = strs[strs.length - 1];
+    var raw = raws[raws.length - 1];
+    t.equal(str, JSON.stringify(raw) + os.EOL, desc);
+}
+
+
+test('string record matches raw record', function (t) {
+    var log = createLogger({component: 'foo'});
+    log.info('hi');
+    checkSame(t, log, 'no fields');
+    log.info({a: 1, b: {c: [1, 2]}, d: undefined}, 'hi %s', 'there');
+    checkSame(t, log, 'with fields');
+    log.info(new Error('boom'), 'error');
+    checkSame(t, log, 'with error');
+    log.info({}, 'empty fields');
+    checkSame(t, log, 'empty fields');
+
+    var child = log.child({req_id: 'abc', count: 3});
+    child.warn({a: 1}, 'from child');
+    checkSame(t, child, 'child');
+    var simpleChild = child.child({simple: true}, true);
+    simpleChild.error('from simple child');
+    checkSame(t, simpleChild, 'simple child');
+    t.equal(JSON.parse(log.strs[log.strs.length - 1]).simple, true);
+    t.end();
+});
+
+
+test('fields overriding bound or core fields', function (t) {
+    var log = createLogger({component: 'foo'});
+    log.info({component: 'bar'}, 'override a bound field');
+    checkSame(t, log);
+    t.equal(log.raws[0].component, 'bar');
+
+    log.info({time: '2020-01-01T00:00:00.000Z'}, 'override time');
+    checkSame(t, log);
+    t.equal(log.raws[1].time, '2020-01-01T00:00:00.000Z');
+
+    log.info({msg: 'nope', v: 'nope'}, 'override msg');
+    checkSame(t, log);
+    t.equal(log.raws[2].msg, 'override msg');
+    t.equal(log.raws[2].v, 0);
+    t.end();
+});
+
+
+test('fields that cannot be stringified', function (t) {
+    var log = createLogger();
+    var obj = {};
+    obj.self = obj;
+    log.info({obj: obj}, 'cycle');
+    var rec = JSON.parse(log.strs[0]);
+    t.equal(rec.msg, 'cycle');
+    t.equal(rec.obj.self, '[Circular]');
+
+    var cyclicLog = createLogger({obj: obj});
+    cyclicLog.info('bound cycle');
+    rec = JSON.parse(cyclicLog.strs[0]);
+    t.equal(rec.msg, 'bound cycle');
+    t.equal(rec.obj.self, '[Circular]');
+    t.end();
+});
+
+
+test('"toJSON" fields', function (t) {
+    var log = createLogger();
+    var child = log.child({toJSON: 'weird'});
+    child.info('bound toJSON');
+    var rec = JSON.parse(log.strs[0]);
+    t.equal(rec.msg, 'bound toJSON');
+    t.equal(rec.toJSON, 'weird');
+    checkSame(t, child);
+
+    log.info({toJSON: 'weird'}, 'toJSON');
+    rec = JSON.parse(log.strs[1]);
+    t.equal(rec.msg, 'toJSON');
+    checkSame(t, log);
+
+    log.info({a: 1, toJSON: function () { return {b: 2}; }}, 'toJSON fn');
+    t.deepEqual(JSON.parse(log.strs[2]), {b: 2});
+    checkSame(t, log);
+
+    var weirdLog = createLogger({toJSON: 'weird'});
+    weirdLog.info('root toJSON');
+    rec = JSON.parse(weirdLog.strs[0]);
+    t.equal(rec.msg, 'root toJSON');
+    t.equal(rec.toJSON, 'weird');
+    t.end();
+});
+
+
+test('raw record is only built for raw streams', function (t) {
+    var strs = new CapturingStream();
+    var raws = new CapturingStream();
+    var log = bunyan.createLogger({
+        name: 'bound',
+        streams: [
+            {type: 'stream', stream: strs, level: 'debug'},
+            {type: 'raw', stream: raws, level: 'info'}
+        ]
+    });
+    log.debug({a: 1}, 'debug');
+    log.info({a: 2}, 'info');
+    t.equal(strs.recs.length, 2);
+    t.equal(raws.recs.length, 1);
+    t.equal(raws.recs[0].a, 2);
+    t.equal(strs.recs[1], JSON.stringify(raws.recs[0]) + os.EOL);
+    t.end();
+});
@@ -0,0 +1,19 @@
+/*
+ * Log to a 'buffered-file' stream and exit immediately. All records should
+ * still make it to the file. Used by "buffered-stream.test.js".
+ */
+
+var bunyan = require('../lib/bunyan');
+
+var log = bunyan.createLogger({
+    name: 'buffered-file-exit',
+    streams: [ {
+        type: 'buffered-file',
+        path: process.argv[2],
+        flushInterval: 60000
+    } ]
+});
+for (var i = 0; i < 100; i++) {
+    log.info({i: i}, 'hi');
+}
+process.exit(0);
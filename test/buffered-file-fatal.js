@@ -0,0 +1,27 @@
+/*
+ * Log to a 'buffered-file' stream while the thread pool is busy (as with
+ * slow disk I/O), log a 'fatal' record and exit immediately. All records
+ * should make it to the file once each, in order, with no blank lines. Used
+ * by "buffered-stream.test.js".
+ */
+
+var crypto = require('crypto');
+
+var bunyan = require('../lib/bunyan');
+
+// Keep the thread pool (of size 1, see the test) busy.
+crypto.pbkdf2('secret', 'salt', 1000000, 64, 'sha512', function () {});
+
+var log = bunyan.createLogger({
+    name: 'buffered-file-fatal',
+    streams: [ {
+        type: 'buffered-file',
+        path: process.argv[2],
+        bufferSize: 256
+    } ]
+});
+for (var i = 0; i < 20; i++) {
+    log.info({i: i}, 'hi');
+}
+log.fatal({i: 20}, 'boom');
+process.exit(0);
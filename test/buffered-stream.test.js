@@ -0,0 +1,214 @@
+/*
+ * Copyright 2020 Trent Mick
+ *
+ * Test the BufferedStream: `type: 'buffered-file'` and `buffered: true`.
+ */
+
+var exec = require('child_process').exec;
+var fs = require('fs');
+var os = require('os');
+var path = require('path');
+var test = require('tap').test;
+
+var bunyan = require('../lib/bunyan');
+
+
+function CapturingStream() {
+    this.writes = [];
+}
+CapturingStream.prototype.write = function (s) {
+    this.writes.push(s);
+}
+
+/*
+ * The `i` field of each line of log file content. A blank line gives
+ * `undefined`.
+ */
+function recordNums(content) {
+    return content.replace(/\n$/, '').split('\n').map(function (line) {
+        return (line ? JSON.parse(line).i : undefined);
+    });
+}
+
+function linesFromWrites(writes) {
+    return writes.join('').split('\n').filter(
+        function (line) { return line.length > 0; });
+}
+
+
+test('buffered stream: coalesces writes up to bufferSize', function (t) {
+    var cap = new CapturingStream();
+    var log = bunyan.createLogger({
+        name: 'buffered',
+        streams: [ {
+            stream: cap,
+            buffered: true,
+            bufferSize: 1024,
+            flushInterval: 0
+        } ]
+    });
+
+    log.info('hi');
+    t.equal(cap.writes.length, 0, 'buffered, not yet written');
+    for (var i = 0; i < 50; i++) {
+        log.info({i: i}, 'hi');
+    }
+    t.ok(cap.writes.length > 0, 'flushed once bufferSize was reached');
+    t.ok(cap.writes.length < 51, 'fewer writes than records');
+
+    log.streams[0].stream.flush();
+    var lines = linesFromWrites(cap.writes);
+    t.equal(lines.length, 51);
+    t.equal(JSON.parse(lines[0]).msg, 'hi');
+    t.equal(JSON.parse(lines[50]).i, 49);
+    t.end();
+});
+
+
+test('buffered stream: flushLevel', function (t) {
+    var cap = new CapturingStream();
+    var log = bunyan.createLogger({
+        name: 'buffered',
+        streams: [ {
+            stream: cap,
+            buffered: true,
+            flushInterval: 0,
+            flushLevel: 'warn'
+        } ]
+    });
+
+    log.info('one');
+    t.equal(cap.writes.length, 0);
+    log.warn('two');
+    t.equal(cap.writes.length, 1, 'warn record forced a flush');
+    var lines = linesFromWrites(cap.writes);
+    t.equal(lines.length, 2);
+    t.equal(JSON.parse(lines[1]).msg, 'two');
+
+    log.info('three');
+    t.equal(cap.writes.length, 1);
+    log.fatal('four');
+    t.equal(cap.writes.length, 2, 'fatal record forced a flush');
+    t.end();
+});
+
+
+test('buffered stream: flushInterval', function (t) {
+    var cap = new CapturingStream();
+    var log = bunyan.createLogger({
+        name: 'buffered',
+        streams: [ {
+            stream: cap,
+            buffered: true,
+            flushInterval: 20
+        } ]
+    });
+
+    log.info('hi');
+    t.equal(cap.writes.length, 0);
+    setTimeout(function () {
+        t.equal(cap.writes.length, 1, 'flushed after flushInterval');
+        log.streams[0].stream.end();
+        t.end();
+    }, 100);
+});
+
+
+test('buffered-file stream', function (t) {
+    var logPath = path.join(os.tmpdir(),
+        'bunyan-buffered-file-' + process.pid + '.log');
+    var log = bunyan.createLogger({
+        name: 'buffered',
+        streams: [ {
+            type: 'buffered-file',
+            path: logPath,
+            bufferSize: 256
+        } ]
+    });
+    var s = log.streams[0].stream;
+    t.ok(s instanceof bunyan.BufferedStream);
+
+    var bigMsg = new Array(1000).join('x');
+    for (var i = 0; i < 20; i++) {
+        log.info({i: i}, i === 10 ? bigMsg : 'hi');
+    }
+    s.on('close', function () {
+        var lines = fs.readFileSync(logPath, 'utf8').trim().split('\n');
+        t.equal(lines.length, 20);
+        for (var j = 0; j < lines.length; j++) {
+            t.equal(JSON.parse(lines[j]).i, j);
+        }
+        t.equal(JSON.parse(lines[10]).msg, bigMsg);
+        fs.unlinkSync(logPath);
+        t.end();
+    });
+    s.end();
+});
+
+
+test('buffered-file stream is flushed on process exit', function (t) {
+    var logPath = path.join(os.tmpdir(),
+        'bunyan-buffered-file-exit-' + process.pid + '.log');
+    exec('node ' + __dirname + '/buffered-file-exit.js ' + logPath,
+            function (err, stdout, stderr) {
+        t.ifError(err);
+        t.equal(stderr, '');
+        var lines = fs.readFileSync(logPath, 'utf8').trim().split('\n');
+        t.equal(lines.length, 100);
+        t.equal(JSON.parse(lines[99]).i, 99);
+        fs.unlinkSync(logPath);
+        t.end();
+    });
+});
+
+
+test('buffered-file stream: fatal after earlier flushes', function (t) {
+    var logPath = path.join(os.tmpdir(),
+        'bunyan-buffered-file-fatal-' + process.pid + '.log');
+    var log = bunyan.createLogger({
+        name: 'buffered',
+        streams: [ {
+            type: 'buffered-file',
+            path: logPath,
+            bufferSize: 256
+        } ]
+    });
+    var s = log.streams[0].stream;
+    for (var i = 0; i < 20; i++) {
+        log.info({i: i}, 'hi');
+    }
+    log.fatal({i: 20}, 'boom');
+    var expected = [];
+    for (i = 0; i <= 20; i++) {
+        expected.push(i);
+    }
+    t.deepEqual(recordNums(fs.readFileSync(logPath, 'utf8')), expected,
+        'all records written, in order');
+    s.on('close', function () {
+        t.deepEqual(recordNums(fs.readFileSync(logPath, 'utf8')), expected,
+            'nothing written after the fatal record');
+        fs.unlinkSync(logPath);
+        t.end();
+    });
+    s.end();
+});
+
+
+test('buffered-file stream: fatal and exit during slow I/O', function (t) {
+    var logPath = path.join(os.tmpdir(),
+        'bunyan-buffered-file-fatal-exit-' + process.pid + '.log');
+    exec('node ' + __dirname + '/buffered-file-fatal.js ' + logPath,
+            {env: {PATH: process.env.PATH, UV_THREADPOOL_SIZE: '1'}},
+            function (err, stdout, stderr) {
+        t.ifError(err);
+        t.equal(stderr, '');
+        var expected = [];
+        for (var i = 0; i <= 20; i++) {
+            expected.push(i);
+        }
+        t.deepEqual(recordNums(fs.readFileSync(logPath, 'utf8')), expected,
+            'all records written once, in order, with no blank lines');
+        fs.unlinkSync(logPath);
+        t.end();
+    });
+});
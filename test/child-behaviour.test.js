@@ -152,3 +152,165 @@ test('child should not lose parent "hostname"', function (t) {
 
     t.end();
 });
+
+
+test('child shares streams with parent until changed', function (t) {
+    var dadStream = new CapturingStream();
+    var dad = bunyan.createLogger({
+        name: 'surname',
+        streams: [ {
+            type: 'raw',
+            stream: dadStream,
+            level: 'info'
+        } ]
+    });
+    var son = dad.child({component: 'son'});
+    var simpleSon = dad.child({component: 'simpleson'}, true);
+    t.equal(son.streams, dad.streams, 'streams are shared');
+    t.equal(simpleSon.streams, dad.streams, 'streams are shared');
+
+    // Changing the parent's stream levels must not change the child's.
+    dad.level('warn');
+    t.equal(dad.streams[0].level, bunyan.WARN);
+    t.equal(son.streams[0].level, bunyan.INFO);
+    t.equal(son.level(), bunyan.INFO);
+
+    // Nor the other way around.
+    son.levels(0, 'debug');
+    t.equal(son.streams[0].level, bunyan.DEBUG);
+    t.equal(dad.streams[0].level, bunyan.WARN);
+    t.equal(son.streams[0].closeOnExit, false,
+        'child does not own parent stream');
+
+    // Adding a stream to the child doesn't add it to the parent.
+    var sonStream = new CapturingStream();
+    son.addStream({type: 'raw', stream: sonStream, level: 'info'});
+    t.equal(son.streams.length, 2);
+    t.equal(dad.streams.length, 1);
+
+    son.info('hi from son');
+    dad.info('hi from dad');
+    dad.warn('warn from dad');
+    t.equal(dadStream.recs.length, 2);
+    t.equal(dadStream.recs[0].msg, 'hi from son');
+    t.equal(dadStream.recs[1].msg, 'warn from dad');
+    t.equal(sonStream.recs.length, 1);
+
+    // A simple child copies the streams before changing them.
+    simpleSon.level('trace');
+    t.equal(simpleSon.streams[0].level, bunyan.TRACE);
+    t.equal(dad.streams[0].level, bunyan.WARN);
+    t.end();
+});
+
+
+test('child shares serializers with parent until changed', function (t) {
+    function fooSerializer(foo) { return 'foo'; }
+    function barSerializer(bar) { return 'bar'; }
+    var stream = new CapturingStream();
+    var dad = bunyan.createLogger({
+        name: 'surname',
+        serializers: {foo: fooSerializer},
+        streams: [ {type: 'raw', stream: stream} ]
+    });
+    var son = dad.child({serializers: {bar: barSerializer}});
+    var daughter = dad.child({component: 'daughter'});
+    t.equal(daughter.serializers, dad.serializers);
+
+    t.equal(son.serializers.foo, fooSerializer);
+    t.equal(son.serializers.bar, barSerializer);
+    t.equal(dad.serializers.bar, undefined);
+
+    dad.addSerializers({baz: barSerializer});
+    t.equal(dad.serializers.baz, barSerializer);
+    t.equal(son.serializers.baz, undefined);
+    t.equal(daughter.serializers.baz, undefined);
+
+    daughter.info({foo: 1, bar: 2, baz: 3}, 'hi');
+    t.equal(stream.recs[0].foo, 'foo');
+    t.equal(stream.recs[0].bar, 2);
+    t.equal(stream.recs[0].baz, 3);
+    t.end();
+});
+
+
+test('child fields', function (t) {
+    var stream = new CapturingStream();
+    var dad = bunyan.createLogger({
+        name: 'surname',
+        hostname: 'example.com',
+        streams: [ {type: 'raw', stream: stream} ]
+    });
+    var son = dad.child({component: 'son', a: 1});
+    var grandson = son.child({a: 2, b: 3}, true);
+
+    t.equal(son.fields.name, 'surname');
+    t.equal(son.fields.hostname, 'example.com');
+    t.equal(son.fields.pid, process.pid);
+    t.equal(son.fields.component, 'son');
+    t.equal(son.fields.a, 1);
+    t.equal(grandson.fields.a, 2);
+    t.equal(grandson.fields.b, 3);
+    t.equal(Object.keys(grandson.fields).join(','),
+        'name,hostname,pid,component,a,b');
+    t.equal(dad.fields.component, undefined);
+
+    grandson.info('hi');
+    t.equal(stream.recs[0].component, 'son');
+    t.equal(stream.recs[0].a, 2);
+    t.equal(stream.recs[0].b, 3);
+    t.end();
+});
+
+
+test('simple child sees streams added to its parent later', function (t) {
+    var a = new CapturingStream();
+    var b = new CapturingStream();
+    var log = bunyan.createLogger({
+        name: 'surname',
+        streams: [ {type: 'raw', stream: a} ]
+    });
+    log.child({a: 1});
+    var simple = log.child({b: 1}, true);
+    log.addStream({type: 'raw', stream: b});
+
+    simple.info('x');
+    log.info('y');
+    t.deepEqual(a.recs.map(function (rec) { return rec.msg; }), ['x', 'y']);
+    t.deepEqual(b.recs.map(function (rec) { return rec.msg; }), ['x', 'y']);
+    t.equal(simple.streams, log.streams);
+    t.end();
+});
+
+
+test('simple child with a lower level stream of its own', function (t) {
+    var a = new CapturingStream();
+    var b = new CapturingStream();
+    var log = bunyan.createLogger({
+        name: 'surname',
+        streams: [ {type: 'raw', stream: a} ]
+    });
+    var simple = log.child({x: 1}, true);
+    simple.addStream({type: 'raw', stream: b, level: 'trace'});
+
+    simple.trace('t1');
+    log.trace('t2');
+    t.equal(simple.level(), bunyan.TRACE);
+    t.deepEqual(simple.levels(), [bunyan.INFO, bunyan.TRACE]);
+    t.equal(log.level(), bunyan.INFO);
+    t.equal(a.recs.length, 0);
+    t.deepEqual(b.recs.map(function (rec) { return rec.msg; }), ['t1']);
+    t.end();
+});
+
+
+test('child with an undefined "pid" still logs the pid', function (t) {
+    var stream = new CapturingStream();
+    var dad = bunyan.createLogger({
+        name: 'surname',
+        streams: [ {type: 'raw', stream: stream} ]
+    });
+    dad.child({pid: undefined}).info('hi');
+    t.equal(stream.recs[0].pid, process.pid);
+    t.end();
+});
@@ -6,7 +6,9 @@
 
 var p = console.warn;
 var exec = require('child_process').exec;
+var spawn = require('child_process').spawn;
 var fs = require('fs');
+var net = require('net');
 var os = require('os');
 var path = require('path');
 var _ = require('util').format;
@@ -430,6 +432,86 @@ test('multiple --conditions', function (t) {
     });
 });
 
+// Common "-c CONDITION" shapes (and "-l LEVEL") are checked on the raw line,
+// before it is parsed. That must give the same result as the CONDITION code
+// run as is: e.g. with a 'return', which isn't compiled.
+test('--condition checked before parsing', function (t) {
+    var logPath = path.join(__dirname, 'corpus/prefilter.log');
+    var cases = [];
+    [
+        'this.level >= 40',
+        'this.level > INFO && this.req_id !== "b"',
+        'this.pid == 2 || this.n === 3',
+        '!(this.level < WARN)',
+        'this.msg',
+        '!this.nope && "a" === this.req_id',
+        'this.req_id == "r7"',
+        '!this.req_id'
+    ].forEach(function (cond) {
+        ['', '--strict'].forEach(function (opt) {
+            cases.push([_('%s -c \'%s\'', opt, cond),
+                _('%s -c \'return (%s)\'', opt, cond)]);
+        });
+    });
+    // Without "--strict", lines that aren't JSON are emitted as is, even
+    // if they look like a filtered out record.
+    [
+        'this.hostname == "nope"',
+        'this.level == 100'
+    ].forEach(function (cond) {
+        cases.push([_('-c \'%s\'', cond), _('-c \'return (%s)\'', cond)]);
+    });
+    cases.push(['-l error', '-c \'return this.level >= 50\'']);
+    cases.push(['-l 40', '-c \'return this.level >= 40\'']);
+    cases.push(['--strict -l 40', '--strict -c \'return this.level >= 40\'']);
+    cases.push(['-l 40 -c \'this.pid++ > 1\' -c \'this.pid === 2\'',
+        '-c \'return this.level >= 40 && this.pid++ > 1\' '
+            + '-c \'return this.pid === 2\'']);
+
+    vasync.forEachPipeline({
+        inputs: cases,
+        func: function checkOne(c, next) {
+            exec(_('%s -o simple %s %s', BUNYAN, c[0], logPath),
+                    function (err, stdout, stderr) {
+                t.ifError(err);
+                exec(_('%s -o simple %s %s', BUNYAN, c[1], logPath),
+                        function (err2, expect, stderr2) {
+                    t.ifError(err2);
+                    t.ok(expect.length > 0, 'some output: ' + c[1]);
+                    t.equal(stdout, expect, c[0]);
+                    next();
+                });
+            });
+        }
+    }, function () {
+        t.end();
+    });
+});
+
+test('--template', function (t) {
+    var expect = [
+        'DEBUG| 12859||{headAgentProbes respond}|\n',
+        'INFO | 12859|HEAD|{HeadAgentProbes handled: 200}|true\n',
+        'INFO | 12859|HEAD|{HeadAgentProbes handled: 200}|true\n'
+    ].join('');
+    exec(_('%s --template "{level:-5}|{pid:6}|{req.method}|{{{msg}}}|{audit}" '
+            + '%s/corpus/withreq.log', BUNYAN, __dirname),
+            function (err, stdout, stderr) {
+        t.ifError(err);
+        t.equal(stdout, expect);
+        exec(_('%s --template "{msg" %s/corpus/withreq.log', BUNYAN, __dirname),
+                function (err2, stdout2, stderr2) {
+            t.ok(err2);
+            t.equal(err2.code, 1);
+            t.equal(stdout2, '');
+            t.ok(stderr2.indexOf(
+                'invalid "--template": unmatched "{" at offset 0') !== -1,
+                'stderr: ' + stderr2);
+            t.end();
+        });
+    });
+});
+
 // https://github.com/trentm/node-bunyan/issues/30
 //
 // One of the records in corpus/withreq.log has a 'req'
@@ -527,3 +609,616 @@ test('should only show nonempty response bodies', function (t) {
         t.end();
     });
 });
+
+
+test('--parallel N', function (t) {
+    // Small pieces so the corpus files are split between the workers.
+    var env = objCopy(process.env);
+    env.BUNYAN_PARALLEL_CHUNK_SIZE = '100';
+    var cases = [
+        'corpus/all.log',
+        '-l 40 corpus/all.log',
+        '-c "this.level === TRACE" corpus/all.log',
+        '--strict -o short corpus/bogus.log',
+        '-j corpus/log1.log.gz'
+    ];
+    vasync.forEachPipeline({
+        inputs: cases,
+        func: function compareOne(args, next) {
+            args = args.replace(/corpus\//, __dirname + '/corpus/');
+            exec(_('%s %s', BUNYAN, args), function (err, expect) {
+                t.ifError(err);
+                exec(_('%s --parallel 3 %s', BUNYAN, args), {env: env},
+                        function (err2, stdout) {
+                    t.ifError(err2);
+                    t.equal(stdout, expect, args);
+                    next();
+                });
+            });
+        }
+    }, function () {
+        t.end();
+    });
+});
+
+test('--parallel 0', function (t) {
+    exec(_('%s --parallel 0 %s/corpus/all.log', BUNYAN, __dirname),
+            function (err, stdout, stderr) {
+        t.ok(err, 'should error out');
+        t.equal(err.code, 1, '... with exit code 1');
+        t.ok(stderr.indexOf('invalid "--parallel" value: "0"') !== -1,
+            stderr);
+        t.end();
+    });
+});
+
+test('merge many logs', function (t) {
+    // Interleaved records in more files, and with more records each, than
+    // are read ahead. Times in the last file aren't in Bunyan's format.
+    var tmpDir = path.join(os.tmpdir(), 'bunyan-cli-merge-' + process.pid);
+    fs.mkdirSync(tmpDir);
+    var numFiles = 20;
+    var numRecs = 500;
+    var files = [];
+    for (var f = 0; f < numFiles; f++) {
+        var lines = [];
+        for (var i = 0; i < numRecs; i++) {
+            var time = new Date(1336496275586 + (i * numFiles + f) * 1000);
+            lines.push(JSON.stringify({
+                v: 0, level: 30, name: 'merge', hostname: 'h', pid: 123,
+                time: (f === numFiles - 1
+                    ? time.toISOString().replace(/\.\d+Z$/, '+00:00')
+                    : time.toISOString()),
+                msg: String(i * numFiles + f)
+            }));
+        }
+        files.push(path.join(tmpDir, f + '.log'));
+        fs.writeFileSync(files[f], lines.join('\n') + '\n');
+    }
+
+    exec(_('%s -o simple %s', BUNYAN, files.join(' ')),
+            {maxBuffer: 10 * 1024 * 1024}, function (err, stdout, stderr) {
+        t.ifError(err);
+        var msgs = stdout.trim().split('\n').map(function (line) {
+            return Number(line.split(' - ')[1]);
+        });
+        t.equal(msgs.length, numFiles * numRecs);
+        var ordered = true;
+        for (var j = 0; j < msgs.length; j++) {
+            if (msgs[j] !== j) {
+                ordered = false;
+                break;
+            }
+        }
+        t.ok(ordered, 'records are merged in time order');
+        files.forEach(function (file) {
+            fs.unlinkSync(file);
+        });
+        fs.rmdirSync(tmpDir);
+        t.end();
+    });
+});
+
+test('--since and --until', function (t) {
+    // A log file large enough to be searched, with some records a little
+    // out of order and some non-JSON lines.
+    var tmpDir = path.join(os.tmpdir(), 'bunyan-cli-since-' + process.pid);
+    fs.mkdirSync(tmpDir);
+    var start = Date.parse('2020-06-01T00:00:00.000Z');
+    var lines = [];
+    var expect = [];
+    for (var i = 0; i < 5000; i++) {
+        var time = start + i * 1000 - (i % 7 === 3 ? 3000 : 0);
+        lines.push(JSON.stringify({v: 0, level: 30, name: 'since',
+            hostname: 'h', pid: 123, time: new Date(time).toISOString(),
+            msg: String(i)}));
+        if (i % 1000 === 0) {
+            lines.push('not a record');
+        }
+        if (time >= start + 3600 * 1000 && time <= start + 3900 * 1000) {
+            expect.push('INFO - ' + i + '\n');
+        }
+    }
+    expect = expect.join('');
+    var logPath = path.join(tmpDir, 'since.log');
+    fs.writeFileSync(logPath, lines.join('\n') + '\n');
+    fs.writeFileSync(logPath + '.gz',
+        require('zlib').gzipSync(lines.join('\n') + '\n'));
+
+    var args = '-o simple --since 2020-06-01T01:00:00Z '
+        + '--until 2020-06-01T01:05:00Z';
+    var env = objCopy(process.env);
+    env.BUNYAN_SELF_TRACE = '1';
+    var cases = [
+        _('%s %s %s', BUNYAN, args, logPath),
+        _('%s %s %s.gz', BUNYAN, args, logPath),
+        _('cat %s | %s %s', logPath, BUNYAN, args),
+        _('%s --parallel 2 %s %s', BUNYAN, args, logPath)
+    ];
+    vasync.forEachPipeline({
+        inputs: cases,
+        func: function checkOne(cmd, next) {
+            exec(cmd, {env: env}, function (err, stdout, stderr) {
+                t.ifError(err);
+                t.equal(stdout, expect, cmd);
+                if (/\.log$/.test(cmd)) {
+                    // JSSTYLED
+                    var seek = /to bytes (\d+)-(\d+) \(of (\d+)\)/.exec(stderr);
+                    t.ok(seek && Number(seek[1]) > 0 &&
+                        Number(seek[2]) < Number(seek[3]),
+                        'only part of the file is read: ' + (seek && seek[0]));
+                }
+                next();
+            });
+        }
+    }, function () {
+        fs.unlinkSync(logPath);
+        fs.unlinkSync(logPath + '.gz');
+        fs.rmdirSync(tmpDir);
+        t.end();
+    });
+});
+
+test('--since bogus', function (t) {
+    exec(_('%s --since bogus %s/corpus/all.log', BUNYAN, __dirname),
+            function (err, stdout, stderr) {
+        t.ok(err, 'should error out');
+        t.equal(err.code, 1, '... with exit code 1');
+        t.ok(stderr.indexOf('invalid "--since" time: "bogus"') !== -1,
+            stderr);
+        t.end();
+    });
+});
+
+test('--build-index', function (t) {
+    var tmpDir = path.join(os.tmpdir(), 'bunyan-cli-index-' + process.pid);
+    fs.mkdirSync(tmpDir);
+    var logPath = path.join(tmpDir, 'index.log');
+    var indexPath = path.join(tmpDir, '.index.log.bunyan-index');
+    function writeRecords(from, to) {
+        var lines = [];
+        for (var i = from; i < to; i++) {
+            lines.push(JSON.stringify({v: 0, level: (i % 100 ? 30 : 50),
+                name: 'index', hostname: 'h', pid: 123, req_id: 'req' + i,
+                time: new Date(1591000000000 + i * 1000).toISOString(),
+                msg: String(i)}));
+        }
+        fs.appendFileSync(logPath, lines.join('\n') + '\n');
+    }
+    writeRecords(0, 2000);
+
+    // Small blocks, so the file has many.
+    var env = objCopy(process.env);
+    env.BUNYAN_INDEX_BLOCK_SIZE = '4096';
+    env.BUNYAN_SELF_TRACE = '1';
+    function bunyan(args, cb) {
+        exec(_('%s %s %s', BUNYAN, args, logPath), {env: env},
+            function (err, stdout, stderr) {
+                t.ifError(err, args);
+                var read = new RegExp('read (\\d+) of (\\d+) blocks')
+                    .exec(stderr);
+                cb(stdout, read && {read: Number(read[1]),
+                    total: Number(read[2])});
+            });
+    }
+
+    var query = '--strict -o simple -c "this.req_id == \'req1234\'"';
+    var steps = [
+        function buildIt(next) {
+            bunyan('--build-index', function () {
+                t.ok(fs.existsSync(indexPath), 'index exists');
+                next();
+            });
+        },
+        function findReqId(next) {
+            bunyan(query, function (stdout, read) {
+                t.equal(stdout, 'INFO - 1234\n');
+                t.ok(read && read.read < 3 && read.total > 50,
+                    'only blocks that may match are read: '
+                    + JSON.stringify(read));
+                next();
+            });
+        },
+        function findErrors(next) {
+            bunyan('-o simple -l error', function (stdout, read) {
+                t.equal(stdout.split('\n').length - 1, 20);
+                t.ok(read && read.read === 20,
+                    'only blocks with errors are read');
+                next();
+            });
+        },
+        function findAdded(next) {
+            // Records added since the file was indexed are still found...
+            writeRecords(2000, 2100);
+            bunyan('--strict -o simple -c "this.req_id == \'req2050\'"',
+                    function (stdout, read) {
+                t.equal(stdout, 'INFO - 2050\n');
+                t.equal(read && read.read, 0);
+                next();
+            });
+        },
+        function updateIt(next) {
+            // ... and the index can be brought up to date.
+            bunyan('--build-index', function () {
+                bunyan('--strict -o simple -c "this.req_id == \'req2050\'"',
+                        function (stdout, read) {
+                    t.equal(stdout, 'INFO - 2050\n');
+                    t.equal(read && read.read, 1);
+                    next();
+                });
+            });
+        },
+        function noIndex(next) {
+            bunyan('--no-index ' + query, function (stdout, read) {
+                t.equal(stdout, 'INFO - 1234\n');
+                t.equal(read, null, 'index not used with "--no-index"');
+                next();
+            });
+        }
+    ];
+    vasync.forEachPipeline({
+        inputs: steps,
+        func: function runStep(step, next) {
+            step(next);
+        }
+    }, function () {
+        fs.unlinkSync(logPath);
+        fs.unlinkSync(indexPath);
+        fs.rmdirSync(tmpDir);
+        t.end();
+    });
+});
+
+test('--follow', function (t) {
+    var tmpDir = path.join(os.tmpdir(), 'bunyan-cli-follow-' + process.pid);
+    fs.mkdirSync(tmpDir);
+    var aPath = path.join(tmpDir, 'a.log');
+    var bPath = path.join(tmpDir, 'b.log');
+    var n = 0;
+    function writeRecord(logPath, msg) {
+        fs.appendFileSync(logPath, JSON.stringify({v: 0, level: 30,
+            name: 'follow', hostname: 'h', pid: 123,
+            time: new Date(1591000000000 + (n++) * 1000).toISOString(),
+            msg: msg}) + '\n');
+    }
+    for (var i = 0; i < 12; i++) {
+        writeRecord(aPath, 'a' + i);
+    }
+
+    var child = spawn(process.execPath,
+        [path.resolve(__dirname, '../bin/bunyan'), '-f', '-o', 'simple',
+        aPath, bPath]);
+    var stdout = '';
+    var stderr = '';
+    child.stdout.on('data', function (data) { stdout += data; });
+    child.stderr.on('data', function (data) { stderr += data; });
+    function waitFor(numLines, next) {
+        var start = Date.now();
+        (function check() {
+            if (stdout.split('\n').length - 1 >= numLines ||
+                Date.now() - start > 10000) {
+                next();
+            } else {
+                setTimeout(check, 100);
+            }
+        })();
+    }
+
+    var steps = [
+        function lastLines(next) {
+            // The last 10 lines of a.log; b.log doesn't exist yet.
+            waitFor(10, function () {
+                t.equal(stdout.split('\n')[0], 'INFO - a2');
+                t.ok(stderr.indexOf('b.log" does not exist') !== -1, stderr);
+                next();
+            });
+        },
+        function appended(next) {
+            writeRecord(aPath, 'a12');
+            writeRecord(bPath, 'b0, longer than b1');
+            waitFor(12, next);
+        },
+        function rotated(next) {
+            // As with `reopenFileStreams()`: records are still written to
+            // the renamed file for a bit, then to the new one.
+            fs.renameSync(aPath, aPath + '.0');
+            writeRecord(aPath + '.0', 'a13');
+            writeRecord(aPath, 'a14');
+            waitFor(14, next);
+        },
+        function truncated(next) {
+            // Truncation is noticed by the file getting smaller.
+            fs.truncateSync(bPath, 0);
+            writeRecord(bPath, 'b1');
+            waitFor(15, next);
+        }
+    ];
+    vasync.forEachPipeline({
+        inputs: steps,
+        func: function runStep(step, next) {
+            step(next);
+        }
+    }, function () {
+        child.kill();
+        t.equal(stdout.split('\n').slice(10).join('\n'), [
+            'INFO - a12',
+            'INFO - b0, longer than b1',
+            'INFO - a13',
+            'INFO - a14',
+            'INFO - b1',
+            ''
+        ].join('\n'));
+        [aPath, aPath + '.0', bPath].forEach(function (f) {
+            fs.unlinkSync(f);
+        });
+        fs.rmdirSync(tmpDir);
+        t.end();
+    });
+});
+
+test('--stats', function (t) {
+    exec(_('%s --group-by name --bucket 1h %s %s', BUNYAN,
+            path.join(__dirname, 'corpus/all.log'),
+            path.join(__dirname, 'corpus/simple.log')),
+            function (err, stdout, stderr) {
+        t.ifError(err);
+        t.equal(stdout, [
+            /* BEGIN JSSTYLED */
+            'BUCKET                    NAME       COUNT  TRACE  DEBUG  INFO  WARN  ERROR  55  FATAL',
+            '2012-02-08T22:00:00.000Z  myservice     14      1      1     8     1      1   1      1',
+            /* END JSSTYLED */
+            ''
+        ].join('\n'));
+        t.end();
+    });
+});
+
+test('--stats simple.log doesnotexist1.log doesnotexist2.log', function (t) {
+    exec(_('%s --stats %s/corpus/simple.log doesnotexist1.log ' +
+            'doesnotexist2.log', BUNYAN, __dirname),
+            function (err, stdout, stderr) {
+        // As without "--stats": the exit status is the number of files
+        // that couldn't be read.
+        t.ok(err);
+        t.equal(err.code, 2);
+        t.equal(stdout, [
+            'COUNT  INFO',
+            '    1     1',
+            ''
+        ].join('\n'));
+        ['doesnotexist1.log', 'doesnotexist2.log'].forEach(function (file) {
+            t.ok(stderr.indexOf('bunyan: ENOENT') !== -1 &&
+                stderr.indexOf(file) !== -1, stderr);
+        });
+        t.end();
+    });
+});
+
+test('--stats-field FIELD', function (t) {
+    var tmpDir = path.join(os.tmpdir(), 'bunyan-cli-stats-' + process.pid);
+    fs.mkdirSync(tmpDir);
+    var logPath = path.join(tmpDir, 'stats.log');
+    var lines = [];
+    for (var i = 1; i <= 1000; i++) {
+        lines.push(JSON.stringify({v: 0, level: (i % 10 ? 30 : 50),
+            name: 'stats', hostname: 'h', pid: 123,
+            route: (i % 2 ? 'odd' : 'even'), latency: i,
+            time: new Date(1591000000000 + i * 1000).toISOString(),
+            msg: 'hi'}));
+    }
+    fs.writeFileSync(logPath, lines.join('\n') + '\n');
+
+    exec(_('%s --group-by route --stats-field latency -l error -o json %s',
+            BUNYAN, logPath),
+            function (err, stdout, stderr) {
+        t.ifError(err);
+        var rows = JSON.parse(stdout);
+        t.equal(rows.length, 1);
+        t.equal(rows[0].route, 'even');
+        t.equal(rows[0].count, 100);
+        t.deepEqual(rows[0].levels, {error: 100});
+        var latency = rows[0].latency;
+        t.deepEqual([latency.count, latency.min, latency.max, latency.mean],
+            [100, 10, 1000, 505]);
+        // Quantiles are within 1% of the exact values.
+        [['p50', 500], ['p90', 900], ['p99', 990]].forEach(function (q) {
+            t.ok(Math.abs(latency[q[0]] - q[1]) <= q[1] * 0.01,
+                q[0] + ': ' + latency[q[0]]);
+        });
+        fs.unlinkSync(logPath);
+        fs.rmdirSync(tmpDir);
+        t.end();
+    });
+});
+
+test('-o binary, and binary input', function (t) {
+    var tmpDir = path.join(os.tmpdir(), 'bunyan-cli-binary-' + process.pid);
+    fs.mkdirSync(tmpDir);
+    var allLog = path.join(__dirname, 'corpus/all.log');
+    var binPath = path.join(tmpDir, 'all.bin');
+    var badPath = path.join(tmpDir, 'bad.bin');
+
+    exec(_('%s -o binary %s > %s', BUNYAN, allLog, binPath),
+            function (err, stdout, stderr) {
+        t.ifError(err);
+        var data = fs.readFileSync(binPath);
+        t.equal(data[0], 0, 'binary log');
+        t.ok(data.length < fs.statSync(allLog).size / 2,
+            'binary log is smaller');
+        fs.writeFileSync(binPath + '.gz', require('zlib').gzipSync(data));
+        fs.writeFileSync(badPath, Buffer.from([0, 1, 2, 3, 4, 5]));
+
+        // Each is the same as for the JSON log (without its other lines).
+        var cases = [
+            ['-o bunyan', binPath],
+            ['-o long', binPath],
+            ['-o simple -l warn', binPath],
+            ['-o short -c "this.four"', binPath],
+            ['-o json', binPath + '.gz'],
+            ['--stats', binPath],
+            ['-o inspect', '< ' + binPath]
+        ];
+        vasync.forEachPipeline({
+            inputs: cases,
+            func: function checkOne(c, next) {
+                exec(_('%s --strict %s %s', BUNYAN, c[0], allLog),
+                        function (err1, expected) {
+                    t.ifError(err1);
+                    exec(_('%s %s %s', BUNYAN, c[0], c[1]),
+                            function (err2, stdout2) {
+                        t.ifError(err2);
+                        t.equal(stdout2, expected, c.join(' '));
+                        next();
+                    });
+                });
+            }
+        }, function () {
+            exec(_('%s %s', BUNYAN, badPath),
+                    function (err3, stdout3, stderr3) {
+                t.equal(err3 && err3.code, 1);
+                t.ok(stderr3.indexOf('bad.bin": not a bunyan binary log')
+                    !== -1, stderr3);
+                [binPath, binPath + '.gz', badPath].forEach(function (f) {
+                    fs.unlinkSync(f);
+                });
+                fs.rmdirSync(tmpDir);
+                t.end();
+            });
+        });
+    });
+});
+
+test('--listen', function (t) {
+    var sockPath = path.join(os.tmpdir(),
+        'bunyan-cli-listen-' + process.pid + '.sock');
+    var child = spawn(process.execPath,
+        [BUNYAN, '--listen', 'unix:' + sockPath, '-o', 'simple']);
+    var stdout = '';
+    child.stdout.on('data', function (data) { stdout += data; });
+    function line(n, msg) {
+        return JSON.stringify({v: 0, level: 30, name: 'listen',
+            hostname: 'h', pid: 123,
+            time: new Date(1591000000000 + n * 1000).toISOString(),
+            msg: msg}) + '\n';
+    }
+
+    // Connect once bunyan is listening.
+    function connect(cb) {
+        var conn = net.connect(sockPath);
+        conn.on('error', function () {
+            setTimeout(connect, 100, cb);
+        });
+        conn.on('connect', function () {
+            cb(conn);
+        });
+    }
+    connect(function (a) {
+        connect(function (b) {
+            // Records from different clients are merged by time. The last
+            // line from a client need not end with a newline.
+            a.write(line(2, 'a2') + line(3, 'a3').slice(0, 20));
+            b.write(line(1, 'b1'));
+            a.end(line(3, 'a3').slice(20, -1));
+            b.end(line(4, 'b4'));
+            (function check() {
+                if (stdout.split('\n').length <= 4) {
+                    setTimeout(check, 100);
+                    return;
+                }
+                child.kill();
+                t.equal(stdout, [
+                    'INFO - b1',
+                    'INFO - a2',
+                    'INFO - a3',
+                    'INFO - b4',
+                    ''
+                ].join('\n'));
+                child.on('exit', function () {
+                    t.notOk(fs.existsSync(sockPath), 'socket removed');
+                    t.end();
+                });
+            })();
+        });
+    });
+});
+
+test('--listen --out with rotation', function (t) {
+    var bunyan = require('../lib/bunyan');
+    if (!bunyan.RotatingFileStream) {
+        t.skip('no "mv" module');
+        t.end();
+        return;
+    }
+    var tmpDir = path.join(os.tmpdir(), 'bunyan-cli-out-' + process.pid);
+    fs.mkdirSync(tmpDir);
+    var outPath = path.join(tmpDir, 'out.log');
+
+    // Find a free port.
+    var server = net.createServer().listen(0, function () {
+        var port = server.address().port;
+        server.close(function () {
+            var child = spawn(process.execPath,
+                [BUNYAN, '--listen', 'tcp://127.0.0.1:' + port,
+                '--out', outPath, '--out-size', '1k', '--out-count', '20']);
+            var log = bunyan.createLogger({
+                name: 'listen',
+                streams: [ {type: 'tcp', port: port, reconnectMinDelay: 50} ]
+            });
+            for (var i = 0; i < 50; i++) {
+                log.info({i: i}, 'hi');
+            }
+
+            function outRecs() {
+                // The oldest records are in the highest-numbered files.
+                return fs.readdirSync(tmpDir).sort(function (a, b) {
+                    function n(f) {
+                        var m = /\.(\d+)$/.exec(f);
+                        return (m ? Number(m[1]) : -1);
+                    }
+                    return n(b) - n(a);
+                }).map(function (f) {
+                    return fs.readFileSync(path.join(tmpDir, f), 'utf8');
+                }).join('').split('\n').filter(Boolean).map(JSON.parse);
+            }
+            (function check() {
+                if (outRecs().length < 50) {
+                    setTimeout(check, 100);
+                    return;
+                }
+                child.kill();
+                child.on('exit', function () {
+                    log.streams[0].stream.destroy();
+                    var recs = outRecs();
+                    t.equal(recs.length, 50);
+                    t.deepEqual(recs.map(function (rec) { return rec.i; }),
+                        Array.apply(null, Array(50)).map(
+                            function (_x, j) { return j; }));
+                    var files = fs.readdirSync(tmpDir);
+                    t.ok(files.length > 1, 'rotated: ' + files.join(', '));
+                    files.forEach(function (f) {
+                        fs.unlinkSync(path.join(tmpDir, f));
+                    });
+                    fs.rmdirSync(tmpDir);
+                    t.end();
+                });
+            })();
+        });
+    });
+});
+
+test('--listen errors', function (t) {
+    exec(_('%s --listen http://example.com', BUNYAN),
+            function (err, stdout, stderr) {
+        t.ok(err);
+        t.equal(stderr, 'bunyan: error: invalid "--listen" address: '
+            + '"http://example.com"\n');
+        exec(_('%s --out foo.log %s', BUNYAN,
+                path.join(__dirname, 'corpus/simple.log')),
+                function (err2, stdout2, stderr2) {
+            t.ok(err2);
+            t.equal(stderr2, 'bunyan: error: "--out" is only supported with '
+                + '"--listen"\n');
+            t.end();
+        });
+    });
+});
@@ -0,0 +1,221 @@
+/*
+ * Copyright 2020 Trent Mick
+ *
+ * Test the `limits` Logger option: sampling and rate limiting of records.
+ */
+
+var test = require('tap').test;
+
+var bunyan = require('../lib/bunyan');
+
+
+function createLogger(limits) {
+    var recs = [];
+    var log = bunyan.createLogger({
+        name: 'limits',
+        limits: limits,
+        streams: [ {
+            type: 'raw',
+            stream: {
+                write: function (rec) {
+                    recs.push(rec);
+                }
+            }
+        } ]
+    });
+    return {log: log, recs: recs};
+}
+
+
+test('sample by level', function (t) {
+    var l = createLogger({sample: {debug: 0, info: 0.5, 50: 1}});
+    l.log.level('trace');
+    var random = Math.random;
+    var values = [0, 0.1, 0.9];
+    Math.random = function () {
+        return values.shift();
+    };
+    try {
+        l.log.debug('never');    // 0 >= 0
+        l.log.info('kept');      // 0.1 < 0.5
+        l.log.info('dropped');   // 0.9 >= 0.5
+        l.log.error('always');
+        l.log.trace('not sampled');
+    } finally {
+        Math.random = random;
+    }
+    t.deepEqual(l.recs.map(function (rec) { return rec.msg; }),
+        ['kept', 'always', 'not sampled']);
+    t.equal(l.log._limits.sampledOut, 2);
+    t.end();
+});
+
+
+test('rate limit by call site', function (t) {
+    var l = createLogger({rate: 2, summaryInterval: 60000});
+    var i;
+    for (i = 0; i < 10; i++) {
+        l.log.warn({i: i}, 'retry %d', i);
+    }
+    for (i = 0; i < 5; i++) {
+        l.log.warn('another site');
+    }
+    t.deepEqual(l.recs.map(function (rec) { return rec.msg; }),
+        ['retry 0', 'retry 1', 'another site', 'another site']);
+    t.equal(l.log._limits.suppressed, 11);
+
+    l.log.flush(function () {
+        var summaries = l.recs.slice(4);
+        t.equal(summaries.length, 2);
+        var summary = summaries[0];
+        t.equal(summary.msg, '8 similar records suppressed');
+        t.equal(summary.level, bunyan.WARN);
+        t.equal(summary.suppressedRecords, 8);
+        t.equal(summary.suppressedMsg, 'retry %d');
+        t.ok(/limits\.test\.js:\d+$/.test(summary.suppressedSite),
+            summary.suppressedSite);
+        t.ok(summary.suppressedFirst <= summary.suppressedLast);
+        t.equal(summaries[1].suppressedRecords, 3);
+        t.notEqual(summaries[1].suppressedSite, summary.suppressedSite);
+
+        // Nothing more to summarize.
+        l.log.flush(function () {
+            t.equal(l.recs.length, 6);
+            t.end();
+        });
+    });
+});
+
+
+test('rate limit by message template, with burst', function (t) {
+    var l = createLogger({rate: 1, burst: 3, key: 'msg'});
+    var child = l.log.child({component: 'db'});
+    var i;
+    for (i = 0; i < 5; i++) {
+        l.log.info('conn failed: %s', 'parent');
+        child.info({i: i}, 'conn failed: %s', 'child');
+    }
+    l.log.warn('conn failed: %s', 'warn');
+    t.equal(l.recs.length, 4, 'burst of 3, shared by the child, then warn');
+    t.equal(l.recs[3].level, bunyan.WARN);
+
+    l.log.flush(function () {
+        var summary = l.recs[4];
+        t.equal(summary.msg, '7 similar records suppressed');
+        t.equal(summary.suppressedMsg, 'conn failed: %s');
+        t.equal(summary.suppressedSite, undefined);
+        // Logged with the last logger to suppress a record.
+        t.equal(summary.component, 'db');
+        t.end();
+    });
+});
+
+
+test('rate limit: tokens refill', function (t) {
+    var l = createLogger({rate: 100, burst: 1});
+    function logIt() {
+        l.log.info('hi');
+    }
+    logIt();
+    logIt();
+    t.equal(l.recs.length, 1);
+    setTimeout(function () {
+        logIt();
+        t.equal(l.recs.length, 2);
+        t.end();
+    }, 50);
+});
+
+
+test('rate limit: summaries are logged every summaryInterval', function (t) {
+    var l = createLogger({rate: 1, summaryInterval: 20});
+    for (var i = 0; i < 4; i++) {
+        l.log.info('hi');
+    }
+    t.equal(l.recs.length, 1);
+    setTimeout(function () {
+        t.equal(l.recs.length, 2);
+        t.equal(l.recs[1].suppressedRecords, 3);
+        t.equal(l.log._limits._summaryTimer, null);
+        t.end();
+    }, 100);
+});
+
+
+test('rate limit: state is bounded by maxKeys', function (t) {
+    var l = createLogger({rate: 1, key: 'msg', maxKeys: 3});
+    var i;
+    for (i = 0; i < 2; i++) {
+        l.log.info('a');
+    }
+    for (i = 0; i < 10; i++) {
+        l.log.info('msg ' + i);
+    }
+    var limits = l.log._limits;
+    t.equal(limits._keys.size, 3);
+    t.deepEqual(Object.keys(limits._keys.map).sort(),
+        ['30:msg 7', '30:msg 8', '30:msg 9']);
+    // 'a' was evicted, with a summary of its suppressed record.
+    var summaries = l.recs.filter(function (rec) {
+        return rec.suppressedRecords !== undefined;
+    });
+    t.equal(summaries.length, 1);
+    t.equal(summaries[0].suppressedMsg, 'a');
+    t.equal(summaries[0].suppressedRecords, 1);
+    t.equal(l.recs.length, 12);
+    t.end();
+});
+
+
+test('limits: src', function (t) {
+    var recs = [];
+    var log = bunyan.createLogger({
+        name: 'limits',
+        src: true,
+        limits: {rate: 1},
+        streams: [ {
+            type: 'raw',
+            stream: {write: function (rec) { recs.push(rec); }}
+        } ]
+    });
+    for (var i = 0; i < 3; i++) {
+        log.info('hi');
+    }
+    log.flush(function () {
+        t.equal(recs.length, 2);
+        t.ok(/limits\.test\.js$/.test(recs[0].src.file));
+        t.deepEqual(recs[1].src, recs[0].src);
+        t.equal(recs[1].suppressedSite,
+            recs[0].src.file + ':' + recs[0].src.line);
+        t.end();
+    });
+});
+
+
+test('limits: invalid options', function (t) {
+    t.throws(function () {
+        bunyan.createLogger({name: 'limits', limits: true});
+    }, /invalid options.limits: must be an object/);
+    t.throws(function () {
+        createLogger({}).log.child({limits: {rate: 1}});
+    }, /child cannot set limits/);
+    t.throws(function () {
+        createLogger({sample: {info: 2}});
+    }, new RegExp('invalid limits "sample" for "info"'));
+    t.throws(function () {
+        createLogger({sample: {nope: 1}});
+    }, new RegExp('unknown level name: "nope"'));
+    t.throws(function () {
+        createLogger({rate: 0});
+    }, new RegExp('invalid limits "rate"'));
+    t.throws(function () {
+        createLogger({rate: 1, burst: 0.5});
+    }, new RegExp('invalid limits "burst"'));
+    t.throws(function () {
+        createLogger({key: 'line'});
+    }, new RegExp('invalid limits "key": "line"'));
+    t.throws(function () {
+        createLogger({maxKeys: 0});
+    }, new RegExp('invalid limits "maxKeys"'));
+    t.end();
+});
@@ -271,3 +271,41 @@ test('log.info(null, <msg>)', function (t) {
     });
     t.end();
 });
+
+test('log.info(bunyan.lazy(<function>), <msg>)', function (t) {
+    var calls = 0;
+    var lazyFields = bunyan.lazy(function () {
+        calls++;
+        return {lazy: 'yes'};
+    });
+    names.forEach(function (lvl) {
+        log3[lvl].call(log3, lazyFields, 'some %s', 'message');
+        var rec = catcher.records[catcher.records.length - 1];
+        t.equal(rec.lazy, 'yes', format('log.%s lazy field', lvl));
+        t.equal(rec.msg, 'some message',
+            format('log.%s msg: got %j', lvl, rec.msg));
+    });
+    t.equal(calls, names.length);
+
+    // The function is only called for enabled levels.
+    calls = 0;
+    var nRecords = catcher.records.length;
+    log3.level('warn');
+    log3.info(lazyFields, 'info');
+    log3.warn(lazyFields, 'warn');
+    log3.level('trace');
+    t.equal(calls, 1);
+    t.equal(catcher.records.length, nRecords + 1);
+
+    // It can also return an Error or the message.
+    log3.info(bunyan.lazy(function () { return new Error('boom'); }));
+    var rec = catcher.records[catcher.records.length - 1];
+    t.equal(rec.msg, 'boom');
+    t.equal(rec.err.message, 'boom');
+    log3.info(bunyan.lazy(function () { return 'lazy msg'; }));
+    rec = catcher.records[catcher.records.length - 1];
+    t.equal(rec.msg, 'lazy msg');
+
+    t.throws(function () { bunyan.lazy({}); }, /fn \(function\) is required/);
+    t.end();
+});
@@ -0,0 +1,162 @@
+/*
+ * Copyright 2020 Trent Mick
+ *
+ * Test the `metrics` Logger option and `log.metrics()`.
+ */
+
+var dgram = require('dgram');
+var test = require('tap').test;
+
+var bunyan = require('../lib/bunyan');
+
+
+function CapturingStream(ok) {
+    this.ok = ok;
+    this.written = [];
+}
+CapturingStream.prototype.write = function (s) {
+    this.written.push(s);
+    return this.ok;
+};
+
+
+test('metrics are off by default', function (t) {
+    var log = bunyan.createLogger({name: 'metrics',
+        stream: new CapturingStream(true)});
+    t.equal(log.metrics(), null);
+    t.throws(function () {
+        log.child({metrics: true});
+    }, /child cannot set metrics/);
+    t.throws(function () {
+        bunyan.createLogger({name: 'metrics', metrics: 'yes'});
+    }, /invalid options.metrics/);
+    t.end();
+});
+
+test('metrics: counters', function (t) {
+    var out = new CapturingStream(true);
+    var slow = new CapturingStream(false);
+    var ringbuffer = new bunyan.RingBuffer();
+    var log = bunyan.createLogger({
+        name: 'metrics',
+        metrics: true,
+        serializers: {
+            boom: function () { throw new Error('boom'); }
+        },
+        streams: [
+            {name: 'out', stream: out, level: 'trace'},
+            {name: 'slow', stream: slow, level: 'error'},
+            {type: 'raw', stream: ringbuffer}
+        ]
+    });
+
+    // Children (simple or not) share their parent's metrics.
+    log.trace('one');
+    log.child({component: 'a'}).info({x: 1}, 'two');
+    log.child({req_id: 'b'}, true).error('three');
+    var cycle = {};
+    cycle.cycle = cycle;
+    log.info({cycle: cycle}, 'four');
+    var stderrWrite = process.stderr.write;
+    process.stderr.write = function () {};
+    try {
+        log.info({boom: 1}, 'five');
+    } finally {
+        process.stderr.write = stderrWrite;
+    }
+
+    var metrics = log.metrics();
+    t.deepEqual(metrics.records, {trace: 1, info: 3, error: 1});
+    t.deepEqual(metrics.stringifyFallbacks,
+        {safeCycles: 1, safeJsonStringify: 0});
+    t.equal(metrics.serializerErrors, 1);
+    t.equal(metrics.writesReturnedFalse, 1, 'the "slow" stream write');
+
+    var bytes = function (written) {
+        return written.reduce(function (sum, s) {
+            return sum + Buffer.byteLength(s);
+        }, 0);
+    };
+    t.equal(metrics.bytes, bytes(out.written) + bytes(slow.written));
+    t.deepEqual(metrics.streams, [
+        {name: 'out', records: 5, bytes: bytes(out.written),
+            writesReturnedFalse: 0},
+        {name: 'raw', records: 4, bytes: 0, writesReturnedFalse: 0},
+        {name: 'slow', records: 1, bytes: bytes(slow.written),
+            writesReturnedFalse: 1}
+    ]);
+    t.equal(metrics.timings.mkRecord.count, 0, 'no timings by default');
+
+    // A snapshot is a copy.
+    metrics.records.info = 100;
+    t.equal(log.metrics().records.info, 3);
+    t.end();
+});
+
+test('metrics: sampled timings', function (t) {
+    var log = bunyan.createLogger({
+        name: 'metrics',
+        metrics: {timingSample: 10},
+        stream: new CapturingStream(true)
+    });
+    for (var i = 0; i < 100; i++) {
+        log.info({i: i}, 'hi');
+    }
+    var timings = log.metrics().timings;
+    ['mkRecord', 'emit'].forEach(function (name) {
+        t.equal(timings[name].count, 10, name);
+        t.ok(timings[name].totalNs > 0, name);
+        t.ok(timings[name].maxNs <= timings[name].totalNs, name);
+    });
+    t.end();
+});
+
+test('metrics: statsd', function (t) {
+    var server = dgram.createSocket('udp4');
+    var packets = [];
+    server.on('message', function (msg) {
+        packets.push(msg.toString());
+        if (packets.length === 2) {
+            server.close();
+            t.deepEqual(packets[0].split('\n'), [
+                'test.records.info:2|c',
+                'test.records.warn:1|c',
+                'test.bytes:' + bytes + '|c',
+                'test.streams.out.records:3|c',
+                'test.streams.out.bytes:' + bytes + '|c'
+            ]);
+            // Only what changed since is sent.
+            t.deepEqual(packets[1].split('\n'), [
+                'test.records.info:1|c',
+                'test.bytes:' + (out.written[3].length) + '|c',
+                'test.streams.out.records:1|c',
+                'test.streams.out.bytes:' + (out.written[3].length) + '|c'
+            ]);
+            t.end();
+        }
+    });
+
+    var out = new CapturingStream(true);
+    var log;
+    var bytes;
+    server.bind(0, '127.0.0.1', function () {
+        log = bunyan.createLogger({
+            name: 'metrics',
+            metrics: {
+                statsd: {
+                    port: server.address().port,
+                    prefix: 'test',
+                    interval: 100
+                }
+            },
+            streams: [ {name: 'out', stream: out} ]
+        });
+        log.info('one');
+        log.info('two');
+        log.warn('three');
+        bytes = out.written.join('').length;
+        setTimeout(function () {
+            log.info('four');
+        }, 150);
+    });
+});
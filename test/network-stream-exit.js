@@ -0,0 +1,24 @@
+/*
+ * Log to a 'tcp' stream with an unreachable collector (on port `argv[2]`)
+ * and exit immediately. The queued records should be counted as dropped.
+ * Used by "network-stream.test.js".
+ */
+
+var bunyan = require('../lib/bunyan');
+
+var log = bunyan.createLogger({
+    name: 'network-stream-exit',
+    streams: [ {
+        type: 'tcp',
+        port: Number(process.argv[2])
+    } ]
+});
+var stream = log.streams[0].stream;
+for (var i = 0; i < 100; i++) {
+    log.info({i: i}, 'hi');
+}
+// Called after the streams are flushed on exit.
+process.on('exit', function () {
+    console.log('queued=%d dropped=%d', stream.queued, stream.dropped);
+});
+process.exit(0);
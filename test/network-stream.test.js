@@ -0,0 +1,419 @@
+/*
+ * Copyright 2020 Trent Mick
+ *
+ * Test the 'tcp', 'udp' and 'unix' stream types (NetworkStream).
+ */
+
+var dgram = require('dgram');
+var exec = require('child_process').exec;
+var fs = require('fs');
+var net = require('net');
+var os = require('os');
+var path = require('path');
+var test = require('tap').test;
+
+var bunyan = require('../lib/bunyan');
+
+
+function tmpPath(name) {
+    return path.join(os.tmpdir(),
+        'bunyan-network-' + name + '-' + process.pid);
+}
+
+/*
+ * A netcat-style collector: calls `onListening(collector)` when listening
+ * (on `port` or `sockPath`, if given). Received data is in `collector.data`.
+ */
+function listen(opts, onListening) {
+    var collector = {data: '', numConnections: 0, conns: []};
+    collector.server = net.createServer(function (conn) {
+        collector.numConnections++;
+        collector.conns.push(conn);
+        conn.setEncoding('utf8');
+        conn.on('data', function (chunk) {
+            collector.data += chunk;
+        });
+    });
+    collector.server.listen(opts.sockPath || opts.port || 0, function () {
+        collector.port = collector.server.address().port;
+        onListening(collector);
+    });
+    collector.close = function (cb) {
+        collector.conns.forEach(function (conn) {
+            conn.destroy();
+        });
+        collector.server.close(cb);
+    };
+    collector.recs = function () {
+        return collector.data.trim().split('\n').map(function (line) {
+            return JSON.parse(line);
+        });
+    };
+    return collector;
+}
+
+/*
+ * Call `cb` when `cond()` is true, polling every 10ms.
+ */
+function waitFor(cond, cb) {
+    if (cond()) {
+        cb();
+    } else {
+        setTimeout(waitFor, 10, cond, cb);
+    }
+}
+
+/*
+ * Get a TCP port that nothing is listening on.
+ */
+function freePort(cb) {
+    var server = net.createServer();
+    server.listen(0, function () {
+        var port = server.address().port;
+        server.close(function () {
+            cb(port);
+        });
+    });
+}
+
+
+test('tcp stream: batches records over one connection', function (t) {
+    listen({}, function (collector) {
+        var log = bunyan.createLogger({
+            name: 'network',
+            streams: [ {type: 'tcp', port: collector.port} ]
+        });
+        var s = log.streams[0].stream;
+        t.ok(s instanceof bunyan.NetworkStream);
+
+        for (var i = 0; i < 1000; i++) {
+            log.info({i: i}, 'hi');
+        }
+        t.equal(s.queued, 1000);
+        log.flush(function () {
+            t.ok(s.connected);
+            t.equal(s.queued, 0);
+            t.equal(s.sent, 1000);
+            t.equal(s.dropped, 0);
+            waitFor(function () {
+                return collector.data.length > 0 &&
+                    collector.recs().length === 1000;
+            }, function () {
+                var recs = collector.recs();
+                t.equal(recs[0].i, 0);
+                t.equal(recs[999].i, 999);
+                t.equal(collector.numConnections, 1);
+                s.close(function () {
+                    t.throws(function () { s.write('boom\n'); },
+                        /ended already/);
+                    collector.close(function () {
+                        t.end();
+                    });
+                });
+            });
+        });
+    });
+});
+
+
+test('unix stream', function (t) {
+    var sockPath = tmpPath('unix') + '.sock';
+    listen({sockPath: sockPath}, function (collector) {
+        var s = new bunyan.NetworkStream({type: 'unix', path: sockPath});
+        s.write('{"i":0}\n');
+        s.write('{"i":1}\n');
+        waitFor(function () {
+            return s.sent === 2 && collector.data.length === 16;
+        }, function () {
+            t.deepEqual(collector.recs(), [ {i: 0}, {i: 1} ]);
+            s.close(function () {
+                collector.close(function () {
+                    t.end();
+                });
+            });
+        });
+    });
+});
+
+
+test('udp stream: batches records in datagrams', function (t) {
+    var server = dgram.createSocket('udp4');
+    var datagrams = [];
+    server.on('message', function (msg) {
+        datagrams.push(msg.toString('utf8'));
+    });
+    server.bind(0, '127.0.0.1', function () {
+        var s = new bunyan.NetworkStream({
+            type: 'udp',
+            port: server.address().port,
+            batchSize: 100
+        });
+        var rec = '{"msg":"' + new Array(40).join('x') + '"}\n';  // 50 bytes
+        for (var i = 0; i < 5; i++) {
+            s.write(rec);
+        }
+        waitFor(function () {
+            return datagrams.length === 3;
+        }, function () {
+            t.deepEqual(datagrams, [rec + rec, rec + rec, rec]);
+            t.equal(s.sent, 5);
+            t.equal(s.dropped, 0);
+            s.close(function () {
+                server.close();
+                t.end();
+            });
+        });
+    });
+});
+
+
+test('tcp stream: reconnects and sends queued records', function (t) {
+    freePort(function (port) {
+        var s = new bunyan.NetworkStream({
+            type: 'tcp',
+            port: port,
+            reconnectMinDelay: 10,
+            reconnectMaxDelay: 50
+        });
+        s.write('{"i":0}\n');
+        s.write('{"i":1}\n');
+        setTimeout(function () {
+            t.notOk(s.connected, 'nothing listening yet');
+            t.equal(s.queued, 2);
+
+            listen({port: port}, function (collector) {
+                waitFor(function () {
+                    return collector.data.length === 16;
+                }, function () {
+                    t.equal(s.sent, 2);
+                    t.equal(s.reconnects, 0);
+                    // Drop the connection: the stream reconnects.
+                    s.once('disconnect', function () {
+                        s.write('{"i":2}\n');
+                        s.once('connect', function () {
+                            waitFor(function () {
+                                return collector.data.length === 24;
+                            }, function () {
+                                t.deepEqual(collector.recs(),
+                                    [ {i: 0}, {i: 1}, {i: 2} ]);
+                                t.equal(s.reconnects, 1);
+                                t.equal(collector.numConnections, 2);
+                                s.close(function () {
+                                    collector.close(function () {
+                                        t.end();
+                                    });
+                                });
+                            });
+                        });
+                    });
+                    collector.conns[0].destroy();
+                });
+            });
+        }, 100);
+    });
+});
+
+
+test('tcp stream: drops records when the queue is full', function (t) {
+    freePort(function (port) {
+        var s = new bunyan.NetworkStream({
+            type: 'tcp',
+            port: port,
+            queueSize: 10
+        });
+        for (var i = 0; i < 25; i++) {
+            s.write('{"i":' + i + '}\n');
+        }
+        t.equal(s.queued, 10);
+        t.equal(s.dropped, 15);
+        s.destroy();
+        t.end();
+    });
+});
+
+
+test('tcp stream: spools to disk and replays in order', function (t) {
+    var spoolPath = tmpPath('spool') + '.log';
+    freePort(function (port) {
+        var s = new bunyan.NetworkStream({
+            type: 'tcp',
+            port: port,
+            queueSize: 10,
+            spoolPath: spoolPath,
+            batchSize: 64,
+            reconnectMinDelay: 10,
+            reconnectMaxDelay: 50
+        });
+        var i;
+        for (i = 0; i < 100; i++) {
+            s.write('{"i":' + i + '}\n');
+        }
+        s.flush(function () {
+            t.equal(s.queued, 0);
+            t.equal(s.spooled, 100);
+            t.equal(s.dropped, 0);
+            t.ok(fs.statSync(spoolPath).size > 0);
+
+            listen({port: port}, function (collector) {
+                // Written while replaying: must come after those spooled.
+                s.write('{"i":100}\n');
+                waitFor(function () {
+                    return s.spooled === 0 && s.queued === 0 &&
+                        collector.data.split('\n').length === 102;
+                }, function () {
+                    var recs = collector.recs();
+                    for (i = 0; i < recs.length; i++) {
+                        if (recs[i].i !== i) {
+                            break;
+                        }
+                    }
+                    t.equal(i, 101, 'all records received, in order');
+                    t.equal(fs.statSync(spoolPath).size, 0);
+                    s.close(function () {
+                        fs.unlinkSync(spoolPath);
+                        collector.close(function () {
+                            t.end();
+                        });
+                    });
+                });
+            });
+        });
+    });
+});
+
+
+test('tcp stream: counts records queued on process exit as dropped',
+        function (t) {
+    freePort(function (port) {
+        exec('node ' + __dirname + '/network-stream-exit.js ' + port,
+                function (err, stdout, stderr) {
+            t.ifError(err);
+            t.equal(stderr, '');
+            t.equal(stdout, 'queued=0 dropped=100\n');
+            t.end();
+        });
+    });
+});
+
+
+test('tcp stream: spool is replayed in whole records', function (t) {
+    var spoolPath = tmpPath('spool-lines') + '.log';
+    freePort(function (port) {
+        var s = new bunyan.NetworkStream({
+            type: 'tcp',
+            port: port,
+            queueSize: 1,
+            spoolPath: spoolPath,
+            batchSize: 50,
+            reconnectMinDelay: 10,
+            reconnectMaxDelay: 50
+        });
+        var lines = [];
+        var i;
+        for (i = 0; i < 30; i++) {
+            // Records of varying length, one longer than `batchSize`.
+            lines.push(JSON.stringify({i: i,
+                pad: new Array(i === 10 ? 120 : i % 7 + 1).join('x')}) + '\n');
+            s.write(lines[i]);
+        }
+        s.flush(function () {
+            t.equal(s.spooled, 30);
+            var chunks = [];
+            s.on('connect', function () {
+                var write = s._socket.write;
+                s._socket.write = function (chunk) {
+                    chunks.push(String(chunk));
+                    return write.apply(this, arguments);
+                };
+            });
+            listen({port: port}, function (collector) {
+                waitFor(function () {
+                    return s.spooled === 0 && s.queued === 0 &&
+                        collector.data.length === lines.join('').length;
+                }, function () {
+                    t.equal(collector.data, lines.join(''));
+                    t.ok(chunks.length > 1);
+                    t.ok(chunks.every(function (chunk) {
+                        return chunk[chunk.length - 1] === '\n';
+                    }), 'every write ends with a whole record');
+                    s.close(function () {
+                        fs.unlinkSync(spoolPath);
+                        collector.close(function () {
+                            t.end();
+                        });
+                    });
+                });
+            });
+        });
+    });
+});
+
+
+test('tcp stream: spool is bounded, and kept for the next process',
+        function (t) {
+    var spoolPath = tmpPath('spool-max') + '.log';
+    freePort(function (port) {
+        var s = new bunyan.NetworkStream({
+            type: 'tcp',
+            port: port,
+            queueSize: 5,
+            spoolPath: spoolPath,
+            spoolMaxBytes: 80   // 10 records of 8 bytes
+        });
+        for (var i = 0; i < 10; i++) {
+            s.write('{"i":' + i + '}\n');
+        }
+        for (i = 0; i < 10; i++) {
+            s.write('{"j":' + i + '}\n');
+        }
+        // As on process exit.
+        s.flushSync();
+        s.destroy();
+        t.equal(s.spooled, 10);
+        t.equal(s.dropped, 10);
+
+        listen({port: port}, function (collector) {
+            var s2 = new bunyan.NetworkStream({
+                type: 'tcp',
+                port: port,
+                spoolPath: spoolPath
+            });
+            t.equal(s2.spooled, 10);
+            waitFor(function () {
+                return s2.spooled === 0 && collector.data.length === 80;
+            }, function () {
+                t.deepEqual(collector.recs().map(function (rec) {
+                    return rec.i;
+                }), [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]);
+                s2.close(function () {
+                    fs.unlinkSync(spoolPath);
+                    collector.close(function () {
+                        t.end();
+                    });
+                });
+            });
+        });
+    });
+});
+
+
+test('network stream: invalid options', function (t) {
+    t.throws(function () {
+        new bunyan.NetworkStream({type: 'http', port: 80});
+    }, new RegExp('invalid NetworkStream "type"'));
+    t.throws(function () {
+        new bunyan.NetworkStream({type: 'tcp'});
+    }, new RegExp('invalid NetworkStream "port"'));
+    t.throws(function () {
+        new bunyan.NetworkStream({type: 'unix'});
+    }, new RegExp('requires a "path"'));
+    t.throws(function () {
+        new bunyan.NetworkStream({type: 'udp', port: 514, spoolPath: '/x'});
+    }, new RegExp('does not support "spoolPath"'));
+    t.throws(function () {
+        bunyan.createLogger({name: 'network', streams: [
+            {type: 'tcp', port: 80, stream: process.stdout}
+        ]});
+    }, new RegExp('should not give a "stream"'));
+    t.end();
+});
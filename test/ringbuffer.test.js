@@ -39,3 +39,125 @@ test('ringbuffer', function (t) {
     t.equal(ringbuffer.records[4]['msg'], 'four');
     t.end();
 });
+
+test('ringbuffer: wraps around', function (t) {
+    var rb = new Logger.RingBuffer({limit: 3});
+    for (var i = 0; i < 10; i++) {
+        rb.write(i);
+    }
+    t.equal(rb.length, 3);
+    t.deepEqual(rb.snapshot(), [7, 8, 9]);
+    t.deepEqual(rb.records, [7, 8, 9]);
+    var seen = [];
+    rb.forEach(function (rec, idx) {
+        seen.push([idx, rec]);
+    });
+    t.deepEqual(seen, [[0, 7], [1, 8], [2, 9]]);
+    if (typeof (Symbol) === 'function' && Array.from) {
+        t.deepEqual(Array.from(rb), [7, 8, 9]);
+    }
+
+    rb.records = [1, 2, 3, 4];
+    t.deepEqual(rb.records, [2, 3, 4]);
+    rb.clear();
+    t.equal(rb.length, 0);
+    t.deepEqual(rb.records, []);
+    t.end();
+});
+
+test('ringbuffer: records is a live array', function (t) {
+    var rb = new Logger.RingBuffer({limit: 3, maxBytes: 100});
+    rb.write('a');
+    rb.write('b');
+    var records = rb.records;
+    t.equal(rb.records, records, 'the same array until the next change');
+    t.deepEqual(records, ['a', 'b']);
+
+    records.shift();
+    t.equal(rb.length, 1, 'in-place changes are kept');
+    t.equal(rb.bytes, 1);
+    rb.write('c');
+    t.deepEqual(rb.records, ['b', 'c']);
+
+    rb.records.length = 0;
+    t.equal(rb.length, 0);
+    rb.write('d');
+    rb.write('e');
+    rb.write('f');
+    rb.write('g');
+    t.deepEqual(rb.records, ['e', 'f', 'g']);
+    t.deepEqual(rb.snapshot(), ['e', 'f', 'g']);
+
+    rb.records.push('h');
+    t.deepEqual(rb.snapshot(), ['f', 'g', 'h'], 'limit is applied');
+    t.end();
+});
+
+test('ringbuffer: maxBytes', function (t) {
+    var rb = new Logger.RingBuffer({limit: 100, maxBytes: 10});
+    rb.write('aaaa');
+    rb.write('bbbb');
+    t.equal(rb.bytes, 8);
+    rb.write('cccc');
+    t.deepEqual(rb.records, ['bbbb', 'cccc']);
+    t.equal(rb.bytes, 8);
+    rb.write('dddddddddddd');
+    t.deepEqual(rb.records, ['dddddddddddd'], 'latest record is kept');
+
+    var sizes = new Logger.RingBuffer({
+        limit: 100,
+        maxBytes: 3,
+        sizeOf: function (rec) { return 1; }
+    });
+    for (var i = 0; i < 5; i++) {
+        sizes.write({i: i});
+    }
+    t.equal(sizes.length, 3);
+    t.equal(sizes.records[0].i, 2);
+    t.end();
+});
+
+test('ringbuffer: dump on error', function (t) {
+    var dumped = [];
+    var dumpTo = {
+        write: function (s) {
+            dumped = dumped.concat(s.trim().split('\n').map(JSON.parse));
+        }
+    };
+    var rb = new Logger.RingBuffer({limit: 1000, dumpTo: dumpTo});
+    var log = new Logger({
+        name: 'dump',
+        streams: [ {type: 'raw', stream: rb, level: 'trace'} ]
+    });
+    log.trace('one');
+    log.debug('two');
+    log.info('three');
+    t.equal(dumped.length, 0);
+    log.error('boom');
+    t.deepEqual(dumped.map(function (r) { return r.msg; }),
+        ['one', 'two', 'three']);
+    t.deepEqual(rb.records.map(function (r) { return r.msg; }), ['boom']);
+
+    // String (non-raw) records are dumped too.
+    dumped = [];
+    var rbStr = new Logger.RingBuffer({dumpTo: dumpTo, dumpLevel: 'warn'});
+    var logStr = new Logger({
+        name: 'dump',
+        streams: [ {stream: rbStr, level: 'trace'} ]
+    });
+    logStr.debug('four');
+    logStr.warn('five');
+    t.deepEqual(dumped.map(function (r) { return r.msg; }), ['four']);
+
+    // A bound or per-call field with a nested "level" doesn't look like the
+    // record's level.
+    dumped = [];
+    var child = logStr.child({meta: {level: 60}});
+    child.debug({other: {level: 50}}, 'six');
+    child.info('seven');
+    t.equal(dumped.length, 0);
+    child.error('eight');
+    t.deepEqual(dumped.map(function (r) { return r.msg; }),
+        ['five', 'six', 'seven']);
+    t.end();
+});
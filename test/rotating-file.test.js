@@ -0,0 +1,153 @@
+/*
+ * Copyright 2020 Trent Mick
+ *
+ * Test the 'rotating-file' stream type: size-based rotation and gzip.
+ */
+
+var fs = require('fs');
+var os = require('os');
+var path = require('path');
+var zlib = require('zlib');
+var test = require('tap').test;
+
+var bunyan = require('../lib/bunyan');
+
+
+var tmpDir = path.join(os.tmpdir(), 'bunyan-rotating-file-' + process.pid);
+
+function setup() {
+    if (!fs.existsSync(tmpDir)) {
+        fs.mkdirSync(tmpDir);
+    }
+    fs.readdirSync(tmpDir).forEach(function (name) {
+        fs.unlinkSync(path.join(tmpDir, name));
+    });
+}
+
+function teardown() {
+    fs.readdirSync(tmpDir).forEach(function (name) {
+        fs.unlinkSync(path.join(tmpDir, name));
+    });
+    fs.rmdirSync(tmpDir);
+}
+
+function readRecords(file) {
+    var data = fs.readFileSync(file);
+    if (/\.gz$/.test(file)) {
+        data = zlib.gunzipSync(data);
+    }
+    return data.toString('utf8').split('\n').filter(function (line) {
+        return line.length > 0;
+    }).map(function (line) {
+        return JSON.parse(line);
+    });
+}
+
+/*
+ * Log `n` records, waiting for each rotation to complete, then end the
+ * stream.
+ */
+function logAndWait(log, rfs, n, cb) {
+    var i = 0;
+    function idle() {
+        return (!rfs.rotating && !rfs._moving && rfs._toMove.length === 0);
+    }
+    function next() {
+        if (!idle()) {
+            setTimeout(next, 5);
+            return;
+        }
+        if (i === n) {
+            rfs.end(function () {
+                cb();
+            });
+            return;
+        }
+        log.info({i: i}, 'record %d', i);
+        i++;
+        next();
+    }
+    next();
+}
+
+
+test('rotating-file: size rotation', {skip: !bunyan.RotatingFileStream},
+        function (t) {
+    setup();
+    var logPath = path.join(tmpDir, 'size.log');
+    var log = bunyan.createLogger({
+        name: 'rot',
+        streams: [ {
+            type: 'rotating-file',
+            path: logPath,
+            size: '1k',
+            count: 2
+        } ]
+    });
+    var rfs = log.streams[0].stream;
+    t.equal(rfs.size, 1024);
+    t.equal(rfs.periodScope, null, 'no time-based rotation');
+    t.equal(rfs.timeout, undefined);
+
+    logAndWait(log, rfs, 30, function () {
+        var files = fs.readdirSync(tmpDir).sort();
+        t.deepEqual(files, ['size.log', 'size.log.0', 'size.log.1']);
+        var recs = readRecords(logPath + '.1')
+            .concat(readRecords(logPath + '.0'))
+            .concat(readRecords(logPath));
+        // The oldest records were rotated out, the rest are in order.
+        var is = recs.map(function (rec) { return rec.i; });
+        t.equal(is[is.length - 1], 29);
+        for (var j = 1; j < is.length; j++) {
+            t.equal(is[j], is[j - 1] + 1);
+        }
+        t.ok(fs.statSync(logPath + '.0').size >= 1024);
+        t.ok(rfs.rotations.count >= 2, 'rotations are counted');
+        t.ok(rfs.rotations.maxMs <= rfs.rotations.totalMs);
+        teardown();
+        t.end();
+    });
+});
+
+
+test('rotating-file: gzip', {skip: !bunyan.RotatingFileStream},
+        function (t) {
+    setup();
+    var logPath = path.join(tmpDir, 'gzip.log');
+    var log = bunyan.createLogger({
+        name: 'rot',
+        streams: [ {
+            type: 'rotating-file',
+            path: logPath,
+            period: '1d',
+            size: 1000,
+            count: 3,
+            gzip: true
+        } ]
+    });
+    var rfs = log.streams[0].stream;
+    t.equal(rfs.periodScope, 'd');
+    t.ok(rfs.timeout, 'also time-based rotation');
+
+    logAndWait(log, rfs, 20, function () {
+        var files = fs.readdirSync(tmpDir).sort();
+        t.deepEqual(files, ['gzip.log', 'gzip.log.0.gz', 'gzip.log.1.gz']);
+        var recs = readRecords(logPath + '.1.gz')
+            .concat(readRecords(logPath + '.0.gz'))
+            .concat(readRecords(logPath));
+        t.deepEqual(recs.map(function (rec) { return rec.i; }),
+            [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18,
+            19]);
+        teardown();
+        t.end();
+    });
+});
+
+
+test('rotating-file: invalid size', {skip: !bunyan.RotatingFileStream},
+        function (t) {
+    t.throws(function () {
+        new bunyan.RotatingFileStream({path: '/tmp/nope.log', size: '1x'});
+    }, new RegExp('invalid size: "1x"'));
+    t.end();
+});
@@ -312,3 +312,124 @@ test('do not apply serializers if no record key', function (t) {
 
     t.end();
 });
+
+
+test('serializers only apply to own field names', function (t) {
+    var records = [];
+    var log = createLogger({
+            foo: function (value) { return 'foo:' + value; }
+        },
+        records
+    );
+
+    log.info({constructor: 'c', toString: 't', foo: 1}, 'hi');
+    t.equal(records[0].constructor, 'c');
+    t.equal(records[0].toString, 't');
+    t.equal(records[0].foo, 'foo:1');
+
+    t.end();
+});
+
+
+test('serializers added to a child logger', function (t) {
+    var records = [];
+    var log = createLogger({
+            foo: function (value) { return 'foo:' + value; }
+        },
+        records
+    );
+    var child = log.child({component: 'child'});
+    child.addSerializers({bar: function (value) { return 'bar:' + value; }});
+
+    log.info({foo: 1, bar: 2}, 'parent');
+    child.info({foo: 1, bar: 2}, 'child');
+    t.equal(records[0].foo, 'foo:1');
+    t.equal(records[0].bar, 2);
+    t.equal(records[1].foo, 'foo:1');
+    t.equal(records[1].bar, 'bar:2');
+
+    t.end();
+});
+
+
+test('serializers added to the parent of a simple child', function (t) {
+    var records = [];
+    var log = createLogger({
+            foo: function (value) { return 'foo:' + value; }
+        },
+        records
+    );
+    var child = log.child({component: 'child'}, true);
+    var grandchild = child.child({component: 'grandchild'}, true);
+    log.addSerializers({bar: function (value) { return 'bar:' + value; }});
+
+    child.info({foo: 1, bar: 2}, 'child');
+    grandchild.info({foo: 1, bar: 2}, 'grandchild');
+    t.equal(records[0].foo, 'foo:1');
+    t.equal(records[0].bar, 'bar:2');
+    t.equal(records[1].bar, 'bar:2');
+    t.ok(child.serializers.bar, 'child lists the added serializer');
+
+    // Once the child adds its own, the parent's later ones don't apply.
+    child.addSerializers({baz: function (value) { return 'baz:' + value; }});
+    log.addSerializers({qux: function (value) { return 'qux:' + value; }});
+    child.info({bar: 2, baz: 3, qux: 4}, 'child');
+    log.info({baz: 3, qux: 4}, 'parent');
+    t.equal(records[2].bar, 'bar:2');
+    t.equal(records[2].baz, 'baz:3');
+    t.equal(records[2].qux, 4);
+    t.equal(records[3].baz, 3);
+    t.equal(records[3].qux, 'qux:4');
+
+    t.end();
+});
+
+
+test('memoizeSerializers', function (t) {
+    var records = [];
+    var nReqCalls = 0;
+    var nResCalls = 0;
+    var log = bunyan.createLogger({
+        name: 'serializer-test',
+        streams: [
+            {
+                stream: new CapturingStream(records),
+                type: 'raw'
+            }
+        ],
+        serializers: {
+            req: function (req) {
+                nReqCalls++;
+                return {url: req.url};
+            },
+            res: function (res) {
+                nResCalls++;
+                return {statusCode: res.statusCode};
+            }
+        },
+        memoizeSerializers: ['req']
+    });
+
+    var req = {url: '/one'};
+    var res = {statusCode: 200};
+    var reqLog = log.child({component: 'handler'}, true);
+    reqLog.info({req: req}, 'start');
+    reqLog.info({req: req, res: res}, 'end');
+    res.statusCode = 500;
+    log.info({req: req, res: res}, 'again');
+    log.info({req: {url: '/two'}}, 'another req');
+
+    t.equal(nReqCalls, 2, 'req serializer called once per req object');
+    t.equal(nResCalls, 2, 'res serializer is not memoized');
+    t.equal(records[0].req.url, '/one');
+    t.equal(records[1].req.url, '/one');
+    t.equal(records[1].res.statusCode, 200);
+    t.equal(records[2].res.statusCode, 500);
+    t.equal(records[3].req.url, '/two');
+
+    t.throws(function () {
+        log.child({memoizeSerializers: 'req'});
+    }, /invalid options.memoizeSerializers/);
+
+    t.end();
+});
@@ -9,6 +9,9 @@ function logSomething(log) { log.info('something'); }
 
 var test = require('tap').test;
 var format = require('util').format;
+var fs = require('fs');
+var os = require('os');
+var path = require('path');
 
 var Logger = require('../lib/bunyan');
 
@@ -53,3 +56,94 @@ test('src', function (t) {
 
     t.end();
 });
+
+
+test('src is cached per call site', function (t) {
+    var recs = [];
+    var strs = [];
+
+    var log = new Logger({
+        name: 'src-test',
+        src: true,
+        streams: [
+            {
+                stream: new CapturingStream(recs),
+                type: 'raw'
+            },
+            {
+                stream: {write: function (s) { strs.push(JSON.parse(s)); }}
+            }
+        ]
+    });
+
+    for (var i = 0; i < 3; i++) {
+        logSomething(log);
+        log.info('in a loop');
+    }
+
+    t.equal(recs.length, 6);
+    t.equal(strs.length, 6);
+    for (i = 0; i < 6; i += 2) {
+        t.equal(recs[i].src.line, 8);
+        t.equal(recs[i].src.func, 'logSomething');
+        t.deepEqual(strs[i].src, recs[i].src);
+        t.equal(recs[i + 1].src.line, recs[1].src.line);
+        t.notEqual(recs[i + 1].src.line, 8);
+        t.equal(recs[i + 1].src.func, undefined);
+        t.deepEqual(strs[i + 1].src, recs[i + 1].src);
+    }
+
+    // Modifying a record's "src" must not affect later records.
+    recs[0].src.line = 42;
+    logSomething(log);
+    t.equal(recs[6].src.line, 8);
+
+    t.end();
+});
+
+
+test('src with more call sites than are cached', function (t) {
+    var recs = [];
+
+    var log = new Logger({
+        name: 'src-test',
+        src: true,
+        streams: [
+            {
+                stream: new CapturingStream(recs),
+                type: 'raw'
+            }
+        ]
+    });
+
+    // Generate a module with a log call on each of many lines.
+    var N = 2500;
+    var lines = ['module.exports = function logMany(log) {'];
+    for (var i = 0; i < N; i++) {
+        lines.push('log.info(' + i + ');');
+    }
+    lines.push('};');
+    var file = path.join(os.tmpdir(),
+        format('bunyan-src-test-%d.js', process.pid));
+    fs.writeFileSync(file, lines.join('\n'));
+    var logMany = require(file);
+    fs.unlinkSync(file);
+
+    logMany(log);
+    logMany(log);
+
+    t.equal(recs.length, 2 * N);
+    var ok = true;
+    for (i = 0; i < recs.length; i++) {
+        var src = recs[i].src;
+        if (src.file !== file || src.line !== (i % N) + 2 ||
+            src.func !== 'logMany') {
+            ok = false;
+            t.fail(format('unexpected src for record %d: %j', i, src));
+            break;
+        }
+    }
+    t.ok(ok, 'all records have the expected src');
+
+    t.end();
+});
@@ -176,3 +176,94 @@ test('log level 0 to turn on all logging', function (t) {
     t.equal(log.streams[0].level, 0);
     t.end();
 });
+
+test('records are only written to streams of their level', function (t) {
+    function Collector() {
+        this.recs = [];
+    }
+    Collector.prototype.write = function (rec) {
+        this.recs.push(rec);
+    };
+    var infoStream = new Collector();
+    var errorStream = new Collector();
+    var rawStream = new Collector();
+    var log = bunyan.createLogger({
+        name: 'foo',
+        streams: [
+            {stream: infoStream, level: 'info'},
+            {stream: errorStream, level: 'error'}
+        ]
+    });
+    var child = log.child({component: 'child'});
+    var simpleChild = log.child({component: 'simple'}, true);
+
+    log.debug('debug');
+    log.info('info');
+    log.error('error');
+    t.equal(infoStream.recs.length, 2);
+    t.equal(errorStream.recs.length, 1);
+
+    // Changing stream levels (or adding a stream) changes where records go.
+    log.levels(1, 'warn');
+    log.addStream({type: 'raw', stream: rawStream, level: 'warn'});
+    log.warn('warn');
+    t.equal(infoStream.recs.length, 3);
+    t.equal(errorStream.recs.length, 2);
+    t.equal(rawStream.recs.length, 1);
+    t.equal(rawStream.recs[0].msg, 'warn');
+
+    // ... though not for a child created before the change ...
+    child.warn('child warn');
+    t.equal(errorStream.recs.length, 2);
+    t.equal(rawStream.recs.length, 1);
+
+    // ... except a simple child, which uses its parent's streams.
+    simpleChild.warn('simple child warn');
+    t.equal(errorStream.recs.length, 3);
+    t.equal(rawStream.recs.length, 2);
+
+    log.level('fatal');
+    log.error('error');
+    t.equal(infoStream.recs.length, 5);
+    t.end();
+});
+
+test('level changes after creating children', function (t) {
+    function Collector() {
+        this.recs = [];
+    }
+    Collector.prototype.write = function (rec) {
+        this.recs.push(rec.msg);
+    };
+    var stream = new Collector();
+    var rawStream = new Collector();
+    var log = bunyan.createLogger({
+        name: 'foo',
+        streams: [ {type: 'raw', stream: stream, level: 'info'} ]
+    });
+    var child = log.child({component: 'child'});
+    var simpleChild = log.child({component: 'simple'}, true);
+
+    // The children log first, so that they build the dispatch tables.
+    log.level('debug');
+    log.addStream({type: 'raw', stream: rawStream, level: 'debug'});
+    simpleChild.debug('simple child debug');
+    child.debug('child debug');
+    child.info('child info');
+    log.debug('debug');
+    t.deepEqual(stream.recs,
+        ['simple child debug', 'child info', 'debug']);
+    t.deepEqual(rawStream.recs, ['simple child debug', 'debug']);
+    t.equal(simpleChild.level(), bunyan.DEBUG);
+    t.equal(child.level(), bunyan.INFO);
+
+    log.level('warn');
+    simpleChild.info('simple child info');
+    child.info('child info 2');
+    log.info('info');
+    log.warn('warn');
+    t.deepEqual(stream.recs, ['simple child debug', 'child info', 'debug',
+        'child info 2', 'warn']);
+    t.deepEqual(rawStream.recs, ['simple child debug', 'debug', 'warn']);
+    t.end();
+});
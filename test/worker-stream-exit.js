@@ -0,0 +1,17 @@
+/*
+ * Log to a 'worker' stream and let the process exit. All records should
+ * still make it to the file. Used by "worker-stream.test.js".
+ */
+
+var bunyan = require('../lib/bunyan');
+
+var log = bunyan.createLogger({
+    name: 'worker-stream-exit',
+    streams: [ {
+        type: 'worker',
+        path: process.argv[2]
+    } ]
+});
+for (var i = 0; i < 100; i++) {
+    log.info({i: i}, 'hi');
+}
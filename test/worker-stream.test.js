@@ -0,0 +1,164 @@
+/*
+ * Copyright 2020 Trent Mick
+ *
+ * Test the 'worker' stream type (WorkerStream).
+ */
+
+var exec = require('child_process').exec;
+var fs = require('fs');
+var os = require('os');
+var path = require('path');
+var test = require('tap').test;
+
+var bunyan = require('../lib/bunyan');
+
+try {
+    require('worker_threads');
+    var haveWorkerThreads = true;
+} catch (e) {
+    haveWorkerThreads = false;
+}
+
+
+function tmpLogPath(name) {
+    return path.join(os.tmpdir(),
+        'bunyan-worker-' + name + '-' + process.pid + '.log');
+}
+
+function readRecs(logPath) {
+    return fs.readFileSync(logPath, 'utf8').trim().split('\n').map(
+        function (line) { return JSON.parse(line); });
+}
+
+
+if (!haveWorkerThreads) {
+    console.warn('skip test (no worker_threads)');
+} else {
+
+test('worker stream: flush and close', function (t) {
+    var logPath = tmpLogPath('flush');
+    var log = bunyan.createLogger({
+        name: 'worker',
+        streams: [ {
+            type: 'worker',
+            path: logPath
+        } ]
+    });
+    var s = log.streams[0].stream;
+    t.ok(s instanceof bunyan.WorkerStream);
+
+    for (var i = 0; i < 1000; i++) {
+        log.info({i: i}, 'hi');
+    }
+    t.equal(s.queued, 1000);
+    s.flush(function () {
+        t.equal(s.queued, 0);
+        t.equal(s.dropped, 0);
+        var recs = readRecs(logPath);
+        t.equal(recs.length, 1000);
+        t.equal(recs[999].i, 999);
+
+        log.info({i: 1000}, 'last');
+        s.close(function () {
+            t.equal(readRecs(logPath).length, 1001);
+            t.throws(function () { s.write('boom\n'); },
+                /ended already/);
+            fs.unlinkSync(logPath);
+            t.end();
+        });
+    });
+});
+
+
+test('worker stream: overflow drop-newest', function (t) {
+    var logPath = tmpLogPath('drop-newest');
+    var s = new bunyan.WorkerStream({path: logPath, queueSize: 10});
+    for (var i = 0; i < 25; i++) {
+        s.write(i + '\n');
+    }
+    t.equal(s.queued, 10);
+    t.equal(s.dropped, 15);
+    s.close(function () {
+        var lines = fs.readFileSync(logPath, 'utf8').trim().split('\n');
+        t.equal(lines.length, 10);
+        t.equal(lines[0], '0');
+        t.equal(lines[9], '9');
+        fs.unlinkSync(logPath);
+        t.end();
+    });
+});
+
+
+test('worker stream: overflow drop-oldest', function (t) {
+    var logPath = tmpLogPath('drop-oldest');
+    var s = new bunyan.WorkerStream({
+        path: logPath,
+        queueSize: 10,
+        overflow: 'drop-oldest'
+    });
+    for (var i = 0; i < 25; i++) {
+        s.write(i + '\n');
+    }
+    t.equal(s.queued, 10);
+    t.equal(s.dropped, 15);
+    s.close(function () {
+        var lines = fs.readFileSync(logPath, 'utf8').trim().split('\n');
+        t.equal(lines.length, 10);
+        t.equal(lines[0], '15');
+        t.equal(lines[9], '24');
+        fs.unlinkSync(logPath);
+        t.end();
+    });
+});
+
+
+test('worker stream: overflow block', function (t) {
+    var logPath = tmpLogPath('block');
+    var s = new bunyan.WorkerStream({
+        path: logPath,
+        queueSize: 10,
+        overflow: 'block'
+    });
+    // Wait for the worker to start up.
+    s.flush(function () {
+        for (var i = 0; i < 100; i++) {
+            s.write(i + '\n');
+        }
+        t.equal(s.dropped, 0);
+        s.close(function () {
+            var lines = fs.readFileSync(logPath, 'utf8').trim().split('\n');
+            t.equal(lines.length, 100);
+            t.equal(lines[99], '99');
+            fs.unlinkSync(logPath);
+            t.end();
+        });
+    });
+});
+
+
+test('worker stream: invalid options', function (t) {
+    t.throws(function () {
+        new bunyan.WorkerStream({path: tmpLogPath('x'), overflow: 'bogus'});
+    }, new RegExp('invalid WorkerStream "overflow"'));
+    t.throws(function () {
+        new bunyan.WorkerStream({path: tmpLogPath('x'), queueSize: 0});
+    }, new RegExp('invalid WorkerStream "queueSize"'));
+    t.end();
+});
+
+
+test('worker stream is flushed on process exit', function (t) {
+    var logPath = tmpLogPath('exit');
+    exec('node ' + __dirname + '/worker-stream-exit.js ' + logPath,
+            function (err, stdout, stderr) {
+        t.ifError(err);
+        t.equal(stderr, '');
+        var recs = readRecs(logPath);
+        t.equal(recs.length, 100);
+        t.equal(recs[99].i, 99);
+        fs.unlinkSync(logPath);
+        t.end();
+    });
+});
+
+}
@@ -0,0 +1,710 @@
+#!/usr/bin/env node
+/**
+ * Copyright 2026 Trent Mick
+ *
+ * Benchmarks of the logger and the `bunyan` CLI.
+ *
+ * Usage:
+ *      node tools/bench.js [-o FILE] [-n SAMPLES] [--quick] [FILTER]
+ *      node tools/bench.js --list [FILTER]
+ *      node tools/bench.js compare BASE.json NEW.json [--threshold PCT]
+ *
+ * Each benchmark (those whose name matches the FILTER regex, if given) is
+ * warmed up, then run for a number of samples (default 20, 5 with
+ * "--quick") of enough operations to take about 100ms each. Results are
+ * written as JSON, to stdout or FILE: for each benchmark the ops/s over all
+ * samples, the 50th, 90th and 99th percentiles (and min and max) of the
+ * per-sample ns/op, and the garbage collections (count and ms) during the
+ * samples, as a measure of allocation.
+ *
+ * The bunyan tree benchmarked is this one, or the one at $BUNYAN_DIR. That
+ * allows running this script against older trees (including releases from
+ * before it existed). Benchmarks of features that tree doesn't have (i.e.
+ * that throw) are skipped.
+ *
+ * "compare" shows the change in ops/s of each benchmark between two results
+ * files, and exits non-zero if any got slower by more than the threshold
+ * (default 10%) -- e.g. to compare a release candidate with the last
+ * release:
+ *
+ *      git worktree add /tmp/bunyan-2.0.5 2.0.5
+ *      BUNYAN_DIR=/tmp/bunyan-2.0.5 node tools/bench.js -o /tmp/base.json
+ *      node tools/bench.js -o /tmp/new.json
+ *      node tools/bench.js compare /tmp/base.json /tmp/new.json
+ *
+ * The CLI benchmarks run `bin/bunyan` (with output to /dev/null) on a
+ * generated log file, with ops being log records.
+ */
+
+var child_process = require('child_process');
+var fs = require('fs');
+var os = require('os');
+var path = require('path');
+var perf_hooks = require('perf_hooks');
+var format = require('util').format;
+
+var binaryLog = require('../lib/binary-log');
+
+var BUNYAN_DIR = path.resolve(process.env.BUNYAN_DIR ||
+    path.join(__dirname, '..'));
+var bunyan = require(path.join(BUNYAN_DIR, 'lib/bunyan'));
+
+
+var RESULTS_VERSION = 1;
+var SAMPLE_MS = 100;
+var CLI_RECORDS = 50000;
+
+var tmpDir = path.join(os.tmpdir(), 'bunyan-bench-' + process.pid);
+
+
+// ---- support stuff
+
+function Collector() {}
+Collector.prototype.write = function (s) {};
+
+var req = {
+    method: 'GET',
+    url: '/path?q=1',
+    headers: {host: 'example.com', 'user-agent': 'bench'},
+    connection: {remoteAddress: '127.0.0.1', remotePort: 12345}
+};
+var res = {
+    statusCode: 200,
+    _header: 'HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n'
+};
+
+// The fields of a typical restify audit log record.
+var auditFields = {
+    component: 'audit',
+    audit: true,
+    remoteAddress: '172.25.1.28',
+    remotePort: 49596,
+    req_id: '574e5560-6a9d-11e6-af76-3dadd30aa0da',
+    req: {
+        method: 'POST',
+        url: '/my/machines',
+        headers: {
+            host: 'cloudapi.example.com',
+            'user-agent': 'curl/7.42.0',
+            accept: 'application/json',
+            'content-type': 'application/json',
+            'x-api-version': '~7',
+            date: 'Thu, 25 Aug 2016 08:24:28 GMT',
+            'content-length': '184'
+        },
+        httpVersion: '1.1',
+        timers: {parseAccept: 743, parseAuthorization: 2051, parseDate: 20,
+            readBody: 1699, parseBody: 218, signatureAuth: 182865,
+            loadAccount: 56, loadPackages: 9280}
+    },
+    res: {
+        statusCode: 404,
+        headers: {
+            'content-type': 'application/json',
+            'content-length': 99,
+            'request-id': '574e5560-6a9d-11e6-af76-3dadd30aa0da',
+            'response-time': 210
+        }
+    },
+    err: {
+        message: 'Package 92e2b20a does not exist',
+        name: 'ResourceNotFoundError',
+        stack: 'ResourceNotFoundError: Package 92e2b20a does not exist\n'
+            + '    at parseResponse (/opt/lib/json_client.js:67:23)\n'
+            + '    at IncomingMessage.done (/opt/lib/string_client.js:151:17)'
+    },
+    latency: 210,
+    route: 'createmachine'
+};
+
+function logger(options) {
+    var opts = {name: 'bench', stream: new Collector()};
+    Object.keys(options || {}).forEach(function (k) {
+        opts[k] = options[k];
+    });
+    if (opts.streams) {
+        delete opts.stream;
+    }
+    return bunyan.createLogger(opts);
+}
+
+
+// ---- benchmarks
+
+/*
+ * Each benchmark has a `name`, and either a `fn` to call for each op
+ * (after calling `setup`, if any, once), or a `run` that does a fixed
+ * number of ops (`ops`, for CLI benchmarks) per call. A `settle(cb)`, if
+ * any, is called (and timed) at the end of each sample, e.g. to wait for
+ * asynchronous writes.
+ */
+var BENCHMARKS = [];
+
+function bench(name, b) {
+    b.name = name;
+    BENCHMARKS.push(b);
+}
+
+bench('log.info: no fields', {
+    setup: function () { this.log = logger(); },
+    fn: function () { this.log.info('hi'); }
+});
+bench('log.info: small fields', {
+    setup: function () { this.log = logger(); },
+    fn: function (i) { this.log.info({foo: 'bar', i: i}, 'hi'); }
+});
+bench('log.info: format args', {
+    setup: function () { this.log = logger(); },
+    fn: function (i) { this.log.info('hi %s: %d', 'there', i); }
+});
+bench('log.info: large fields', {
+    setup: function () { this.log = logger(); },
+    fn: function () { this.log.info(auditFields, 'handled: 404'); }
+});
+bench('log.info: error', {
+    setup: function () {
+        this.log = logger();
+        this.err = new Error('boom');
+    },
+    fn: function () { this.log.info(this.err, 'oops'); }
+});
+bench('log.info: bound fields', {
+    setup: function () {
+        this.log = logger({component: 'api', region: 'us-east-1'})
+            .child({req_id: '574e5560-6a9d-11e6-af76-3dadd30aa0da'}, true);
+    },
+    fn: function () { this.log.info({foo: 'bar'}, 'hi'); }
+});
+bench('log.info: serializers', {
+    setup: function () {
+        this.log = logger({serializers: bunyan.stdSerializers});
+    },
+    fn: function () { this.log.info({req: req, res: res}, 'hi'); }
+});
+bench('log.info: memoized serializers', {
+    setup: function () {
+        this.log = logger({serializers: bunyan.stdSerializers,
+            memoizeSerializers: ['req']});
+    },
+    fn: function () { this.log.info({req: req, res: res}, 'hi'); }
+});
+bench('log.info: src', {
+    setup: function () { this.log = logger({src: true}); },
+    fn: function () { this.log.info('hi'); }
+});
+bench('log.info: metrics', {
+    setup: function () { this.log = logger({metrics: true}); },
+    fn: function () { this.log.info('hi'); }
+});
+bench('log.warn: rate limited by site', {
+    setup: function () { this.log = logger({limits: {rate: 10}}); },
+    fn: function (i) { this.log.warn({attempt: i}, 'retrying'); }
+});
+bench('log.warn: rate limited by msg', {
+    setup: function () {
+        this.log = logger({limits: {rate: 10, key: 'msg'}});
+    },
+    fn: function (i) { this.log.warn({attempt: i}, 'retrying'); }
+});
+bench('log.trace: disabled', {
+    setup: function () { this.log = logger(); },
+    fn: function (i) { this.log.trace({count: i}, 'hi'); }
+});
+bench('log.trace: disabled, lazy fields', {
+    setup: function () {
+        this.log = logger();
+        this.fields = bunyan.lazy(function () { return {count: 1}; });
+    },
+    fn: function () { this.log.trace(this.fields, 'hi'); }
+});
+bench('log.child: no fields', {
+    setup: function () { this.log = logger(); },
+    fn: function () { this.log.child(); }
+});
+bench('log.child: one field', {
+    setup: function () { this.log = logger(); },
+    fn: function (i) { this.log.child({a: i}); }
+});
+bench('log.child: one field, simple', {
+    setup: function () { this.log = logger(); },
+    fn: function (i) { this.log.child({a: i}, true); }
+});
+bench('log.child: serializer and one field', {
+    setup: function () {
+        this.log = logger();
+        this.serializers = {foo: function (foo) { return foo.bar; }};
+    },
+    fn: function (i) {
+        this.log.child({a: i, serializers: this.serializers});
+    }
+});
+bench('stream: raw', {
+    setup: function () {
+        this.log = logger({streams: [
+            {type: 'raw', stream: new Collector()}
+        ]});
+    },
+    fn: function () { this.log.info({foo: 'bar'}, 'hi'); }
+});
+bench('stream: string', {
+    setup: function () {
+        this.log = logger({streams: [ {stream: new Collector()} ]});
+    },
+    fn: function () { this.log.info({foo: 'bar'}, 'hi'); }
+});
+bench('stream: 1 of 3 enabled', {
+    setup: function () {
+        this.log = logger({streams: [
+            {level: 'info', stream: new Collector()},
+            {level: 'warn', stream: new Collector()},
+            {level: 'error', type: 'raw', stream: new Collector()}
+        ]});
+    },
+    fn: function () { this.log.info({foo: 'bar'}, 'hi'); }
+});
+[100, 100000].forEach(function (limit) {
+    bench('RingBuffer: limit ' + limit, {
+        setup: function () {
+            this.log = logger({streams: [ {type: 'raw', level: 'trace',
+                stream: new bunyan.RingBuffer({limit: limit})} ]});
+            for (var i = 0; i < limit; i++) {
+                this.log.trace('hi');
+            }
+        },
+        fn: function () { this.log.trace('hi'); }
+    });
+});
+['json', 'binary'].forEach(function (fmt) {
+    bench('stream: file, ' + fmt, {
+        // An older tree (see $BUNYAN_DIR) would silently write JSON.
+        skip: (fmt === 'binary' && !bunyan.BinaryStream),
+        setup: function () {
+            this.log = logger({streams: [ {type: 'file', format: fmt,
+                path: path.join(tmpDir, 'file-' + fmt + '.log')} ]});
+        },
+        fn: function (i) {
+            this.log.info({foo: 'bar', i: i, req_id: 'r' + (i % 100)},
+                'hi');
+        },
+        settle: function (cb) { this.log.flush(cb); }
+    });
+});
+bench('RotatingFileStream: rotating every 1 MiB', {
+    skip: !bunyan.RotatingFileStream,
+    setup: function () {
+        this.log = logger({streams: [ {type: 'rotating-file',
+            path: path.join(tmpDir, 'rotating.log'), size: '1m',
+            count: 2} ]});
+    },
+    fn: function (i) { this.log.info({foo: 'bar', i: i}, 'hi'); },
+    settle: function (cb) { this.log.flush(cb); }
+});
+
+var CLI_MODES = [
+    ['long', ['-o', 'long']],
+    ['short', ['-o', 'short']],
+    ['simple', ['-o', 'simple']],
+    ['json', ['-o', 'json']],
+    ['bunyan', ['-o', 'bunyan']],
+    ['inspect', ['-o', 'inspect']],
+    ['-l warn', ['-l', 'warn']],
+    ['-c (simple)', ['-c', 'this.req_id == "r3"']],
+    ['-c (code)', ['-c', 'this.msg.indexOf("boom") !== -1']],
+    ['--stats', ['--group-by', 'hostname', '--stats-field', 'latency']],
+    ['-o binary', ['-o', 'binary']],
+    ['simple, binary input', ['-o', 'simple'], binaryCorpus],
+    ['-l warn, binary input', ['-l', 'warn'], binaryCorpus]
+];
+CLI_MODES.forEach(function (mode) {
+    var corpus = mode[2] || cliCorpus;
+    bench('cli: ' + mode[0], {
+        cli: true,
+        // An older CLI would treat binary input as non-JSON lines.
+        skip: (corpus === binaryCorpus && !bunyan.BinaryStream),
+        ops: CLI_RECORDS,
+        setup: corpus,
+        run: function () {
+            var argv = [path.join(BUNYAN_DIR, 'bin/bunyan'),
+                '--no-color'].concat(mode[1], corpus());
+            var r = child_process.spawnSync(process.execPath, argv,
+                {stdio: ['ignore', 'ignore', 'inherit']});
+            if (r.status !== 0) {
+                throw new Error(format('bunyan %s: exit status %s',
+                    argv.slice(1).join(' '), r.status));
+            }
+        }
+    });
+});
+
+/*
+ * Generate (once) a log file of mixed records for the CLI benchmarks.
+ */
+var corpusPath = null;
+function cliCorpus() {
+    if (corpusPath) {
+        return corpusPath;
+    }
+    corpusPath = path.join(tmpDir, 'cli.log');
+    var log = bunyan.createLogger({
+        name: 'bench',
+        serializers: bunyan.stdSerializers,
+        streams: [ {type: 'raw', level: 'trace', stream: {write: write}} ]
+    });
+    var lines = [];
+    function write(rec) {
+        lines.push(JSON.stringify(rec));
+    }
+    var err = new Error('boom');
+    var start = Date.parse('2020-06-01T00:00:00Z');
+    for (var i = 0; i < CLI_RECORDS; i++) {
+        var fields = {
+            time: new Date(start + i * 10),
+            hostname: 'host' + (i % 4),
+            req_id: 'r' + (i % 1000),
+            latency: i % 300
+        };
+        if (i % 10 === 0) {
+            fields.req = req;
+            fields.res = res;
+            log.info(fields, 'handled request');
+        } else if (i % 50 === 1) {
+            fields.err = err;
+            log.error(fields, 'request failed');
+        } else if (i % 7 === 2) {
+            log.warn(fields, 'slow request');
+        } else {
+            log.debug(fields, 'step %d of %d', i % 5, 5);
+        }
+    }
+    fs.writeFileSync(corpusPath, lines.join('\n') + '\n');
+    return corpusPath;
+}
+
+/*
+ * The CLI benchmark log file (see `cliCorpus`), in the binary format.
+ */
+var binaryCorpusPath = null;
+function binaryCorpus() {
+    if (binaryCorpusPath) {
+        return binaryCorpusPath;
+    }
+    binaryCorpusPath = path.join(tmpDir, 'cli.bin');
+    var encoder = new binaryLog.Encoder();
+    var lines = fs.readFileSync(cliCorpus(), 'utf8').trim().split('\n');
+    fs.writeFileSync(binaryCorpusPath, Buffer.concat(lines.map(
+        function (line) {
+            return encoder.encode(JSON.parse(line));
+        })));
+    return binaryCorpusPath;
+}
+
+
+// ---- running
+
+/*
+ * Run a benchmark for `numSamples` samples, calling back with its results,
+ * or an error if it threw.
+ */
+function runBenchmark(b, numSamples, cb) {
+    var ctx = {};
+    var observer = null;
+    function fail(err) {
+        if (observer) {
+            observer.disconnect();
+        }
+        cb(err);
+    }
+    try {
+        if (b.setup) {
+            b.setup.call(ctx);
+        }
+    } catch (err) {
+        cb(err);
+        return;
+    }
+
+    var i = 0;
+    var opsPerSample = b.ops || 1;
+    function runOps(n) {
+        if (b.run) {
+            b.run.call(ctx);
+        } else {
+            for (var j = 0; j < n; j++) {
+                b.fn.call(ctx, i++);
+            }
+        }
+    }
+    function settle(next) {
+        if (b.settle) {
+            try {
+                b.settle.call(ctx, next);
+            } catch (err) {
+                fail(err);
+            }
+        } else {
+            setImmediate(next);
+        }
+    }
+
+    // Find how many ops take about SAMPLE_MS (also warming up).
+    if (!b.run) {
+        var elapsed = 0;
+        try {
+            while (elapsed < SAMPLE_MS / 10) {
+                opsPerSample *= 2;
+                var t = process.hrtime();
+                runOps(opsPerSample);
+                elapsed = hrtimeMs(process.hrtime(t));
+            }
+        } catch (err) {
+            cb(err);
+            return;
+        }
+        opsPerSample = Math.max(1,
+            Math.round(opsPerSample * SAMPLE_MS / elapsed));
+    }
+
+    var gc = {count: 0, ms: 0};
+    observer = new perf_hooks.PerformanceObserver(function (list) {
+        list.getEntries().forEach(function (entry) {
+            gc.count++;
+            gc.ms += entry.duration;
+        });
+    });
+
+    var nsPerOp = [];
+    var totalMs = 0;
+    settle(function sample() {
+        if (nsPerOp.length === 0) {
+            observer.observe({entryTypes: ['gc']});
+        }
+        var start = process.hrtime();
+        try {
+            runOps(opsPerSample);
+        } catch (err) {
+            fail(err);
+            return;
+        }
+        settle(function () {
+            var ms = hrtimeMs(process.hrtime(start));
+            totalMs += ms;
+            nsPerOp.push(ms * 1e6 / opsPerSample);
+            if (nsPerOp.length < numSamples) {
+                sample();
+                return;
+            }
+            // Let the last GC entries be delivered.
+            setImmediate(function () {
+                observer.disconnect();
+                nsPerOp.sort(function (a, b) { return a - b; });
+                var ops = opsPerSample * numSamples;
+                cb(null, {
+                    ops: ops,
+                    opsPerSec: round(ops / totalMs * 1000),
+                    nsPerOp: {
+                        min: round(nsPerOp[0]),
+                        p50: round(percentile(nsPerOp, 0.5)),
+                        p90: round(percentile(nsPerOp, 0.9)),
+                        p99: round(percentile(nsPerOp, 0.99)),
+                        max: round(nsPerOp[nsPerOp.length - 1])
+                    },
+                    samples: numSamples,
+                    gc: {count: gc.count, ms: round(gc.ms)}
+                });
+            });
+        });
+    });
+}
+
+function hrtimeMs(hrtime) {
+    return hrtime[0] * 1e3 + hrtime[1] / 1e6;
+}
+
+function percentile(sorted, q) {
+    return sorted[Math.min(sorted.length - 1,
+        Math.floor(q * sorted.length))];
+}
+
+function round(n) {
+    return Number(n.toPrecision(4));
+}
+
+function gitCommit() {
+    var r = child_process.spawnSync('git', ['rev-parse', 'HEAD'],
+        {cwd: BUNYAN_DIR, encoding: 'utf8'});
+    return (r.status === 0 ? r.stdout.trim() : null);
+}
+
+function run(opts) {
+    var benchmarks = BENCHMARKS.filter(function (b) {
+        return !b.skip && (!opts.filter || opts.filter.test(b.name));
+    });
+    if (opts.list) {
+        benchmarks.forEach(function (b) {
+            console.log(b.name);
+        });
+        return;
+    }
+
+    var results = {
+        version: RESULTS_VERSION,
+        bunyan: bunyan.VERSION,
+        commit: gitCommit(),
+        node: process.version,
+        platform: process.platform,
+        arch: process.arch,
+        cpu: os.cpus()[0].model,
+        time: new Date().toISOString(),
+        benchmarks: {}
+    };
+    fs.mkdirSync(tmpDir);
+    process.on('exit', function () {
+        fs.readdirSync(tmpDir).forEach(function (name) {
+            fs.unlinkSync(path.join(tmpDir, name));
+        });
+        fs.rmdirSync(tmpDir);
+    });
+
+    var queue = benchmarks.slice();
+    (function next() {
+        var b = queue.shift();
+        if (!b) {
+            var json = JSON.stringify(results, null, 4) + '\n';
+            if (opts.output) {
+                fs.writeFileSync(opts.output, json);
+            } else {
+                process.stdout.write(json);
+            }
+            return;
+        }
+        var numSamples = (b.cli ? Math.ceil(opts.samples / 4) : opts.samples);
+        runBenchmark(b, numSamples, function (err, result) {
+            if (err) {
+                process.stderr.write(format('%s: skipped: %s\n', b.name,
+                    err.message));
+                next();
+                return;
+            }
+            results.benchmarks[b.name] = result;
+            process.stderr.write(format('%s: %d ops/s (p50 %dns/op)\n',
+                b.name, result.opsPerSec, result.nsPerOp.p50));
+            next();
+        });
+    })();
+}
+
+
+// ---- comparing
+
+function compare(basePath, newPath, threshold) {
+    var base = JSON.parse(fs.readFileSync(basePath, 'utf8'));
+    var curr = JSON.parse(fs.readFileSync(newPath, 'utf8'));
+    [base, curr].forEach(function (results, i) {
+        if (results.version !== RESULTS_VERSION) {
+            throw new Error(format('%s: unknown results version: %j',
+                [basePath, newPath][i], results.version));
+        }
+    });
+    if (base.node !== curr.node || base.cpu !== curr.cpu) {
+        console.log('warning: comparing results from different environments'
+            + ' (%s on %s vs. %s on %s)', base.node, base.cpu, curr.node,
+            curr.cpu);
+    }
+
+    var rows = [['BENCHMARK', 'BASE OPS/S', 'NEW OPS/S', 'CHANGE', '']];
+    var numRegressions = 0;
+    Object.keys(curr.benchmarks).forEach(function (name) {
+        var b = base.benchmarks[name];
+        var c = curr.benchmarks[name];
+        if (!b) {
+            rows.push([name, '-', String(c.opsPerSec), '-', 'new']);
+            return;
+        }
+        var change = (c.opsPerSec - b.opsPerSec) / b.opsPerSec * 100;
+        var note = '';
+        // A change within the other run's spread is noise.
+        if (change < -threshold && c.nsPerOp.p50 > b.nsPerOp.p90) {
+            note = 'REGRESSION';
+            numRegressions++;
+        } else if (change > threshold && c.nsPerOp.p90 < b.nsPerOp.p50) {
+            note = 'faster';
+        }
+        rows.push([name, String(b.opsPerSec), String(c.opsPerSec),
+            (change >= 0 ? '+' : '') + change.toFixed(1) + '%', note]);
+    });
+
+    var widths = rows[0].map(function (h, col) {
+        return Math.max.apply(null, rows.map(function (row) {
+            return row[col].length;
+        }));
+    });
+    rows.forEach(function (row) {
+        console.log(row.map(function (cell, col) {
+            var pad = new Array(widths[col] - cell.length + 1).join(' ');
+            return (col === 0 || col === row.length - 1 ?
+                cell + pad : pad + cell);
+        }).join('  ').replace(/ +$/, ''));
+    });
+    return numRegressions;
+}
+
+
+// ---- mainline
+
+function usage() {
+    console.error('usage:\n'
+        + '    node tools/bench.js [-o FILE] [-n SAMPLES] [--quick] '
+        + '[FILTER]\n'
+        + '    node tools/bench.js --list [FILTER]\n'
+        + '    node tools/bench.js compare BASE.json NEW.json '
+        + '[--threshold PCT]');
+    process.exit(2);
+}
+
+function main(argv) {
+    var args = argv.slice(2);
+    if (args[0] === 'compare') {
+        var threshold = 10;
+        var paths = [];
+        for (var i = 1; i < args.length; i++) {
+            if (args[i] === '--threshold') {
+                threshold = Number(args[++i]);
+                if (isNaN(threshold)) {
+                    usage();
+                }
+            } else {
+                paths.push(args[i]);
+            }
+        }
+        if (paths.length !== 2) {
+            usage();
+        }
+        process.exit(compare(paths[0], paths[1], threshold) > 0 ? 1 : 0);
+    }
+
+    var opts = {output: null, samples: 20, list: false, filter: null};
+    while (args.length > 0) {
+        var arg = args.shift();
+        if (arg === '-o' && args.length > 0) {
+            opts.output = args.shift();
+        } else if (arg === '-n' && args.length > 0) {
+            opts.samples = Number(args.shift());
+        } else if (arg === '--quick') {
+            opts.samples = 5;
+        } else if (arg === '--list') {
+            opts.list = true;
+        } else if (arg === '-h' || arg === '--help' || arg[0] === '-' ||
+            opts.filter)
+        {
+            usage();
+        } else {
+            opts.filter = new RegExp(arg);
+        }
+    }
+    if (!(opts.samples >= 1)) {
+        usage();
+    }
+    run(opts);
+}
+
+main(process.argv);